@@ -0,0 +1,101 @@
+"""Import-time benchmark guarding CLI and GUI startup
+
+Each target module is imported in a fresh interpreter under
+``python -X importtime``. The report lists its median cumulative import
+time and any heavy backend library the import pulled in. The exit status is
+1 when a heavy library is loaded at import time or a median exceeds
+``--budget-ms``, so the check can run in CI:
+
+    python -m benchmarks.import_time --budget-ms 300
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded only when a backend or a transcode actually runs
+HEAVY_MODULES = ("pytubefix", "yt_dlp", "moviepy", "numpy", "imageio", "imageio_ffmpeg")
+
+TARGETS = (
+    "youtube_downloader.core.downloader",
+    "youtube_downloader.core.batch",
+    "youtube_downloader.core.playlist",
+    "youtube_downloader.core.aio",
+    "youtube_downloader.gui.main_window",
+)
+
+PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)))
+"""
+
+def measure_import(module, runs=5):
+    """Import module in runs fresh interpreters and return its timings"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = []
+    heavy = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, cwd=root
+        )
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1]}
+        times.append(_cumulative_us(result.stderr, module) / 1000)
+        heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'median_ms': round(statistics.median(times), 2),
+        'max_ms': round(max(times), 2),
+        'heavy_modules': heavy,
+    }
+
+def _cumulative_us(importtime_output, module):
+    """Cumulative microseconds of module from ``-X importtime`` output"""
+    for line in importtime_output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1].strip())
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the downloader modules")
+    parser.add_argument("modules", nargs="*", help="Modules to import (default: core modules and the GUI)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail if a module's median import time exceeds this")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or [
+        module for module in TARGETS
+        if not module.startswith("youtube_downloader.gui") or importlib.util.find_spec("PyQt5")
+    ]
+    results = {module: measure_import(module, args.runs) for module in modules}
+    report = json.dumps({'python': sys.version.split()[0], 'results': results}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    failed = False
+    for module, result in results.items():
+        if 'error' in result:
+            print(f"{module}: import failed: {result['error']}", file=sys.stderr)
+            failed = True
+            continue
+        if result['heavy_modules']:
+            print(f"{module}: imports {', '.join(result['heavy_modules'])} at load", file=sys.stderr)
+            failed = True
+        if args.budget_ms is not None and result['median_ms'] > args.budget_ms:
+            print(f"{module}: {result['median_ms']} ms exceeds the {args.budget_ms} ms budget", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Local stand-in for a media host, serving synthetic files for benchmarks"""
+import os
+import random
+import re
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from youtube_downloader.core.ffmpeg import get_ffmpeg_exe
+
+# ffmpeg encoder and container for each synthetic codec
+CODECS = {
+    "aac": ("aac", "m4a"),
+    "opus": ("libopus", "webm"),
+    "mp3": ("libmp3lame", "mp3"),
+    "flac": ("flac", "flac"),
+}
+SEND_CHUNK_SIZE = 64 * 1024
+
+def make_media(directory, size, codec="raw", bitrate=128):
+    """Create a synthetic media file of roughly size bytes and return its path
+
+    ``codec="raw"`` writes random bytes, which is enough for transfer
+    benchmarks. Audio codecs produce a real, decodable sine tone with ffmpeg;
+    its duration is chosen from ``bitrate`` (kbit/s) to approximate size.
+    """
+    if codec == "raw":
+        path = os.path.join(directory, f"raw-{size}.bin")
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                chunk = os.urandom(min(remaining, 1024 * 1024))
+                f.write(chunk)
+                remaining -= len(chunk)
+        return path
+
+    encoder, ext = CODECS[codec]
+    exe = get_ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg is required for synthetic audio media")
+    duration = max(size * 8 / (bitrate * 1000), 1.0)
+    path = os.path.join(directory, f"{codec}-{size}.{ext}")
+    bitrate_args = [] if codec == "flac" else ["-b:a", f"{bitrate}k"]
+    subprocess.run(
+        [exe, "-hide_banner", "-nostdin", "-y", "-f", "lavfi",
+         "-i", f"sine=frequency=440:sample_rate=48000:duration={duration:.2f}",
+         "-ac", "2", "-c:a", encoder, *bitrate_args, path],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return path
+
+def make_certificate(directory, host="127.0.0.1"):
+    """Create a self-signed certificate for host with openssl and return (certfile, keyfile)"""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", keyfile, "-out", certfile, "-subj", f"/CN={host}",
+         "-addext", f"subjectAltName=IP:{host},DNS:localhost"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return certfile, keyfile
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    """Serves files from the server's media directory with Range support"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        server = self.server
+        name = os.path.basename(self.path.split("?", 1)[0])
+        path = os.path.join(server.media_dir, name)
+        if not name or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_error(503, "Injected fault")
+            return
+        if server.latency:
+            time.sleep(server.latency)
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{int(os.path.getmtime(path))}-{size}"')
+        self.end_headers()
+        if not send_body:
+            return
+
+        # Drop the connection part-way through when a fault is injected
+        cut_at = length // 2 if server.drop_rate and random.random() < server.drop_rate else None
+        sent = 0
+        started = time.monotonic()
+        with open(path, "rb") as f:
+            f.seek(start)
+            while sent < length:
+                chunk = f.read(min(SEND_CHUNK_SIZE, length - sent))
+                if not chunk:
+                    break
+                if cut_at is not None and sent + len(chunk) > cut_at:
+                    self.wfile.write(chunk[:cut_at - sent])
+                    self.close_connection = True
+                    return
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if server.throttle:
+                    # Per-connection bandwidth cap in bytes per second
+                    ahead = sent / server.throttle - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+class MediaServer(ThreadingHTTPServer):
+    """Threaded local HTTP server for synthetic media
+
+    ``throttle`` caps each connection in bytes/s, ``latency`` delays every
+    response, ``error_rate`` answers that fraction of requests with 503 and
+    ``drop_rate`` cuts that fraction of responses off half-way. With
+    ``certfile`` (and ``keyfile``) it serves HTTPS instead, e.g. with a
+    certificate from ``make_certificate()``.
+    """
+    daemon_threads = True
+
+    def __init__(self, media_dir=None, host="127.0.0.1", port=0, throttle=None, latency=0.0,
+                 error_rate=0.0, drop_rate=0.0, certfile=None, keyfile=None):
+        super().__init__((host, port), MediaRequestHandler)
+        self.tls = certfile is not None
+        if self.tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # The handshake then happens in the handler thread, not in the accept loop
+            self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+        self._owns_dir = media_dir is None
+        self.media_dir = media_dir or tempfile.mkdtemp(prefix="media-server-")
+        self.throttle = throttle
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response (cancelled or cut-off downloads,
+        # failed TLS handshakes) are routine here, not worth a traceback
+        if isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{port}"
+
+    def add_media(self, size, codec="raw", bitrate=128):
+        """Create a synthetic file in the media directory and return its URL"""
+        path = make_media(self.media_dir, size, codec, bitrate)
+        return self.url_for(path)
+
+    def url_for(self, path):
+        return f"{self.base_url}/{os.path.basename(path)}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._owns_dir:
+            shutil.rmtree(self.media_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
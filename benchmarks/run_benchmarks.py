@@ -0,0 +1,285 @@
+"""Offline benchmarks for the download, extraction and batch paths
+
+Synthetic media is served by a local MediaServer, so results do not depend
+on YouTube. Each scenario runs in a fresh worker process so that its peak
+RSS and CPU time are its own. Results are printed (or written with
+``--output``) as JSON, meant to be diffed between commits:
+
+    python -m benchmarks.run_benchmarks --size 32M --output before.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from urllib.parse import urlparse
+
+from benchmarks.media_server import CODECS, MediaServer, make_certificate
+from youtube_downloader.core.backends import BackendRegistry
+from youtube_downloader.core.bandwidth import BandwidthScheduler
+from youtube_downloader.core.batch import BatchDownloader
+from youtube_downloader.core.connections import DEFAULT_POOL_SIZE, configure_pool
+from youtube_downloader.core.downloader import download_video, extract_audio
+from youtube_downloader.core.ffmpeg import get_ffmpeg_exe
+from youtube_downloader.core.metrics import MetricsRecorder
+from youtube_downloader.core.transfer import SegmentedDownloader
+
+SCENARIOS = ("download", "download_segmented", "extract", "batch")
+
+def parse_size(value):
+    """Parse a byte count such as ``512K``, ``16M`` or ``1G``"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?)i?B?", value.strip(), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMG".index(unit.upper() or " "))
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of values"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def download_local(link, output_path=None, resolution=None, progress_callback=None,
+                   transfer=None, audio_only=False, cache=None, metrics=None, bandwidth=None, selector=None):
+    """Backend that fetches a MediaServer URL directly"""
+    filename = urlparse(link).path.strip("/").replace("/", "-")
+    path = os.path.join(output_path or os.getcwd(), filename)
+    (transfer or SegmentedDownloader(segments=1)).download(link, path, progress_callback=progress_callback,
+                                                          bandwidth=bandwidth)
+    return path
+
+def local_registry():
+    registry = BackendRegistry()
+    registry.register("local", download_local, "local media server")
+    return registry
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _cpu_time():
+    """User and system CPU time of this process and its waited-for children"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+def _run_download(config, url, workdir, segments, metrics):
+    latencies, nbytes, errors = [], 0, 0
+    bandwidth = _scheduler(config)
+    for iteration in range(config['iterations']):
+        output_path = os.path.join(workdir, str(iteration))
+        os.makedirs(output_path)
+        transfer = SegmentedDownloader(segments=segments, resume=False)
+        start = time.perf_counter()
+        video_path, _ = download_video(url, output_path, transfer=transfer, registry=local_registry(),
+                                       metrics=metrics, bandwidth=bandwidth)
+        latencies.append(time.perf_counter() - start)
+        if video_path:
+            nbytes += os.path.getsize(video_path)
+        else:
+            errors += 1
+        shutil.rmtree(output_path)
+    return latencies, nbytes, errors
+
+def _run_extract(config, url, workdir, source_path, metrics):
+    if config['codec'] == "raw":
+        raise _Skipped("extraction needs an audio codec, see --codec")
+    latencies, nbytes, errors = [], 0, 0
+    for iteration in range(config['iterations']):
+        output_path = os.path.join(workdir, str(iteration))
+        os.makedirs(output_path)
+        video_path = shutil.copy(source_path, output_path)
+        start = time.perf_counter()
+        audio_path = extract_audio(video_path, config['audio_format'], metrics=metrics)
+        latencies.append(time.perf_counter() - start)
+        if audio_path:
+            nbytes += os.path.getsize(video_path)
+        else:
+            errors += 1
+        shutil.rmtree(output_path)
+    return latencies, nbytes, errors
+
+def _run_batch(config, url, workdir, metrics):
+    latencies, nbytes, errors = [], 0, 0
+    bandwidth = _scheduler(config)
+    for iteration in range(config['iterations']):
+        output_path = os.path.join(workdir, str(iteration))
+        os.makedirs(output_path)
+        # The server ignores leading path components, so they give every job
+        # its own output file
+        base_url, filename = url.rsplit("/", 1)
+        urls = [f"{base_url}/job{index}/{filename}" for index in range(config['batch_size'])]
+        downloader = BatchDownloader(config['workers'], output_path=output_path,
+                                     transfer=SegmentedDownloader(segments=config['segments'], resume=False),
+                                     registry=local_registry(), metrics=metrics,
+                                     bandwidth=bandwidth)
+        for job in downloader.run(urls):
+            latencies.append(job.duration)
+            if job.ok:
+                nbytes += os.path.getsize(job.video_path)
+            else:
+                errors += 1
+        shutil.rmtree(output_path)
+    return latencies, nbytes, errors
+
+def _scheduler(config):
+    return BandwidthScheduler(config['rate_limit']) if config['rate_limit'] else None
+
+class _Skipped(Exception):
+    pass
+
+def run_scenario(name, config, url, source_path, cafile=None):
+    """Run one scenario in the current process and return its metrics"""
+    pool = configure_pool(pool_size=config['pool_size'], http2=config['http2'],
+                          ssl_context=ssl.create_default_context(cafile=cafile) if cafile else None)
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    metrics = MetricsRecorder()
+    cpu_before = _cpu_time()
+    start = time.perf_counter()
+    try:
+        if name == "download":
+            latencies, nbytes, errors = _run_download(config, url, workdir, 1, metrics)
+        elif name == "download_segmented":
+            latencies, nbytes, errors = _run_download(config, url, workdir, config['segments'], metrics)
+        elif name == "extract":
+            latencies, nbytes, errors = _run_extract(config, url, workdir, source_path, metrics)
+        elif name == "batch":
+            latencies, nbytes, errors = _run_batch(config, url, workdir, metrics)
+        else:
+            raise ValueError(f"unknown scenario: {name}")
+    except _Skipped as e:
+        return {'skipped': str(e)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    wall_time = time.perf_counter() - start
+    return {
+        'runs': len(latencies),
+        'errors': errors,
+        'bytes': nbytes,
+        'wall_time': round(wall_time, 4),
+        'throughput_bytes_per_s': round(nbytes / wall_time, 1) if wall_time else None,
+        'latency_p50': _round(percentile(latencies, 50)),
+        'latency_p99': _round(percentile(latencies, 99)),
+        'cpu_time': round(_cpu_time() - cpu_before, 4),
+        'peak_rss_bytes': _peak_rss(),
+        'phases': metrics.summary(),
+        'connections': pool.stats(),
+    }
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(config):
+    """Start a media server, run the selected scenarios and return the report dict"""
+    certdir = tempfile.mkdtemp(prefix="bench-tls-") if config['https'] else None
+    certfile, keyfile = make_certificate(certdir) if certdir else (None, None)
+    server = MediaServer(throttle=config['throttle'], latency=config['latency'],
+                         error_rate=config['error_rate'], drop_rate=config['drop_rate'],
+                         certfile=certfile, keyfile=keyfile)
+    results = {}
+    try:
+        with server:
+            url = server.add_media(config['size'], config['codec'])
+            source_path = os.path.join(server.media_dir, os.path.basename(url))
+            media_size = os.path.getsize(source_path)
+            # A fresh process per scenario keeps peak RSS and CPU time separate
+            context = get_context("spawn")
+            for name in config['scenarios']:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    results[name] = executor.submit(run_scenario, name, config, url, source_path,
+                                                    certfile).result()
+    finally:
+        if certdir:
+            shutil.rmtree(certdir, ignore_errors=True)
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'ffmpeg': bool(get_ffmpeg_exe()),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            'media_size': media_size,
+        },
+        'config': config,
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark YouTube Downloader against a local media server")
+    parser.add_argument("--size", type=parse_size, default=parse_size("16M"),
+                        help="Synthetic media size, e.g. 512K, 16M (default: 16M)")
+    parser.add_argument("--codec", choices=("raw",) + tuple(CODECS), default="raw",
+                        help="Synthetic media codec; audio codecs need ffmpeg (default: raw bytes)")
+    parser.add_argument("--audio-format", default="mp3", help="Extraction target format (default: mp3)")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per scenario (default: 5)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel segments (default: 4)")
+    parser.add_argument("--batch-size", type=int, default=8, help="URLs per batch run (default: 8)")
+    parser.add_argument("--workers", type=int, default=4, help="Batch workers (default: 4)")
+    parser.add_argument("--throttle", type=parse_size, default=None,
+                        help="Per-connection bandwidth cap in bytes/s, e.g. 2M")
+    parser.add_argument("--rate-limit", type=parse_size, default=None,
+                        help="Global client-side bandwidth limit in bytes/s, e.g. 8M")
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay before each response in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of responses cut off half-way")
+    parser.add_argument("--https", action="store_true", help="Serve over HTTPS with a self-signed certificate")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help=f"Idle keep-alive connections per host; 0 disables reuse (default: {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 where httpx and h2 are installed")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    config = {
+        'size': args.size,
+        'codec': args.codec,
+        'audio_format': args.audio_format,
+        'iterations': args.iterations,
+        'segments': args.segments,
+        'batch_size': args.batch_size,
+        'workers': args.workers,
+        'throttle': args.throttle,
+        'rate_limit': args.rate_limit,
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'drop_rate': args.drop_rate,
+        'https': args.https,
+        'pool_size': args.pool_size,
+        'http2': args.http2,
+        'scenarios': args.scenarios,
+    }
+    report = json.dumps(run_benchmarks(config), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
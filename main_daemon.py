@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+YouTube Downloader headless service
+"""
+import argparse
+import signal
+
+from youtube_downloader.core.bandwidth import BandwidthScheduler
+from youtube_downloader.core.cache import get_default_cache
+from youtube_downloader.core.connections import DEFAULT_POOL_SIZE, configure_pool
+from youtube_downloader.core.daemon import DEFAULT_PORT, DaemonServer, DownloadService
+from youtube_downloader.core.jobstore import JobStore
+from youtube_downloader.core.metrics import MetricsRecorder
+from youtube_downloader.core.transfer import SegmentedDownloader
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run YouTube Downloader as a service with a local HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads (default: 4)")
+    parser.add_argument("--output-path", default=None, help="Download directory (default: current directory)")
+    parser.add_argument("--db", default=None, help="Job database (default: jobs.sqlite3 in the cache directory)")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Total bandwidth limit in bytes/s")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help=f"Idle keep-alive connections kept per host (default: {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 for transfers if httpx and h2 are installed")
+    args = parser.parse_args()
+
+    configure_pool(pool_size=args.pool_size, http2=args.http2)
+
+    service = DownloadService(
+        JobStore(args.db),
+        args.workers,
+        output_path=args.output_path,
+        cache=get_default_cache(),
+        transfer=SegmentedDownloader(),
+        bandwidth=BandwidthScheduler(args.rate_limit),
+        metrics=MetricsRecorder(),
+    ).start()
+    server = DaemonServer(service, args.host, args.port)
+    # Stop cleanly on SIGTERM as well, so running jobs are queued again
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"Listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import threading
+
+from youtube_downloader.core import aio
+from youtube_downloader.core.aio import AsyncDownloader
+
+URL = "https://www.youtube.com/watch?v=abcdefghijk"
+
+def test_concurrent_jobs_for_one_video_keep_their_files(tmp_path, monkeypatch):
+    barrier = threading.Barrier(2)
+
+    def download(url, output_path, progress_callback=None, audio_only=False):
+        name = "clip.m4a" if audio_only else "clip.mp4"
+        path = os.path.join(output_path, name)
+        with open(path, "wb") as f:
+            f.write(name.encode())
+        # Both jobs are in flight before either publishes
+        barrier.wait(5)
+        return (None, path) if audio_only else (path, None)
+
+    monkeypatch.setattr(aio, "download_video", download)
+
+    async def main():
+        downloader = AsyncDownloader(max_concurrency=2, output_path=str(tmp_path))
+        try:
+            return await asyncio.gather(downloader.download(URL), downloader.download(URL, audio_only=True))
+        finally:
+            downloader.shutdown()
+
+    video, audio = asyncio.run(main())
+    assert video == (str(tmp_path / "clip.mp4"), None)
+    assert audio == (None, str(tmp_path / "clip.m4a"))
+    assert sorted(os.listdir(tmp_path)) == ["clip.m4a", "clip.mp4"]
+
+def test_failed_job_reports_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(aio, "download_video", lambda url, output_path, progress_callback=None: (None, None))
+
+    async def main():
+        downloader = AsyncDownloader(output_path=str(tmp_path))
+        try:
+            return [job async for job in downloader.as_completed([URL])]
+        finally:
+            downloader.shutdown()
+
+    [job] = asyncio.run(main())
+    assert job.status == "failed"
+    assert job.error == "All download methods failed"
+    assert os.listdir(tmp_path) == []
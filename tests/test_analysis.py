@@ -0,0 +1,46 @@
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from youtube_downloader.core.analysis import SAMPLE_RATE, AudioAnalyzer, analyze_audio
+from youtube_downloader.core.ffmpeg import get_ffmpeg_exe
+
+def _tone(path, amplitude, seconds, leading_silence=0.0):
+    """997 Hz stereo sine; per BS.1770 it measures 20 * log10(amplitude) LUFS"""
+    exe = get_ffmpeg_exe()
+    if not exe:
+        pytest.skip("ffmpeg not available")
+    wave = f"{amplitude}*sin(2*PI*997*t)*gte(t,{leading_silence})"
+    subprocess.run(
+        [exe, "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-f", "lavfi",
+         "-i", f"aevalsrc=exprs='{wave}|{wave}':s={SAMPLE_RATE}:d={seconds}", "-c:a", "pcm_f32le", path],
+        check=True
+    )
+    return path
+
+def test_tone_loudness_and_peaks(tmp_path):
+    result = analyze_audio(_tone(str(tmp_path / "tone.wav"), 0.1, 10))
+    assert result['loudness'] == pytest.approx(-20.0, abs=0.1)
+    assert result['true_peak'] == pytest.approx(-20.0, abs=0.2)
+    assert result['sample_peak'] == pytest.approx(-20.0, abs=0.2)
+    assert result['track_gain'] == pytest.approx(2.0, abs=0.1)
+    assert result['duration'] == pytest.approx(10.0, abs=0.01)
+
+def test_leading_silence_is_located(tmp_path):
+    result = analyze_audio(_tone(str(tmp_path / "tone.wav"), 0.5, 5, leading_silence=1.0))
+    assert result['start'] == pytest.approx(1.0, abs=0.01)
+    assert result['end'] == pytest.approx(5.0, abs=0.01)
+    # Gating leaves the silent second out; blocks straddling the onset pull the
+    # tone's -6.0 LUFS down slightly, to the -6.2 ffmpeg's ebur128 filter reports
+    assert result['loudness'] == pytest.approx(-6.2, abs=0.1)
+
+def test_digital_silence_has_no_loudness():
+    analyzer = AudioAnalyzer(2)
+    silence = np.zeros((SAMPLE_RATE, 2), dtype=np.float32)
+    analyzer.feed(silence, silence)
+    result = analyzer.result()
+    assert result['loudness'] is None
+    assert result['track_gain'] is None
+    assert result['start'] is None
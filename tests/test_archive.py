@@ -0,0 +1,46 @@
+import os
+
+from youtube_downloader.core.archive import DownloadArchive
+
+def write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+def test_lookup_matches_kind_format_and_resolution(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive"))
+    archive.add("aaaaaaaaaaa", "video", write(tmp_path / "clip.mp4", b"video"), resolution="720p")
+    archive.add("aaaaaaaaaaa", "audio", write(tmp_path / "clip.mp3", b"audio"), "mp3")
+    entry = archive.lookup("aaaaaaaaaaa", "video", resolution="720p")
+    assert entry['filename'] == "clip.mp4"
+    assert entry['size'] == 5
+    assert archive.lookup("aaaaaaaaaaa", "video", resolution="1080p") is None
+    assert archive.lookup("aaaaaaaaaaa", "audio", "flac") is None
+    assert archive.lookup("bbbbbbbbbbb", "audio", "mp3") is None
+
+def test_identical_content_is_stored_once(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive"))
+    os.makedirs(tmp_path / "one")
+    os.makedirs(tmp_path / "two")
+    first = archive.add("aaaaaaaaaaa", "audio", write(tmp_path / "one" / "song.mp3", b"same"), "mp3")
+    second = archive.add("bbbbbbbbbbb", "audio", write(tmp_path / "two" / "song.mp3", b"same"), "mp3")
+    assert first == second
+    assert len(archive) == 2
+    objects = [name for _, _, names in os.walk(archive.objects_dir) for name in names]
+    assert objects == [f"{first}.mp3"]
+
+def test_materialize_places_file_into_any_output_dir(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive"))
+    archive.add("aaaaaaaaaaa", "audio", write(tmp_path / "song.mp3", b"audio"), "mp3")
+    entry = archive.lookup("aaaaaaaaaaa", "audio", "mp3")
+    path = archive.materialize(entry, str(tmp_path / "elsewhere"))
+    assert path == str(tmp_path / "elsewhere" / "song.mp3")
+    with open(path, "rb") as f:
+        assert f.read() == b"audio"
+
+def test_entries_whose_object_is_gone_are_dropped(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive"))
+    archive.add("aaaaaaaaaaa", "audio", write(tmp_path / "song.mp3", b"audio"), "mp3")
+    os.remove(archive.lookup("aaaaaaaaaaa", "audio", "mp3")['path'])
+    assert archive.lookup("aaaaaaaaaaa", "audio", "mp3") is None
+    assert len(archive) == 0
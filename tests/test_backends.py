@@ -0,0 +1,147 @@
+import itertools
+import os
+import threading
+import time
+import types
+
+import pytest
+
+from youtube_downloader.core import backends
+from youtube_downloader.core.backends import BackendRegistry
+from youtube_downloader.core.downloader import download_video
+from youtube_downloader.core.metrics import MetricsRecorder
+
+LINK = "https://www.youtube.com/watch?v=abcdefghijk"
+
+def failing(link, output_path, resolution, progress_callback):
+    raise IOError("unavailable")
+
+def empty(link, output_path, resolution, progress_callback):
+    return None
+
+def writer(name):
+    def download(link, output_path, resolution, progress_callback):
+        path = os.path.join(output_path, f"{name}.mp4")
+        with open(path, "wb") as f:
+            f.write(b"media")
+        return path
+    return download
+
+def stalled(link, output_path, resolution, progress_callback):
+    """Writes a partial file and reports no bytes until it is cancelled"""
+    with open(os.path.join(output_path, "stalled.mp4.part"), "wb") as f:
+        f.write(b"partial")
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        progress_callback("waiting")
+        time.sleep(0.01)
+    return None
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_ordered_prefers_recent_successes():
+    registry = BackendRegistry()
+    for name in ("a", "b", "c"):
+        registry.register(name, empty)
+    registry.record_success("c", ttfb=0.5, duration=1.0)
+    registry.record_failure("a")
+    assert registry.ordered() == ["c", "b", "a"]
+
+def test_faster_first_byte_breaks_ties():
+    registry = BackendRegistry()
+    registry.register("slow", empty)
+    registry.register("fast", empty)
+    registry.record_success("slow", ttfb=2.0, duration=3.0)
+    registry.record_success("fast", ttfb=0.1, duration=3.0)
+    assert registry.ordered() == ["fast", "slow"]
+
+def test_circuit_opens_after_failures_and_closes_after_cooldown(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(backends, "time", types.SimpleNamespace(time=lambda: clock.now, monotonic=time.monotonic))
+    registry = BackendRegistry(failure_threshold=2, cooldown=60)
+    registry.register("flaky", failing)
+    registry.register("steady", empty)
+    for _ in range(2):
+        with pytest.raises(IOError):
+            registry.attempt("flaky", LINK)
+    assert registry.stats()["flaky"]["circuit_open"]
+    assert registry.ordered() == ["steady"]
+    clock.now += 61
+    assert "flaky" in registry.ordered()
+    registry.record_success("flaky", ttfb=None, duration=1.0)
+    assert not registry.stats()["flaky"]["circuit_open"]
+
+def test_open_circuits_are_tried_when_nothing_else_is_left():
+    registry = BackendRegistry(failure_threshold=1)
+    registry.register("only", empty)
+    registry.record_failure("only")
+    assert registry.ordered() == ["only"]
+
+def test_hedged_winner_is_moved_and_loser_discarded(tmp_path):
+    registry = BackendRegistry()
+    registry.register("stalled", stalled)
+    registry.register("fast", writer("fast"))
+    outcome = {}
+    path = registry.hedged(["stalled", "fast"], LINK, str(tmp_path), hedge_after=0.05, outcome=outcome)
+    assert path == str(tmp_path / "fast.mp4")
+    assert outcome == {'backend': "fast", 'attempts': 2}
+    assert os.path.exists(path)
+    # The cancelled attempt's staging directory goes once it has stopped
+    assert wait_for(lambda: os.listdir(tmp_path) == ["fast.mp4"])
+    assert registry.stats()["fast"]["successes"] == 1
+
+def test_failed_hedge_keeps_partial_files_for_resume(tmp_path):
+    def partial_then_fail(link, output_path, resolution, progress_callback):
+        with open(os.path.join(output_path, "clip.mp4.part.json"), "w") as f:
+            f.write("{}")
+        raise IOError("connection reset")
+
+    registry = BackendRegistry()
+    registry.register("partial", partial_then_fail)
+    outcome = {}
+    assert registry.hedged(["partial"], LINK, str(tmp_path), hedge_after=1, outcome=outcome) is None
+    assert outcome == {'backend': None, 'attempts': 1}
+    [staging] = os.listdir(tmp_path)
+    assert os.listdir(tmp_path / staging) == ["clip.mp4.part.json"]
+
+def test_concurrent_hedged_downloads_of_one_link_do_not_share_staging(tmp_path):
+    barrier = threading.Barrier(2)
+    numbers = itertools.count(1)
+
+    def download(link, output_path, resolution, progress_callback):
+        number = next(numbers)
+        # Both attempts are in flight before either writes its file
+        barrier.wait(5)
+        path = os.path.join(output_path, f"clip{number}.mp4")
+        with open(path, "wb") as f:
+            f.write(f"copy {number}".encode())
+        return path
+
+    registry = BackendRegistry()
+    registry.register("writer", download)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        registry.hedged(["writer"], LINK, str(tmp_path), hedge_after=1))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [str(tmp_path / "clip1.mp4"), str(tmp_path / "clip2.mp4")]
+    assert wait_for(lambda: sorted(os.listdir(tmp_path)) == ["clip1.mp4", "clip2.mp4"])
+
+def test_hedged_download_records_winner_and_attempts(tmp_path):
+    registry = BackendRegistry()
+    registry.register("stalled", lambda link, output_path, resolution, callback, *args:
+                      stalled(link, output_path, resolution, callback))
+    registry.register("fast", lambda link, output_path, resolution, callback, *args:
+                      writer("fast")(link, output_path, resolution, callback))
+    metrics = MetricsRecorder()
+    video_path, _ = download_video(LINK, str(tmp_path), registry=registry, hedge_after=0.05, metrics=metrics)
+    assert video_path == str(tmp_path / "fast.mp4")
+    [job] = [record for record in metrics.records() if record['phase'] == "job"]
+    assert job['backend'] == "fast"
+    assert job['attempts'] == 2
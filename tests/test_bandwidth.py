@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from youtube_downloader.core.bandwidth import MIN_BURST, BandwidthScheduler, TokenBucket
+
+CHUNK = 64 * 1024
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeScheduler(BandwidthScheduler):
+    """Scheduler whose waits advance a fake clock instead of sleeping"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, clock=FakeClock(), **kwargs)
+
+    def _wait(self, timeout):
+        self._clock.now += timeout
+
+def test_unlimited_bucket_is_always_ready():
+    bucket = TokenBucket()
+    bucket.take(10 * 1024 * 1024)
+    assert bucket.ready(CHUNK)
+    assert bucket.delay(CHUNK) == 0.0
+
+def test_bucket_delay_covers_the_deficit():
+    bucket = TokenBucket(rate=1024 * 1024)
+    assert bucket.burst == max(1024 * 1024 / 4, MIN_BURST)
+    bucket.take(bucket.burst)
+    assert not bucket.ready(CHUNK)
+    assert abs(bucket.delay(CHUNK) - CHUNK / (1024 * 1024)) < 1e-6
+
+def test_global_rate_is_enforced():
+    rate = 2 * 1024 * 1024
+    scheduler = FakeScheduler(rate)
+    job = scheduler.job()
+    total = 3 * 1024 * 1024
+    for _ in range(total // CHUNK):
+        job.consume(CHUNK)
+    # The initial burst is free, the rest arrives at the rate
+    expected = (total - scheduler._bucket.burst) / rate
+    assert scheduler._clock.now == pytest.approx(expected, rel=0.01)
+
+def test_per_job_limit_applies_without_global_limit():
+    scheduler = FakeScheduler()
+    job = scheduler.job(rate=1024 * 1024)
+    for _ in range(16):
+        job.consume(CHUNK)
+    # 1 MiB at 1 MiB/s, less the 256 KiB burst
+    assert scheduler._clock.now == pytest.approx(0.75, rel=0.01)
+
+def test_rate_change_takes_effect_on_next_chunk():
+    scheduler = FakeScheduler(1024 * 1024)
+    job = scheduler.job()
+    job.consume(scheduler._bucket.burst)
+    scheduler.set_rate(4 * 1024 * 1024, burst=MIN_BURST)
+    start = scheduler._clock.now
+    job.consume(CHUNK)
+    assert scheduler._clock.now - start == pytest.approx(CHUNK / (4 * 1024 * 1024), rel=0.01)
+
+def test_competing_jobs_share_by_priority_weight():
+    scheduler = BandwidthScheduler(4 * 1024 * 1024)
+    interactive = scheduler.job(priority="interactive")
+    bulk = scheduler.job(priority="bulk")
+    stop = threading.Event()
+
+    def pump(job):
+        while not stop.is_set():
+            job.consume(CHUNK)
+
+    threads = [threading.Thread(target=pump, args=(job,)) for job in (interactive, bulk)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    # Measure after the initial burst, while both jobs are backlogged
+    before = interactive.bytes, bulk.bytes
+    time.sleep(1.5)
+    share = (interactive.bytes - before[0]) / max(bulk.bytes - before[1], 1)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    # Weights are 8:1; the bounds leave room for a loaded machine
+    assert 3 < share < 25
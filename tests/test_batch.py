@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from youtube_downloader.core.archive import DownloadArchive
+from youtube_downloader.core.batch import BatchDownloader, get_host
+
+URL = "https://www.youtube.com/watch?v=abcdefghijk"
+
+def test_hosts_are_normalized():
+    assert get_host("https://www.youtube.com/watch?v=abcdefghijk") == "youtube.com"
+    assert get_host("https://youtu.be/abcdefghijk") == "youtube.com"
+    assert get_host("https://music.youtube.com/watch?v=abcdefghijk") == "youtube.com"
+    assert get_host("https://user@vimeo.com:443/1") == "vimeo.com"
+
+def test_per_host_limit_caps_concurrent_jobs_per_host():
+    lock = threading.Lock()
+    running = {}
+    peaks = {}
+    peak_total = [0]
+
+    def download(url, progress_callback=None):
+        host = get_host(url)
+        with lock:
+            running[host] = running.get(host, 0) + 1
+            peaks[host] = max(peaks.get(host, 0), running[host])
+            peak_total[0] = max(peak_total[0], sum(running.values()))
+        time.sleep(0.05)
+        with lock:
+            running[host] -= 1
+        return url, None
+
+    urls = [f"https://youtu.be/video{n:06d}" for n in range(8)] + [f"https://vimeo.com/{n}" for n in range(8)]
+    jobs = list(BatchDownloader(max_workers=6, per_host_limit=2, download_func=download).run(urls))
+    assert len(jobs) == 16 and all(job.ok for job in jobs)
+    assert peaks == {"youtube.com": 2, "vimeo.com": 2}
+    assert peak_total[0] == 4
+
+def test_failed_jobs_are_yielded_with_their_error():
+    def download(url, progress_callback=None):
+        if "bad" in url:
+            raise IOError("boom")
+        return url, None
+
+    jobs = {job.url: job for job in BatchDownloader(download_func=download).run(["https://a/ok", "https://a/bad"])}
+    assert jobs["https://a/ok"].ok
+    assert jobs["https://a/bad"].status == "failed"
+    assert jobs["https://a/bad"].error == "boom"
+
+class InlineTranscoder:
+    """Stands in for TranscodePool, converting in the calling thread"""
+    def __init__(self):
+        self.calls = 0
+
+    def submit(self, source_path, audio_format="mp3", audio_only=False, analyze=False, trim_silence=False):
+        self.calls += 1
+        audio_path = os.path.splitext(source_path)[0] + f".{audio_format}"
+        with open(audio_path, "wb") as f:
+            f.write(b"audio")
+        future = Future()
+        future.set_result((audio_path, []))
+        return future
+
+@pytest.mark.parametrize("audio_only", [True, False])
+def test_offloaded_audio_is_served_from_archive(tmp_path, audio_only):
+    calls = []
+
+    def download(url, output_path=None, audio_only=False, **options):
+        calls.append(options)
+        path = os.path.join(output_path, "clip.webm")
+        with open(path, "wb") as f:
+            f.write(b"source")
+        return (None, path) if audio_only else (path, None)
+
+    archive = DownloadArchive(str(tmp_path / "archive"))
+    transcoder = InlineTranscoder()
+    for run in range(2):
+        output_path = str(tmp_path / f"out{run}")
+        os.makedirs(output_path)
+        downloader = BatchDownloader(download_func=download, transcoder=transcoder, archive=archive,
+                                     output_path=output_path, audio_only=audio_only,
+                                     extract_audio_option=not audio_only, audio_format="mp3")
+        [job] = downloader.run([URL])
+        assert job.ok
+        assert job.audio_path == os.path.join(output_path, "clip.mp3")
+    # The fake download does not archive the video, so an extract job fetches it again
+    assert len(calls) == (1 if audio_only else 2)
+    assert transcoder.calls == 1
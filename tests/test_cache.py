@@ -0,0 +1,50 @@
+import time
+import types
+
+from youtube_downloader.core import cache as cache_module
+from youtube_downloader.core.cache import EXPIRY_MARGIN, ManifestCache
+
+def streams(expire=None):
+    query = f"?expire={int(expire)}" if expire else ""
+    return [{'itag': "18", 'url': f"https://media/18{query}"}]
+
+def test_entry_expires_with_its_stream_urls(tmp_path, monkeypatch):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite3"))
+    now = time.time()
+    cache.put("aaaaaaaaaaa", "Title", 60, streams(now + EXPIRY_MARGIN + 30))
+    entry = cache.get("aaaaaaaaaaa")
+    assert entry['title'] == "Title"
+    assert entry['expires_at'] == int(now + EXPIRY_MARGIN + 30) - EXPIRY_MARGIN
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now + 31))
+    assert cache.get("aaaaaaaaaaa") is None
+    assert len(cache) == 0
+
+def test_urls_about_to_expire_are_not_cached(tmp_path):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("aaaaaaaaaaa", "Title", 60, streams(time.time() + EXPIRY_MARGIN - 1))
+    assert cache.get("aaaaaaaaaaa") is None
+
+def test_default_ttl_caps_entries_without_expiry(tmp_path, monkeypatch):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite3"), default_ttl=EXPIRY_MARGIN + 60)
+    now = time.time()
+    cache.put("aaaaaaaaaaa", "Title", 60, streams())
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now + 59))
+    assert cache.get("aaaaaaaaaaa") is not None
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now + 61))
+    assert cache.get("aaaaaaaaaaa") is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache = ManifestCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    clock = [time.time()]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: clock[0]))
+    for video_id in ("aaaaaaaaaaa", "bbbbbbbbbbb"):
+        cache.put(video_id, video_id, 60, streams())
+        clock[0] += 1
+    # Reading the older entry makes the other one least recently used
+    assert cache.get("aaaaaaaaaaa") is not None
+    clock[0] += 1
+    cache.put("ccccccccccc", "c", 60, streams())
+    assert len(cache) == 2
+    assert cache.get("bbbbbbbbbbb") is None
+    assert cache.get("aaaaaaaaaaa") is not None
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'entries': 2}
@@ -0,0 +1,92 @@
+import shutil
+import ssl
+import time
+
+import pytest
+
+from benchmarks.media_server import MediaRequestHandler, MediaServer, make_certificate
+from youtube_downloader.core.connections import ConnectionPool
+
+SIZE = 256 * 1024
+
+class ShortKeepAliveHandler(MediaRequestHandler):
+    # The server drops connections idle for longer than this
+    timeout = 0.2
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    if not shutil.which("openssl"):
+        pytest.skip("openssl not available")
+    return make_certificate(str(tmp_path_factory.mktemp("tls")))
+
+@pytest.fixture
+def server(certificate):
+    with MediaServer(certfile=certificate[0], keyfile=certificate[1]) as server:
+        yield server
+
+def make_pool(certificate, **options):
+    return ConnectionPool(ssl_context=ssl.create_default_context(cafile=certificate[0]), **options)
+
+def fetch(pool, url):
+    """Read the body in chunks, as the transfer layer does, so a cut-off body reads short"""
+    data = b""
+    with pool.open(url) as response:
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                return data
+            data += chunk
+
+def test_sequential_requests_reuse_one_connection(server, certificate):
+    url = server.add_media(SIZE)
+    pool = make_pool(certificate)
+    for _ in range(4):
+        assert len(fetch(pool, url)) == SIZE
+    stats = pool.stats()
+    assert stats['new_connections'] == 1
+    assert stats['reused'] == 3
+    assert stats['hit_rate'] == 0.75
+    assert stats['tls_handshakes'] == 1
+    assert stats['idle_connections'] == 1
+
+def test_truncated_response_is_not_pooled(server, certificate):
+    url = server.add_media(SIZE)
+    pool = make_pool(certificate)
+    server.drop_rate = 1.0
+    assert len(fetch(pool, url)) < SIZE
+    assert pool.stats()['idle_connections'] == 0
+    server.drop_rate = 0.0
+    assert len(fetch(pool, url)) == SIZE
+    stats = pool.stats()
+    assert stats['new_connections'] == 2
+    assert stats['reused'] == 0
+
+def test_stale_idle_connection_is_retried_on_a_fresh_socket(server, certificate):
+    url = server.add_media(SIZE)
+    server.RequestHandlerClass = ShortKeepAliveHandler
+    pool = make_pool(certificate)
+    fetch(pool, url)
+    time.sleep(0.5)
+    assert len(fetch(pool, url)) == SIZE
+    stats = pool.stats()
+    assert stats['stale_retries'] == 1
+    assert stats['new_connections'] == 2
+
+def test_second_lookup_is_a_dns_cache_hit(server, certificate):
+    url = server.add_media(SIZE)
+    pool = make_pool(certificate, pool_size=0)
+    fetch(pool, url)
+    fetch(pool, url)
+    stats = pool.stats()
+    assert (stats['dns_misses'], stats['dns_hits']) == (1, 1)
+    assert stats['dns_hit_rate'] == 0.5
+
+def test_zero_pool_size_disables_reuse(server, certificate):
+    url = server.add_media(SIZE)
+    pool = make_pool(certificate, pool_size=0)
+    for _ in range(3):
+        assert len(fetch(pool, url)) == SIZE
+    stats = pool.stats()
+    assert stats['new_connections'] == 3
+    assert stats['reused'] == 0
+    assert stats['idle_connections'] == 0
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from youtube_downloader.core import daemon
+from youtube_downloader.core.daemon import DaemonServer, DownloadService
+from youtube_downloader.core.jobstore import JobStore
+
+def fake_download(url, output_path=None, progress_callback=None, **options):
+    """Reports progress; "stall" URLs keep going until cancelled"""
+    for step in range(1, 4):
+        progress_callback(f"step {step}")
+        time.sleep(0.01)
+    while "stall" in url:
+        progress_callback("still waiting")
+        time.sleep(0.01)
+    return f"{output_path}/video.mp4", None
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "download_video", fake_download)
+    service = DownloadService(JobStore(str(tmp_path / "jobs.sqlite3")), max_workers=2,
+                              output_path=str(tmp_path)).start()
+    server = DaemonServer(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+def request(method, url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    with urllib.request.urlopen(urllib.request.Request(url, data, method=method), timeout=10) as response:
+        return response.status, response.read()
+
+def wait_for_status(api, job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = json.loads(request("GET", f"{api}/jobs/{job_id}")[1])
+        if job['status'] in statuses or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+def test_submit_runs_job_and_streams_events(api, tmp_path):
+    status, body = request("POST", f"{api}/jobs", {'url': "https://youtu.be/aaaaaaaaaaa",
+                                                   'options': {'audio_only': True, 'output_path': "/etc"}})
+    assert status == 201
+    [job] = json.loads(body)['jobs']
+    # Only per-job options are taken from the client
+    assert job['options'] == {'audio_only': True}
+    lines = [json.loads(line) for line in request("GET", f"{api}/jobs/{job['id']}/events")[1].splitlines()]
+    assert lines[0]['event'] == "status"
+    assert lines[-1]['event'] == "finished"
+    assert lines[-1]['job']['status'] == "done"
+    assert lines[-1]['job']['video_path'] == f"{tmp_path}/video.mp4"
+
+def test_cancel_stops_a_running_job(api):
+    _, body = request("POST", f"{api}/jobs", {'url': "https://youtu.be/stallstall1"})
+    job_id = json.loads(body)['jobs'][0]['id']
+    assert wait_for_status(api, job_id, ("running",))['status'] == "running"
+    status, body = request("DELETE", f"{api}/jobs/{job_id}")
+    assert status == 200
+    assert wait_for_status(api, job_id, ("cancelled",))['status'] == "cancelled"
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request("DELETE", f"{api}/jobs/{job_id}")
+    assert error.value.code == 409
+
+def test_bad_requests_are_rejected(api):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request("POST", f"{api}/jobs", {'urls': []})
+    assert error.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request("GET", f"{api}/jobs/999")
+    assert error.value.code == 404
+    health = json.loads(request("GET", f"{api}/health")[1])
+    assert health['status'] == "ok"
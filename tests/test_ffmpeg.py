@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from benchmarks.media_server import make_media
+from youtube_downloader.core import ffmpeg as ffmpeg_module
+from youtube_downloader.core.downloader import audio_target_paths
+from youtube_downloader.core.ffmpeg import extract_audio_outputs_ffmpeg, get_ffmpeg_exe, probe_audio
+
+TARGETS = [("mp3", "320k"), ("mp3", "128k"), ("opus", None)]
+
+def test_target_paths_carry_bitrates_only_when_needed():
+    assert audio_target_paths("/music/song.webm", TARGETS + [("webm", "96k")]) == [
+        "/music/song.320k.mp3", "/music/song.128k.mp3", "/music/song.opus", "/music/song.96k.webm",
+    ]
+    assert audio_target_paths("/music/song.webm", [("mp3", "320k")]) == ["/music/song.mp3"]
+
+def test_all_targets_come_from_one_ffmpeg_run(tmp_path, monkeypatch):
+    if not get_ffmpeg_exe():
+        pytest.skip("ffmpeg not available")
+    source_path = str(tmp_path / "song.webm")
+    os.replace(make_media(str(tmp_path), 64 * 1024, codec="opus"), source_path)
+    runs = []
+    run_ffmpeg = ffmpeg_module.run_ffmpeg
+    monkeypatch.setattr(ffmpeg_module, "run_ffmpeg", lambda args: runs.append(args) or run_ffmpeg(args))
+
+    paths = audio_target_paths(source_path, TARGETS)
+    outputs = [(path, audio_format, bitrate) for path, (audio_format, bitrate) in zip(paths, TARGETS)]
+    modes = extract_audio_outputs_ffmpeg(source_path, outputs)
+
+    assert len(runs) == 1
+    assert [arg for arg in runs[0] if arg in paths] == paths
+    assert modes == ["transcode", "transcode", "copy"]
+    assert [os.path.basename(path) for path in paths] == ["song.320k.mp3", "song.128k.mp3", "song.opus"]
+    assert [(probe['codec'], probe['bitrate']) for probe in map(probe_audio, paths[:2])] == [
+        ("mp3", "320k"), ("mp3", "128k"),
+    ]
+    assert probe_audio(paths[2])['codec'] == "opus"
@@ -0,0 +1,63 @@
+import threading
+
+from youtube_downloader.core.jobstore import JobStore
+
+def test_claim_hands_out_oldest_queued_job_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    first = store.add("https://youtu.be/aaaaaaaaaaa", {'audio_only': True})
+    second = store.add("https://youtu.be/bbbbbbbbbbb")
+    job = store.claim()
+    assert job['id'] == first
+    assert job['status'] == "running"
+    assert job['options'] == {'audio_only': True}
+    assert store.claim()['id'] == second
+    assert store.claim() is None
+
+def test_recover_requeues_jobs_running_at_a_crash(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    done = store.add("https://youtu.be/aaaaaaaaaaa")
+    interrupted = store.add("https://youtu.be/bbbbbbbbbbb")
+    queued = store.add("https://youtu.be/ccccccccccc")
+    store.claim()
+    store.finish(done, "done", audio_path=["a.mp3", "a.flac"])
+    store.claim()
+    # The process dies without finishing or requeueing the running job
+    store.close()
+
+    store = JobStore(path)
+    assert store.counts() == {'done': 1, 'running': 1, 'queued': 1}
+    assert store.recover() == 1
+    assert store.get(interrupted)['started_at'] is None
+    assert [store.claim()['id'], store.claim()['id']] == [interrupted, queued]
+    assert store.get(done)['audio_path'] == ["a.mp3", "a.flac"]
+
+def test_cancel_only_applies_to_queued_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    running = store.add("https://youtu.be/aaaaaaaaaaa")
+    queued = store.add("https://youtu.be/bbbbbbbbbbb")
+    store.claim()
+    assert not store.cancel(running)
+    assert store.cancel(queued)
+    assert store.get(queued)['status'] == "cancelled"
+
+def test_two_stores_on_one_file_never_claim_the_same_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    stores = [JobStore(path), JobStore(path)]
+    job_ids = {stores[0].add(f"https://youtu.be/video{n:06d}") for n in range(300)}
+    claims = [[], []]
+
+    def drain(store, claimed):
+        while True:
+            job = store.claim()
+            if job is None:
+                return
+            claimed.append(job['id'])
+
+    threads = [threading.Thread(target=drain, args=args) for args in zip(stores, claims)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claims[0] + claims[1]) == sorted(job_ids)
+    assert stores[1].counts() == {'running': 300}
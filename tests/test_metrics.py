@@ -0,0 +1,75 @@
+import json
+import pstats
+import types
+
+import pytest
+
+from youtube_downloader.core import metrics as metrics_module
+from youtube_downloader.core.metrics import MetricsRecorder, PhaseTimer, profile_job
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(metrics_module, "time", types.SimpleNamespace(
+        time=lambda: 1700000000.0, perf_counter=lambda: clock.now))
+    return clock
+
+def test_phases_are_recorded_as_json_lines(tmp_path, clock):
+    jsonl_path = tmp_path / "metrics.jsonl"
+    recorder = MetricsRecorder(jsonl_path=str(jsonl_path))
+    timer = PhaseTimer(recorder, backend="pytubefix", job="https://youtu.be/abc")
+    timer.start("download")
+    clock.now += 2.5
+    timer.start("convert")
+    clock.now += 0.5
+    timer.stop(error=RuntimeError("ffmpeg failed"), nbytes=42)
+    timer.stop()
+
+    records = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert records == recorder.records()
+    assert [(r['phase'], r['duration'], r['status'], r['error'], r['bytes']) for r in records] == [
+        ("download", 2.5, "ok", None, None),
+        ("convert", 0.5, "error", "ffmpeg failed", 42),
+    ]
+    assert all(r['backend'] == "pytubefix" and r['job'] == "https://youtu.be/abc" for r in records)
+    assert all(r['time'] == 1700000000.0 for r in records)
+    assert recorder.records(job="https://youtu.be/other") == []
+
+def test_timer_without_recorder_is_a_no_op(clock):
+    timer = PhaseTimer(None)
+    timer.start("download")
+    timer.stop(error="failed")
+
+def test_prometheus_totals_per_phase_backend_and_status(tmp_path, clock):
+    recorder = MetricsRecorder()
+    recorder.record("download", 1.5, backend="pytubefix", nbytes=1000)
+    recorder.record("download", 0.5, backend="pytubefix", nbytes=500)
+    recorder.record("download", 3.0, backend="yt-dlp", error="HTTP Error 403")
+    prom_path = tmp_path / "youtube_downloader.prom"
+    recorder.write_prometheus(str(prom_path))
+
+    lines = prom_path.read_text().splitlines()
+    assert [path.name for path in tmp_path.iterdir()] == ["youtube_downloader.prom"]
+    assert "# TYPE youtube_downloader_phase_seconds summary" in lines
+    assert "# TYPE youtube_downloader_phase_bytes_total counter" in lines
+    ok = 'phase="download",backend="pytubefix",status="ok"'
+    failed = 'phase="download",backend="yt-dlp",status="error"'
+    assert f"youtube_downloader_phase_seconds_sum{{{ok}}} 2.000000" in lines
+    assert f"youtube_downloader_phase_seconds_count{{{ok}}} 2" in lines
+    assert f"youtube_downloader_phase_bytes_total{{{ok}}} 1500" in lines
+    assert f"youtube_downloader_phase_seconds_sum{{{failed}}} 3.000000" in lines
+    assert f"youtube_downloader_phase_seconds_count{{{failed}}} 1" in lines
+    assert f"youtube_downloader_phase_bytes_total{{{failed}}} 0" in lines
+
+def test_profile_job_writes_profile_and_allocations(tmp_path):
+    prefix = tmp_path / "job"
+    with profile_job(str(prefix)):
+        blocks = [bytearray(1024) for _ in range(100)]
+    assert len(blocks) == 100
+
+    stats = pstats.Stats(f"{prefix}.prof")
+    assert stats.total_calls > 0
+    report = (tmp_path / "job.tracemalloc.txt").read_text()
+    peak = int(report.splitlines()[1].split()[1])
+    assert report.startswith("current: ")
+    assert peak >= 100 * 1024
@@ -0,0 +1,51 @@
+import threading
+
+from youtube_downloader.core.partial import PartialDownload
+
+def test_add_merges_adjacent_and_overlapping_ranges():
+    state = PartialDownload("file", "id", 100)
+    state.add(10, 19)
+    state.add(0, 9)
+    state.add(15, 29)
+    state.add(50, 59)
+    assert state.completed == [[0, 29], [50, 59]]
+    assert state.bytes_done == 40
+
+def test_missing_splits_ranges_around_written_data():
+    state = PartialDownload("file", "id", 100, completed=[[10, 19], [40, 49]])
+    assert state.missing([(0, 49), (50, 99)]) == [(0, 9), (20, 39), (50, 99)]
+    assert state.missing([(10, 19)]) == []
+
+def test_state_round_trips_through_sidecar(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    state = PartialDownload(path, "abc:18", 100, etag='"1"')
+    open(state.part_path, "wb").close()
+    state.add(0, 49)
+    state.save()
+    loaded = PartialDownload.load(path)
+    assert loaded.completed == [[0, 49]]
+    assert loaded.matches("abc:18", 100, '"1"')
+    assert not loaded.matches("abc:18", 100, '"2"')
+    assert not loaded.matches("abc:22", 100)
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    path = str(tmp_path / "video.mp4")
+    state = PartialDownload(path, "abc:18", 4000)
+    open(state.part_path, "wb").close()
+    errors = []
+
+    def save(offset):
+        try:
+            for i in range(200):
+                state.add(offset + i, offset + i)
+                state.save()
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(n * 1000,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert PartialDownload.load(path).bytes_done == 800
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from benchmarks.media_server import MediaServer
+from youtube_downloader.core.ffmpeg import get_ffmpeg_exe, probe_audio
+from youtube_downloader.core.pipeline import stream_transcode
+
+@pytest.fixture
+def server():
+    if not get_ffmpeg_exe():
+        pytest.skip("ffmpeg not available")
+    with MediaServer() as server:
+        yield server
+
+def _source_size(server, url):
+    return os.path.getsize(os.path.join(server.media_dir, os.path.basename(url)))
+
+def test_stream_is_encoded_while_downloading(server, tmp_path):
+    url = server.add_media(256 * 1024, codec="opus")
+    audio_path = str(tmp_path / "song.mp3")
+    progress = []
+    timings = stream_transcode(url, audio_path, "mp3", total_size=_source_size(server, url),
+                               chunk_size=16 * 1024, max_buffered_chunks=2, progress_callback=progress.append)
+    assert timings['bytes'] == _source_size(server, url)
+    assert timings['total'] >= timings['transfer'] >= 0
+    assert len(progress) > 1
+    assert probe_audio(audio_path)['codec'] == "mp3"
+
+def test_fitting_codec_is_copied_unless_a_bitrate_is_requested(server, tmp_path):
+    url = server.add_media(128 * 1024, codec="mp3", bitrate=128)
+    copied = str(tmp_path / "copied.mp3")
+    stream_transcode(url, copied, "mp3", codec="mp3")
+    assert probe_audio(copied)['bitrate'] == "128k"
+    encoded = str(tmp_path / "encoded.mp3")
+    stream_transcode(url, encoded, "mp3", codec="mp3", bitrate="64k")
+    assert probe_audio(encoded)['bitrate'] == "64k"
+
+def test_failed_encode_leaves_no_output(server, tmp_path):
+    url = server.add_media(64 * 1024)
+    audio_path = str(tmp_path / "song.mp3")
+    with pytest.raises(RuntimeError):
+        stream_transcode(url, audio_path, "mp3")
+    assert not os.path.exists(audio_path)
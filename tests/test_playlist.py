@@ -0,0 +1,31 @@
+import pytest
+
+from youtube_downloader.core.playlist import _entry_date, is_playlist_url
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/playlist?list=PLabcdefghijklmnop",
+    "https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv",
+    "https://www.youtube.com/@someone/videos",
+    "https://www.youtube.com/c/someone",
+    "https://music.youtube.com/playlist?list=OLAK5uy_abcdefghijk",
+])
+def test_playlists_and_channels(url):
+    assert is_playlist_url(url)
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=abcdefghijk",
+    "https://www.youtube.com/watch?v=abcdefghijk&list=PLabcdefghijklmnop",
+    "https://www.youtube.com/watch?list=PLabcdefghijklmnop&v=abcdefghijk",
+    "https://youtu.be/abcdefghijk?list=PLabcdefghijklmnop",
+    "https://music.youtube.com/watch?list=OLAK5uy_abcdefghijk&v=abcdefghijk",
+    "https://www.youtube.com/shorts/abcdefghijk",
+])
+def test_videos_within_playlists_are_single_videos(url):
+    assert not is_playlist_url(url)
+
+def test_entry_date_from_timestamp_is_utc():
+    # 2024-01-01 23:30 UTC is already January 2nd east of Greenwich
+    assert _entry_date({'timestamp': 1704151800}) == "20240101"
+    assert _entry_date({'release_timestamp': 1704151800}) == "20240101"
+    assert _entry_date({'upload_date': "20230505", 'timestamp': 1704151800}) == "20230505"
+    assert _entry_date({}) is None
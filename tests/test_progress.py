@@ -0,0 +1,37 @@
+import types
+
+from youtube_downloader.core import progress as progress_module
+from youtube_downloader.core.progress import ProgressEvent, RateLimitedCallback, rate_limited
+
+def byte_event(done, total=100):
+    return ProgressEvent("download", bytes_done=done, bytes_total=total)
+
+def test_byte_events_are_coalesced_to_max_rate(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(progress_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    received = []
+    callback = RateLimitedCallback(received.append, max_rate=8)
+    # 50 events 1/64 s apart, eight per allowed event
+    for done in range(50):
+        callback(byte_event(done))
+        clock.now += 1 / 64
+    assert [event.bytes_done for event in received] == [0, 8, 16, 24, 32, 40, 48]
+
+def test_final_and_text_messages_always_pass(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(progress_module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    received = []
+    callback = RateLimitedCallback(received.append, max_rate=1)
+    callback(byte_event(10))
+    callback(byte_event(20))
+    callback("Attempting download with yt-dlp...")
+    callback(byte_event(100))
+    assert received == ["Progress: 10%", "Attempting download with yt-dlp...", "Progress: 100%"]
+    assert received[-1].is_final
+
+def test_rate_limited_wraps_only_once():
+    callback = rate_limited(print, 10)
+    assert isinstance(callback, RateLimitedCallback)
+    assert rate_limited(callback, 5) is callback
+    assert rate_limited(print, None) is print
+    assert rate_limited(None, 10) is None
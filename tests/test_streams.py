@@ -0,0 +1,66 @@
+from youtube_downloader.core.streams import StreamSelector
+
+def video(itag, resolution, filesize=None, ext="mp4", audio_codec="mp4a.40.2", progressive=True):
+    return {
+        'itag': itag, 'url': f"https://media/{itag}", 'ext': ext, 'mime_type': f"video/{ext}",
+        'resolution': resolution, 'abr': None, 'filesize': filesize, 'bitrate': None,
+        'audio_codec': audio_codec if progressive else None, 'video_codec': "avc1",
+        'only_audio': False, 'is_progressive': progressive, 'protocol': "https", 'headers': None,
+    }
+
+def audio(itag, abr, codec, ext):
+    return {
+        'itag': itag, 'url': f"https://media/{itag}", 'ext': ext, 'mime_type': f"audio/{ext}",
+        'resolution': None, 'abr': abr, 'filesize': None, 'bitrate': None,
+        'audio_codec': codec, 'video_codec': None,
+        'only_audio': True, 'is_progressive': False, 'protocol': "https", 'headers': None,
+    }
+
+STREAMS = [video("18", "360p", 10_000_000), video("22", "720p", 40_000_000), video("37", "1080p", 90_000_000)]
+
+def test_exact_resolution_wins():
+    choice = StreamSelector().choose(STREAMS, "720p")
+    assert choice['stream']['itag'] == "22"
+    assert "matches 720p" in choice['reason']
+
+def test_missing_resolution_falls_back_to_nearest_below():
+    choice = StreamSelector().choose(STREAMS, "480p")
+    assert choice['stream']['itag'] == "18"
+    assert "480p not available, nearest below" in choice['reason']
+
+def test_nothing_below_takes_nearest_above():
+    assert StreamSelector().choose(STREAMS, "240p")['stream']['itag'] == "18"
+
+def test_no_target_takes_highest_resolution():
+    assert StreamSelector().choose(STREAMS)['stream']['itag'] == "37"
+
+def test_budget_excludes_larger_streams():
+    choice = StreamSelector(max_bytes=50_000_000).choose(STREAMS, "1080p")
+    assert choice['stream']['itag'] == "22"
+    assert "1080p over budget" in choice['reason']
+
+def test_nothing_in_budget_takes_smallest():
+    choice = StreamSelector(max_bytes=1_000_000).choose(STREAMS, "1080p")
+    assert choice['stream']['itag'] == "18"
+    assert "smallest available" in choice['reason']
+
+def test_copyable_audio_breaks_resolution_ties():
+    streams = [video("43", "360p", 5_000_000, ext="webm", audio_codec="opus"), video("18", "360p", 9_000_000)]
+    assert StreamSelector(audio_format="m4a").choose(streams, "360p")['stream']['itag'] == "18"
+    assert StreamSelector().choose(streams, "360p")['stream']['itag'] == "43"
+
+def test_merge_pairs_video_only_with_fitting_audio():
+    streams = [video("137", "1080p", 80_000_000, progressive=False), video("18", "360p", 10_000_000),
+               audio("251", "160kbps", "opus", "webm"), audio("140", "128kbps", "mp4a.40.2", "m4a")]
+    choice = StreamSelector().choose(streams, "1080p", merge=True)
+    assert choice['stream']['itag'] == "137"
+    assert choice['audio']['itag'] == "140"
+
+def test_audio_ranking_and_reason():
+    streams = [audio("140", "128kbps", "mp4a.40.2", "m4a"), audio("251", "160kbps", "opus", "webm")]
+    highest = StreamSelector(audio_format="mp3").choose(streams, audio_only=True)
+    assert highest['stream']['itag'] == "251"
+    assert highest['reason'].endswith("highest bitrate")
+    copyable = StreamSelector(audio_format="m4a").choose(streams, audio_only=True)
+    assert copyable['stream']['itag'] == "140"
+    assert "highest bitrate that can be stream-copied to m4a" in copyable['reason']
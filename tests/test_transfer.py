@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from benchmarks.media_server import MediaRequestHandler, MediaServer
+from youtube_downloader.core.connections import ConnectionPool
+from youtube_downloader.core.partial import PartialDownload
+from youtube_downloader.core.transfer import SegmentedDownloader, probe_url
+
+SIZE = 3 * 1024 * 1024 + 12345
+
+class Interrupted(Exception):
+    pass
+
+class NoRangeHandler(MediaRequestHandler):
+    """Serves whole files only, like a host without Range support"""
+    def _serve(self, send_body):
+        del self.headers["Range"]
+        super()._serve(send_body)
+
+@pytest.fixture
+def server():
+    with MediaServer() as server:
+        yield server
+
+def _source(server, url):
+    with open(os.path.join(server.media_dir, os.path.basename(url)), "rb") as f:
+        return f.read()
+
+def test_probe_reports_size_and_range_support(server):
+    url = server.add_media(SIZE)
+    remote = probe_url(url, pool=ConnectionPool())
+    assert remote['size'] == SIZE
+    assert remote['ranges']
+
+def test_segmented_download_is_byte_identical(server, tmp_path):
+    url = server.add_media(SIZE)
+    path = str(tmp_path / "media.bin")
+    downloader = SegmentedDownloader(segments=4, segment_size=512 * 1024, resume=False, pool=ConnectionPool())
+    assert downloader.download(url, path) == path
+    with open(path, "rb") as f:
+        assert f.read() == _source(server, url)
+    assert not os.path.exists(path + ".part")
+
+def test_interrupted_download_resumes_missing_ranges_only(server, tmp_path):
+    url = server.add_media(SIZE)
+    path = str(tmp_path / "media.bin")
+
+    def interrupt(event):
+        if event.bytes_done >= SIZE // 2:
+            raise Interrupted()
+
+    pool = ConnectionPool()
+    with pytest.raises(Interrupted):
+        SegmentedDownloader(segments=1, segment_size=256 * 1024, pool=pool).download(
+            url, path, progress_callback=interrupt)
+    state = PartialDownload.load(path)
+    assert state is not None and 0 < state.bytes_done < SIZE
+
+    messages = []
+    SegmentedDownloader(segments=4, segment_size=256 * 1024, pool=pool).download(
+        url, path, progress_callback=messages.append)
+    assert any(str(message).startswith("Resuming download at byte") for message in messages)
+    with open(path, "rb") as f:
+        assert f.read() == _source(server, url)
+    assert not os.path.exists(path + ".part.json")
+
+def test_pool_reuses_connections_across_downloads(server, tmp_path):
+    url = server.add_media(SIZE)
+    pool = ConnectionPool()
+    for index in range(3):
+        SegmentedDownloader(segments=2, segment_size=1024 * 1024, resume=False, pool=pool).download(
+            url, str(tmp_path / f"media{index}.bin"))
+    stats = pool.stats()
+    assert stats['reused'] > stats['new_connections']
+    assert stats['stale_retries'] == 0
+
+def test_unranged_download_is_moved_into_place_only_when_complete(server, tmp_path):
+    url = server.add_media(SIZE)
+    server.RequestHandlerClass = NoRangeHandler
+    path = str(tmp_path / "media.bin")
+    downloader = SegmentedDownloader(segments=4, resume=False, pool=ConnectionPool())
+    server.drop_rate = 1.0
+    with pytest.raises(IOError):
+        downloader.download(url, path)
+    assert os.listdir(tmp_path) == []
+    server.drop_rate = 0.0
+    assert downloader.download(url, path) == path
+    with open(path, "rb") as f:
+        assert f.read() == _source(server, url)
+    assert os.listdir(tmp_path) == ["media.bin"]
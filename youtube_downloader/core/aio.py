@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_downloader.core.backends import DownloadCancelled, claim_staging_dir, release_staging_dir
+from youtube_downloader.core.downloader import download_video
+from youtube_downloader.utils.helpers import extract_video_id
+
+_FINISHED = object()
+
+class AsyncDownloadJob:
+    """Handle of a download running under an AsyncDownloader
+
+    Await the job for the ``(video_path, audio_path)`` result, iterate
+    ``events()`` for its progress messages and call ``cancel()`` to abort
+    the transfer and remove its partial files.
+    """
+    def __init__(self, url, output_path):
+        self.url = url
+        self.output_path = output_path or os.getcwd()
+        self.status = "queued"
+        self.error = None
+        self.task = None
+        self._events = asyncio.Queue()
+        self._cancelled = threading.Event()
+        # Set once the job runs; see _claim_staging()
+        self.staging_path = None
+
+    def _claim_staging(self):
+        """Take the directory the job's partial files live in until it finishes
+
+        The name is stable, so a later job for the same URL can resume them;
+        a job running alongside another for the same URL gets a numbered one.
+        """
+        key = extract_video_id(self.url) or hashlib.sha1(self.url.encode()).hexdigest()[:16]
+        self.staging_path = claim_staging_dir(os.path.join(self.output_path, f".job-{key}"))
+        return self.staging_path
+
+    def cancel(self):
+        """Abort the download; its partial files are removed"""
+        self._cancelled.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def __await__(self):
+        return self.task.__await__()
+
+    async def events(self):
+        """Yield progress messages until the job finishes"""
+        while True:
+            message = await self._events.get()
+            if message is _FINISHED:
+                return
+            yield message
+
+class AsyncDownloader:
+    """asyncio front end for download_video
+
+    At most ``max_concurrency`` downloads run at a time, limited by an
+    ``asyncio.Semaphore``; the blocking backends run on a thread pool of the
+    same size, so any number of queued jobs costs no extra threads. Keyword
+    arguments are default options for ``download_video``.
+    """
+    def __init__(self, max_concurrency=8, **download_options):
+        self.max_concurrency = max_concurrency
+        self.download_options = download_options
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def submit(self, url, **options):
+        """Schedule a download on the running loop and return its AsyncDownloadJob"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        merged = dict(self.download_options, **options)
+        job = AsyncDownloadJob(url, merged.pop("output_path", None))
+        job.task = asyncio.ensure_future(self._run(job, merged))
+        return job
+
+    async def download(self, url, **options):
+        """Download a single URL and return (video_path, audio_path)"""
+        return await self.submit(url, **options)
+
+    async def as_completed(self, urls, **options):
+        """Download all URLs, yielding each job as soon as it finishes
+
+        A job that fails or is cancelled is yielded too, with its ``status``
+        and ``error`` set; the other jobs carry on.
+        """
+        jobs = {}
+        for url in urls:
+            job = self.submit(url, **options)
+            jobs[job.task] = job
+        pending = set(jobs)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                job = jobs[task]
+                if task.cancelled():
+                    job.status = "cancelled"
+                elif task.exception() is not None and job.error is None:
+                    job.status = "failed"
+                    job.error = str(task.exception())
+                yield job
+
+    async def _run(self, job, options):
+        loop = asyncio.get_running_loop()
+
+        def progress(message):
+            if job.cancelled:
+                raise DownloadCancelled()
+            loop.call_soon_threadsafe(job._events.put_nowait, message)
+
+        def work():
+            job._claim_staging()
+            result = download_video(job.url, job.staging_path, progress_callback=progress, **options)
+            return _publish(result, job)
+
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                future = loop.run_in_executor(self._executor, work)
+                try:
+                    result = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # Let the worker thread unwind at its next progress check
+                    job._cancelled.set()
+                    try:
+                        await future
+                    except BaseException:
+                        pass
+                    raise
+            if result and (result[0] or result[1]):
+                job.status = "done"
+            else:
+                job.status = "failed"
+                job.error = "All download methods failed"
+            return result
+        except (asyncio.CancelledError, DownloadCancelled):
+            job.status = "cancelled"
+            if job.staging_path:
+                shutil.rmtree(job.staging_path, ignore_errors=True)
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            raise
+        finally:
+            if job.staging_path:
+                release_staging_dir(job.staging_path)
+            job._events.put_nowait(_FINISHED)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+def _publish(result, job):
+    """Move finished files out of the job's staging directory"""
+    if not result:
+        return result
+    staging = os.path.abspath(job.staging_path)
+
+    def move(path):
+        if path and os.path.dirname(os.path.abspath(path)) == staging:
+            target = os.path.join(job.output_path, os.path.basename(path))
+            os.replace(path, target)
+            return target
+        return path
+
+    # audio_path is a list when several audio formats were requested
+    paths = [[move(p) for p in path] if isinstance(path, list) else move(path) for path in result]
+    if not any(name.endswith((".part", ".part.json")) for name in os.listdir(job.staging_path)):
+        shutil.rmtree(job.staging_path, ignore_errors=True)
+    return tuple(paths)
+
+async def async_download_video(video_link, max_concurrency=1, **options):
+    """Awaitable counterpart of download_video for one-off use"""
+    downloader = AsyncDownloader(max_concurrency)
+    try:
+        return await downloader.download(video_link, **options)
+    finally:
+        downloader.shutdown(wait=False)
@@ -0,0 +1,235 @@
+import os
+import subprocess
+
+import numpy as np
+
+from youtube_downloader.core.ffmpeg import encoder_args, get_ffmpeg_exe, probe_audio, probe_audio_bitrate, run_ffmpeg
+
+# Audio is analyzed at the rate the BS.1770 K-weighting coefficients are defined for
+SAMPLE_RATE = 48000
+# K-weighting: high-shelf pre-filter and RLB high-pass as (b0, b1, b2, a0, a1, a2), ITU-R BS.1770-4
+K_WEIGHTING = (
+    (1.53512485958697, -2.69169618940638, 1.19839281085285, 1.0, -1.69065929318241, 0.73248077421585),
+    (1.0, -2.0, 1.0, 1.0, -1.99004745483398, 0.99007225036621),
+)
+# Gating blocks of 400 ms overlapping by 75%, i.e. a new block every 100 ms
+GATE_HOP = SAMPLE_RATE // 10
+GATE_HOPS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# Resolution of the block loudness histogram, which keeps gating memory constant
+HISTOGRAM_STEP = 0.01
+HISTOGRAM_MAX = 10.0
+# True peak is measured on a 4x oversampled signal
+OVERSAMPLING = 4
+INTERPOLATION_TAPS = 12
+# ReplayGain 2.0 reference loudness; Opus R128 gains are relative to EBU R128's
+REPLAYGAIN_REFERENCE = -18.0
+R128_REFERENCE = -23.0
+SILENCE_THRESHOLD = -60.0
+
+def _interpolation_filter():
+    """Windowed-sinc polyphase filter, one row of taps per oversampled phase"""
+    n = np.arange(OVERSAMPLING * INTERPOLATION_TAPS)
+    center = (len(n) - 1) / 2
+    taps = np.sinc((n - center) / OVERSAMPLING) * np.hanning(len(n) + 2)[1:-1]
+    phases = taps.reshape(INTERPOLATION_TAPS, OVERSAMPLING).T[:, ::-1]
+    return phases / phases.sum(axis=1, keepdims=True)
+
+class AudioAnalyzer:
+    """Loudness, peak and silence analysis fed one block of samples at a time
+
+    ``feed()`` takes float arrays of shape (samples, channels) at
+    SAMPLE_RATE: the signal and its K-weighted copy. State between blocks is
+    a few hundred milliseconds of samples and a fixed-size histogram, so
+    memory does not grow with the length of the recording.
+    """
+    def __init__(self, channels, silence_threshold=SILENCE_THRESHOLD):
+        self.channels = channels
+        self.samples = 0
+        self.sample_peak = 0.0
+        self.true_peak = 0.0
+        self.first_sound = None
+        self.last_sound = None
+        self._silence_amplitude = 10 ** (silence_threshold / 20)
+        self._phases = _interpolation_filter()
+        self._history = np.zeros((INTERPOLATION_TAPS - 1, channels), dtype=np.float32)
+        self._weighted_tail = np.zeros((0, channels), dtype=np.float32)
+        self._hop_energies = np.zeros((0, channels))
+        bins = int(round((HISTOGRAM_MAX - ABSOLUTE_GATE) / HISTOGRAM_STEP)) + 1
+        self._block_counts = np.zeros(bins, dtype=np.int64)
+        self._block_energies = np.zeros(bins)
+
+    def feed(self, samples, weighted):
+        if not len(samples):
+            return
+        self._measure_peaks(samples)
+        self._find_sound(samples)
+        self._gate_blocks(weighted)
+        self.samples += len(samples)
+
+    def _measure_peaks(self, samples):
+        magnitude = np.abs(samples)
+        self.sample_peak = max(self.sample_peak, float(magnitude.max()))
+        padded = np.concatenate([self._history, samples])
+        self._history = padded[-(INTERPOLATION_TAPS - 1):]
+        for channel in range(self.channels):
+            windows = np.lib.stride_tricks.sliding_window_view(padded[:, channel], INTERPOLATION_TAPS)
+            self.true_peak = max(self.true_peak, float(np.abs(windows @ self._phases.T).max()))
+
+    def _find_sound(self, samples):
+        loud = np.flatnonzero(np.abs(samples).max(axis=1) > self._silence_amplitude)
+        if loud.size:
+            if self.first_sound is None:
+                self.first_sound = self.samples + int(loud[0])
+            self.last_sound = self.samples + int(loud[-1])
+
+    def _gate_blocks(self, weighted):
+        weighted = np.concatenate([self._weighted_tail, weighted])
+        hops = len(weighted) // GATE_HOP
+        self._weighted_tail = weighted[hops * GATE_HOP:]
+        if not hops:
+            return
+        squares = weighted[:hops * GATE_HOP].astype(np.float64) ** 2
+        hop_energies = np.concatenate([self._hop_energies,
+                                       squares.reshape(hops, GATE_HOP, self.channels).sum(axis=1)])
+        # Every run of GATE_HOPS consecutive hops is one gating block
+        cumulative = np.concatenate([np.zeros((1, self.channels)), np.cumsum(hop_energies, axis=0)])
+        block_energies = (cumulative[GATE_HOPS:] - cumulative[:-GATE_HOPS]) / (GATE_HOP * GATE_HOPS)
+        self._hop_energies = hop_energies[-(GATE_HOPS - 1):]
+        # All channels are front channels here, so every channel weight is 1
+        energy = block_energies.sum(axis=1)
+        with np.errstate(divide="ignore"):
+            loudness = -0.691 + 10 * np.log10(energy)
+        gated = loudness >= ABSOLUTE_GATE
+        index = np.minimum(((loudness[gated] - ABSOLUTE_GATE) / HISTOGRAM_STEP).astype(np.int64),
+                           len(self._block_counts) - 1)
+        np.add.at(self._block_counts, index, 1)
+        np.add.at(self._block_energies, index, energy[gated])
+
+    def integrated_loudness(self):
+        """Gated integrated loudness in LUFS, or None if every block is below the absolute gate"""
+        count = self._block_counts.sum()
+        if not count:
+            return None
+        relative_gate = -0.691 + 10 * np.log10(self._block_energies.sum() / count) + RELATIVE_GATE
+        first_bin = max(int(np.ceil((relative_gate - ABSOLUTE_GATE) / HISTOGRAM_STEP)), 0)
+        count = self._block_counts[first_bin:].sum()
+        if not count:
+            return None
+        return float(-0.691 + 10 * np.log10(self._block_energies[first_bin:].sum() / count))
+
+    def result(self):
+        """Return the analysis as a dict
+
+        ``loudness`` is in LUFS, ``true_peak`` in dBTP and ``sample_peak`` in
+        dBFS. ``start`` and ``end`` bound the non-silent part in seconds and
+        are None for a silent recording. ``track_gain`` (dB) and
+        ``track_peak`` (linear) are the ReplayGain 2.0 values.
+        """
+        loudness = self.integrated_loudness()
+        silent = self.first_sound is None
+        return {
+            'duration': self.samples / SAMPLE_RATE,
+            'loudness': loudness,
+            'true_peak': _decibels(self.true_peak),
+            'sample_peak': _decibels(self.sample_peak),
+            'start': None if silent else self.first_sound / SAMPLE_RATE,
+            'end': None if silent else (self.last_sound + 1) / SAMPLE_RATE,
+            'track_gain': None if loudness is None else REPLAYGAIN_REFERENCE - loudness,
+            'track_peak': self.true_peak,
+        }
+
+def _decibels(amplitude):
+    return float(20 * np.log10(amplitude)) if amplitude > 0 else None
+
+def analyze_audio(path, silence_threshold=SILENCE_THRESHOLD, block_seconds=1.0):
+    """Measure loudness (EBU R128), true peak and silence bounds of path
+
+    ffmpeg decodes the first audio track to 48 kHz float PCM and applies the
+    K-weighting filters; the samples are read from its pipe in blocks of
+    ``block_seconds``, so memory stays constant for recordings of any
+    length. Multichannel audio is downmixed to stereo. Returns the dict of
+    ``AudioAnalyzer.result()`` plus the file's ``bitrate``.
+    """
+    exe = get_ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg executable not found")
+    probe = probe_audio(path)
+    channels = 1 if probe['channels'] == 1 else 2
+    layout = "mono" if channels == 1 else "stereo"
+    k_weighting = ",".join(
+        "biquad=b0={}:b1={}:b2={}:a0={}:a1={}:a2={}".format(*coefficients) for coefficients in K_WEIGHTING
+    )
+    # The signal and its K-weighted copy travel side by side as 2 * channels channels
+    graph = (f"[0:a:0]aresample={SAMPLE_RATE},aformat=sample_fmts=flt:channel_layouts={layout},"
+             f"asplit[signal][weighting];[weighting]{k_weighting}[weighted];"
+             f"[signal][weighted]amerge=inputs=2[out]")
+    process = subprocess.Popen(
+        [exe, "-hide_banner", "-nostdin", "-loglevel", "error", "-i", path,
+         "-filter_complex", graph, "-map", "[out]", "-f", "f32le", "-c:a", "pcm_f32le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    analyzer = AudioAnalyzer(channels, silence_threshold)
+    frame_size = 2 * channels * 4
+    block_size = max(int(block_seconds * SAMPLE_RATE), 1) * frame_size
+    try:
+        while True:
+            data = process.stdout.read(block_size)
+            if not data:
+                break
+            frames = np.frombuffer(data[:len(data) - len(data) % frame_size], dtype=np.float32)
+            frames = frames.reshape(-1, 2 * channels)
+            analyzer.feed(frames[:, :channels], frames[:, channels:])
+    finally:
+        process.stdout.close()
+        errors = process.stderr.read().decode(errors="replace").strip().splitlines()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise RuntimeError(errors[-1] if errors else f"ffmpeg exited with {returncode}")
+    return dict(analyzer.result(), bitrate=probe['bitrate'])
+
+def replaygain_tags(analysis, audio_format=None):
+    """Metadata tags carrying the ReplayGain values of an analysis"""
+    if analysis['track_gain'] is None:
+        return {}
+    tags = {
+        'REPLAYGAIN_TRACK_GAIN': f"{analysis['track_gain']:+.2f} dB",
+        'REPLAYGAIN_TRACK_PEAK': f"{analysis['track_peak']:.6f}",
+    }
+    if audio_format == "opus":
+        # Opus players read R128 gains, in Q7.8 fixed point
+        tags['R128_TRACK_GAIN'] = str(int(round((R128_REFERENCE - analysis['loudness']) * 256)))
+    return tags
+
+def write_analysis(path, analysis, trim=False, bitrate=None):
+    """Write ReplayGain tags into path and optionally cut leading and trailing silence
+
+    Tagging remuxes the streams untouched; trimming re-encodes the audio
+    track in the file's own format, at ``bitrate`` or else the file's
+    current bitrate, as found by ``analyze_audio()``. The file is replaced
+    atomically.
+    """
+    base, ext = os.path.splitext(path)
+    audio_format = ext.lower().lstrip(".")
+    temp_path = f"{base}.tagging{ext}"
+    args = ["-y", "-i", path]
+    if trim and analysis['start'] is not None:
+        args += ["-map", "0:a:0", "-af",
+                 f"atrim=start={analysis['start']:.6f}:end={analysis['end']:.6f},asetpts=PTS-STARTPTS",
+                 *encoder_args(audio_format, bitrate or analysis.get('bitrate') or probe_audio_bitrate(path))]
+    else:
+        args += ["-map", "0", "-c", "copy"]
+    for key, value in replaygain_tags(analysis, audio_format).items():
+        args += ["-metadata", f"{key}={value}"]
+    if audio_format in ("m4a", "mp4"):
+        # The MP4 muxer drops tags it does not know unless told otherwise
+        args += ["-movflags", "use_metadata_tags"]
+    try:
+        run_ffmpeg(args + [temp_path])
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
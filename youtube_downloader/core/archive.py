@@ -0,0 +1,115 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from youtube_downloader.utils.helpers import get_cache_dir
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def link_or_copy(source, target):
+    """Hardlink source to target, copying when a link is not possible"""
+    if os.path.exists(target):
+        if os.path.samefile(source, target):
+            return target
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    return target
+
+class DownloadArchive:
+    """Index of finished downloads over a content-addressed media store
+
+    Each entry maps (video ID, kind, format, resolution) to the SHA-256 of
+    the media file, which is kept once under ``<root>/objects``. A repeat
+    request is served by hardlinking (or copying) the stored object into the
+    requested output directory, without touching the network.
+    """
+    def __init__(self, root=None):
+        self.root = root or os.path.join(get_cache_dir(), "archive")
+        self.objects_dir = os.path.join(self.root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " video_id TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " format TEXT NOT NULL,"
+                " resolution TEXT NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " filename TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (video_id, kind, format, resolution))"
+            )
+
+    def object_path(self, sha256, filename):
+        ext = os.path.splitext(filename)[1]
+        return os.path.join(self.objects_dir, sha256[:2], sha256 + ext)
+
+    def lookup(self, video_id, kind, fmt="", resolution=""):
+        """Return the archived entry as a dict, or None if it is missing"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, filename, size FROM entries"
+                " WHERE video_id = ? AND kind = ? AND format = ? AND resolution = ?",
+                (video_id, kind, fmt or "", resolution or "")
+            ).fetchone()
+        if row is None:
+            return None
+        sha256, filename, size = row
+        path = self.object_path(sha256, filename)
+        if not os.path.exists(path):
+            self.remove(video_id, kind, fmt, resolution)
+            return None
+        return {'sha256': sha256, 'filename': filename, 'size': size, 'path': path}
+
+    def add(self, video_id, kind, path, fmt="", resolution=""):
+        """Store a downloaded file and index it, returning its digest"""
+        sha256 = file_sha256(path)
+        filename = os.path.basename(path)
+        object_path = self.object_path(sha256, filename)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            link_or_copy(path, object_path)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, kind, fmt or "", resolution or "", sha256, filename,
+                 os.path.getsize(path), time.time())
+            )
+        return sha256
+
+    def materialize(self, entry, output_path=None):
+        """Place an archived file into output_path and return its path"""
+        output_path = output_path or os.getcwd()
+        os.makedirs(output_path, exist_ok=True)
+        return link_or_copy(entry['path'], os.path.join(output_path, entry['filename']))
+
+    def remove(self, video_id, kind, fmt="", resolution=""):
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM entries WHERE video_id = ? AND kind = ? AND format = ? AND resolution = ?",
+                (video_id, kind, fmt or "", resolution or "")
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,344 @@
+import hashlib
+import importlib
+import importlib.util
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from youtube_downloader.core.progress import as_event
+
+class DownloadCancelled(BaseException):
+    """Raised inside a download to abort it
+
+    Like ``asyncio.CancelledError`` it derives from BaseException, so the
+    backends' ``except Exception`` handlers do not turn a cancellation into a
+    fallback to the next backend.
+    """
+
+class BackendStats:
+    """Recent health of a single download backend"""
+    def __init__(self, name, window):
+        self.name = name
+        self.outcomes = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ttfb = None
+        self.duration = None
+        self.last_error = None
+        self.open_until = 0.0
+
+    @property
+    def success_rate(self):
+        """Smoothed success rate over the recent window, 0.5 without data"""
+        return (sum(self.outcomes) + 1) / (len(self.outcomes) + 2)
+
+    def is_open(self, now=None):
+        return self.open_until > (now or time.time())
+
+    def as_dict(self):
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'success_rate': round(self.success_rate, 3),
+            'ttfb': self.ttfb,
+            'duration': self.duration,
+            'circuit_open': self.is_open(),
+            'last_error': self.last_error,
+        }
+
+class BackendRegistry:
+    """Download backends ordered by their recent health
+
+    Each attempt records success or failure, time to first byte and total
+    duration. ``ordered()`` puts backends with the best recent success rate
+    (then the fastest first byte) first. After ``failure_threshold``
+    consecutive failures a backend's circuit opens and it is skipped for
+    ``cooldown`` seconds, after which it gets one trial attempt again.
+
+    Backends are loaded on demand: a backend may be registered as a
+    ``"module:function"`` string that is imported on its first attempt, and
+    backends whose ``requires`` modules are not installed are never tried.
+    """
+    def __init__(self, failure_threshold=3, cooldown=300, window=20, smoothing=0.3):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.smoothing = smoothing
+        self._backends = {}
+        self._labels = {}
+        self._requires = {}
+        self._available = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, func, label=None, requires=()):
+        """Add a backend called as func(link, output_path, resolution, progress_callback, ...)
+
+        ``func`` is a callable or a ``"module:function"`` import path.
+        ``requires`` lists the modules the backend imports when it runs.
+        """
+        with self._lock:
+            self._backends[name] = func
+            self._labels[name] = label or name
+            self._requires[name] = tuple(requires)
+            self._available.pop(name, None)
+            self._stats.setdefault(name, BackendStats(name, self.window))
+
+    def label(self, name):
+        return self._labels[name]
+
+    def available(self, name):
+        """Whether the modules the backend requires are installed, checked without importing them"""
+        if name not in self._available:
+            self._available[name] = all(_module_installed(module) for module in self._requires[name])
+        return self._available[name]
+
+    def _resolve(self, name):
+        func = self._backends[name]
+        if isinstance(func, str):
+            module, _, attr = func.partition(":")
+            func = getattr(importlib.import_module(module), attr)
+            with self._lock:
+                self._backends[name] = func
+        return func
+
+    def ordered(self):
+        """Return backend names to try, healthiest first, skipping open circuits"""
+        now = time.time()
+        names = [n for n in list(self._backends) if self.available(n)]
+        with self._lock:
+            closed = [n for n in names if not self._stats[n].is_open(now)]
+            # Never leave a job with nothing to try
+            candidates = closed or names
+
+            def score(name):
+                stats = self._stats[name]
+                ttfb = stats.ttfb if stats.ttfb is not None else float("inf")
+                return (-round(stats.success_rate, 2), ttfb)
+
+            return sorted(candidates, key=score)
+
+    def _ewma(self, old, new):
+        if old is None:
+            return new
+        return old + self.smoothing * (new - old)
+
+    def record_success(self, name, ttfb, duration):
+        with self._lock:
+            stats = self._stats[name]
+            stats.outcomes.append(1)
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+            if ttfb is not None:
+                stats.ttfb = self._ewma(stats.ttfb, ttfb)
+            stats.duration = self._ewma(stats.duration, duration)
+
+    def record_failure(self, name, error=None):
+        with self._lock:
+            stats = self._stats[name]
+            stats.outcomes.append(0)
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_error = error
+            if stats.consecutive_failures >= self.failure_threshold:
+                stats.open_until = time.time() + self.cooldown
+
+    def stats(self):
+        """Return a dict of per-backend health statistics"""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = BackendStats(name, self.window)
+
+    def attempt(self, name, link, output_path=None, resolution=None, progress_callback=None,
+                *args, first_byte=None, cancel=None):
+        """Run one backend and record its outcome
+
+        ``first_byte`` is an optional ``threading.Event`` set once media bytes
+        start arriving. Setting the optional ``cancel`` event aborts the
+        backend with DownloadCancelled at its next progress report.
+        """
+        start = time.monotonic()
+        marks = {}
+        last_message = []
+
+        def callback(message):
+            if cancel is not None and cancel.is_set():
+                raise DownloadCancelled()
+            event = as_event(message, "download", name)
+            if "ttfb" not in marks and event.is_bytes:
+                marks["ttfb"] = time.monotonic() - start
+                if first_byte is not None:
+                    first_byte.set()
+            last_message[:] = [event]
+            if progress_callback:
+                progress_callback(event)
+
+        try:
+            func = self._resolve(name)
+        except ImportError as e:
+            # Not a failure of the backend: it cannot run here, so it is no longer offered
+            with self._lock:
+                self._available[name] = False
+            if progress_callback:
+                progress_callback(f"{self.label(name)} is not available: {e}")
+            return None
+        try:
+            path = func(link, output_path, resolution, callback, *args)
+        except Exception as e:
+            self.record_failure(name, str(e))
+            raise
+        if path:
+            self.record_success(name, marks.get("ttfb"), time.monotonic() - start)
+        else:
+            self.record_failure(name, str(last_message[0]) if last_message else None)
+        return path
+
+    def hedged(self, names, link, output_path=None, resolution=None, progress_callback=None,
+               *args, hedge_after=10.0, outcome=None):
+        """Run backends in order, starting the next one early if bytes are slow
+
+        When the running backend has produced no bytes within ``hedge_after``
+        seconds the next backend starts alongside it. Every attempt downloads
+        into its own staging directory; the first success is moved into
+        output_path and the other attempts are cancelled and their files
+        discarded. The staging directories are named after the link and
+        backend, with a suffix while another download of the same link is
+        using them, so when every attempt fails their partial files are kept
+        for the next try to resume.
+
+        If an ``outcome`` dict is given, its ``backend`` is set to the
+        winning backend (None if all failed) and ``attempts`` to the number
+        of backends started.
+        """
+        output_path = output_path or os.getcwd()
+        done = threading.Condition()
+        results = {}
+        finished = []
+        cancels = {}
+
+        def run(name, staging, first_byte):
+            try:
+                path = self.attempt(name, link, staging, resolution, progress_callback, *args,
+                                    first_byte=first_byte, cancel=cancels[name])
+            except BaseException:
+                # Includes cancellation, which must still mark the attempt finished
+                path = None
+            with done:
+                results[name] = path
+                finished.append(name)
+                done.notify_all()
+
+        staging_dirs = {}
+        pending = list(names)
+        winner = None
+        first_byte = None
+        hedge_due = False
+        try:
+            while winner is None:
+                with done:
+                    successes = [n for n in finished if results[n]]
+                    if successes:
+                        winner = successes[0]
+                        break
+                    running = [n for n in staging_dirs if n not in results]
+                if pending and (not running or hedge_due):
+                    name = pending.pop(0)
+                    if progress_callback:
+                        progress_callback(f"Attempting download with {self.label(name)}...")
+                    staging_dirs[name] = _staging_dir(output_path, link, name)
+                    cancels[name] = threading.Event()
+                    first_byte = threading.Event()
+                    started_at = time.monotonic()
+                    threading.Thread(target=run, args=(name, staging_dirs[name], first_byte), daemon=True).start()
+                    hedge_due = False
+                elif not running:
+                    return None
+                with done:
+                    done.wait(0.2)
+                hedge_due = not first_byte.is_set() and time.monotonic() - started_at >= hedge_after
+            source = results[winner]
+            target = os.path.join(output_path, os.path.basename(source))
+            shutil.move(source, target)
+            return target
+        finally:
+            if outcome is not None:
+                outcome['backend'] = winner
+                outcome['attempts'] = len(staging_dirs)
+            for name, staging in staging_dirs.items():
+                # Losers stop at their next progress report instead of downloading on
+                cancels[name].set()
+                _discard_when_finished(staging, lambda name=name: name in results, done,
+                                       keep_partial=winner is None)
+
+# Staging directories in use by running downloads of this process
+_claimed_staging = set()
+_claimed_staging_lock = threading.Lock()
+
+def claim_staging_dir(path):
+    """Create and return a staging directory no other running download uses
+
+    ``path`` itself is taken when it is free, so a later download can resume
+    the partial files left there; otherwise a numbered sibling is. Pass the
+    result to ``release_staging_dir()`` once the download is over.
+    """
+    with _claimed_staging_lock:
+        candidate, number = path, 1
+        while candidate in _claimed_staging:
+            number += 1
+            candidate = f"{path}-{number}"
+        _claimed_staging.add(candidate)
+    os.makedirs(candidate, exist_ok=True)
+    return candidate
+
+def release_staging_dir(path):
+    with _claimed_staging_lock:
+        _claimed_staging.discard(path)
+
+def _staging_dir(output_path, link, name):
+    """Staging directory of a hedged attempt
+
+    Successive tries of a link and backend get the same directory, concurrent
+    ones each get their own.
+    """
+    key = hashlib.sha1(link.encode()).hexdigest()[:12]
+    return claim_staging_dir(os.path.join(output_path, f".{name}-{key}"))
+
+def _discard_when_finished(staging, is_finished, condition, keep_partial=False):
+    """Remove a staging directory once the attempt writing into it is over
+
+    With ``keep_partial`` a directory holding resumable ``.part`` files is
+    left in place.
+    """
+    def remove():
+        try:
+            if keep_partial and any(name.endswith(".part.json") for name in os.listdir(staging)):
+                return
+            shutil.rmtree(staging, ignore_errors=True)
+        finally:
+            release_staging_dir(staging)
+
+    def wait_and_remove():
+        with condition:
+            while not is_finished():
+                condition.wait()
+        remove()
+
+    if is_finished():
+        remove()
+    else:
+        threading.Thread(target=wait_and_remove, daemon=True).start()
+
+def _module_installed(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
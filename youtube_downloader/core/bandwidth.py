@@ -0,0 +1,202 @@
+import itertools
+import threading
+import time
+
+# Share of the global rate a job of each priority gets while others compete
+PRIORITY_WEIGHTS = {"interactive": 8, "bulk": 1}
+# Smallest bucket, so a bucket always admits at least one transfer chunk
+MIN_BURST = 64 * 1024
+# A job that sent nothing for this many seconds counts as idle
+IDLE_AFTER = 1.0
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` bytes/s up to ``burst`` bytes
+
+    A ``rate`` of None means unlimited. Not thread-safe on its own; the
+    scheduler's lock guards it.
+    """
+    def __init__(self, rate=None, burst=None, clock=time.monotonic):
+        self.tokens = 0.0
+        self._last = clock()
+        self.set_rate(rate, burst)
+        self.tokens = self.burst
+
+    def set_rate(self, rate, burst=None):
+        self.rate = rate or None
+        self.burst = burst or (max(rate / 4, MIN_BURST) if rate else 0)
+        self.tokens = min(self.tokens, self.burst)
+
+    def refill(self, now):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def ready(self, nbytes):
+        return not self.rate or self.tokens >= min(nbytes, self.burst)
+
+    def delay(self, nbytes):
+        """Seconds until ``ready(nbytes)`` holds"""
+        if self.ready(nbytes):
+            return 0.0
+        return (min(nbytes, self.burst) - self.tokens) / self.rate
+
+    def take(self, nbytes):
+        # May go negative for chunks larger than the burst; later requests wait it off
+        if self.rate:
+            self.tokens -= nbytes
+
+class BandwidthJob:
+    """One download's share of a BandwidthScheduler
+
+    Transfer loops call ``consume(nbytes)`` after each chunk; it blocks
+    while the job's own limit or the global limit is exhausted. ``rate``
+    and ``priority`` can be changed while the job runs.
+    """
+    def __init__(self, scheduler, name, priority="bulk", rate=None, burst=None):
+        if priority not in scheduler.weights:
+            raise ValueError(f"unknown priority: {priority}")
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.bytes = 0
+        self._bucket = TokenBucket(rate, burst, scheduler._clock)
+        self._vtime = 0.0
+        self._waiting = 0
+        self._last_active = 0.0
+
+    @property
+    def rate(self):
+        return self._bucket.rate
+
+    @property
+    def weight(self):
+        return self.scheduler.weights[self.priority]
+
+    def consume(self, nbytes):
+        self.scheduler._consume(self, nbytes)
+
+    def set_rate(self, rate, burst=None):
+        self.scheduler._update(lambda: self._bucket.set_rate(rate, burst))
+
+    def set_priority(self, priority):
+        if priority not in self.scheduler.weights:
+            raise ValueError(f"unknown priority: {priority}")
+        self.scheduler._update(lambda: setattr(self, "priority", priority))
+
+    def close(self):
+        self.scheduler._unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class BandwidthScheduler:
+    """Shares a global byte rate between concurrent downloads
+
+    ``rate`` caps the combined throughput of all jobs (None for no cap).
+    While jobs compete for it they are served by weighted fair queuing: each
+    gets bandwidth in proportion to its priority's weight, so interactive
+    jobs stay responsive next to bulk ones without starving them. Each job
+    may additionally have its own rate limit. All limits can be changed at
+    any time and take effect on the next chunk.
+
+    ``clock`` returns the current time in seconds, ``time.monotonic`` by
+    default.
+    """
+    def __init__(self, rate=None, burst=None, weights=None, clock=time.monotonic):
+        self.weights = dict(PRIORITY_WEIGHTS, **(weights or {}))
+        self._clock = clock
+        self._bucket = TokenBucket(rate, burst, clock)
+        self._cond = threading.Condition()
+        self._jobs = []
+        self._vclock = 0.0
+        self._ids = itertools.count(1)
+
+    @property
+    def rate(self):
+        return self._bucket.rate
+
+    def set_rate(self, rate, burst=None):
+        """Change the global limit; None removes it"""
+        self._update(lambda: self._bucket.set_rate(rate, burst))
+
+    def job(self, name=None, priority="bulk", rate=None, burst=None):
+        """Register a job and return its BandwidthJob, usable as a context manager"""
+        job = BandwidthJob(self, name or f"job-{next(self._ids)}", priority, rate, burst)
+        with self._cond:
+            job._vtime = self._vclock
+            self._jobs.append(job)
+        return job
+
+    def jobs(self):
+        """Return a dict per registered job with its name, priority, rate and bytes"""
+        with self._cond:
+            return [{'name': job.name, 'priority': job.priority, 'rate': job.rate, 'bytes': job.bytes}
+                    for job in self._jobs]
+
+    def _update(self, change):
+        with self._cond:
+            now = self._clock()
+            self._bucket.refill(now)
+            for job in self._jobs:
+                job._bucket.refill(now)
+            change()
+            self._cond.notify_all()
+
+    def _wait(self, timeout):
+        """Block until another job sends or timeout seconds pass"""
+        self._cond.wait(timeout)
+
+    def _unregister(self, job):
+        with self._cond:
+            if job in self._jobs:
+                self._jobs.remove(job)
+            self._cond.notify_all()
+
+    def _is_next(self, job, nbytes):
+        """Whether job has the lowest virtual time among jobs that could send now"""
+        for other in self._jobs:
+            if other is not job and other._waiting and other._vtime < job._vtime and other._bucket.ready(nbytes):
+                return False
+        return True
+
+    def _consume(self, job, nbytes):
+        with self._cond:
+            job._waiting += 1
+            if self._clock() - job._last_active > IDLE_AFTER:
+                # A job returning from idle must not claim the time it was away
+                job._vtime = max(job._vtime, self._vclock)
+            try:
+                while True:
+                    now = self._clock()
+                    self._bucket.refill(now)
+                    for other in self._jobs:
+                        other._bucket.refill(now)
+                    job._bucket.refill(now)
+                    # Fairness only matters when the global limit is the bottleneck
+                    contended = self._bucket.rate is not None
+                    if (job._bucket.ready(nbytes) and self._bucket.ready(nbytes)
+                            and (not contended or self._is_next(job, nbytes))):
+                        break
+                    delay = max(job._bucket.delay(nbytes), self._bucket.delay(nbytes))
+                    self._wait(min(delay, 0.5) if delay else 0.05)
+                job._bucket.take(nbytes)
+                self._bucket.take(nbytes)
+                job.bytes += nbytes
+                job._last_active = self._clock()
+                self._vclock = job._vtime
+                job._vtime += nbytes / job.weight
+                self._cond.notify_all()
+            finally:
+                job._waiting -= 1
+
+def open_job(bandwidth, name=None):
+    """Return (job, owned) for a BandwidthScheduler, a BandwidthJob or None
+
+    A scheduler gets a new bulk job that the caller owns and must close.
+    """
+    if isinstance(bandwidth, BandwidthScheduler):
+        return bandwidth.job(name), True
+    return bandwidth, False
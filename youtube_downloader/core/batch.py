@@ -0,0 +1,294 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from youtube_downloader.core.downloader import (archive_download, download_from_archive, download_video,
+                                                lookup_archived_audio)
+from youtube_downloader.utils.helpers import extract_video_id
+
+# How often run() checks back on a UrlFeed that had no URL ready
+FEED_POLL_INTERVAL = 0.2
+
+def get_host(url):
+    """Return the normalized host name used for per-host concurrency caps"""
+    host = urlparse(url if "//" in url else f"//{url}").netloc.lower()
+    host = host.rsplit("@", 1)[-1].split(":", 1)[0]
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == "youtu.be":
+        host = "youtube.com"
+    return host
+
+class BatchJob:
+    """State and result of a single URL in a batch"""
+    def __init__(self, index, url, options=None):
+        self.index = index
+        self.url = url
+        self.options = options or {}
+        self.host = get_host(url)
+        self.status = "queued"
+        self.video_path = None
+        self.audio_path = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.transcode_future = None
+
+    @property
+    def ok(self):
+        return self.status == "done"
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def __repr__(self):
+        return f"BatchJob({self.index}, {self.url!r}, status={self.status!r})"
+
+class UrlFeed:
+    """URL source for BatchDownloader.run() that can grow while the batch runs
+
+    ``put()`` and ``extend()`` add URLs, or ``(url, options)`` pairs, from any
+    thread; ``close()`` lets the batch end once the queued URLs are done.
+    Iterating yields None while no URL is ready, so run() checks back later
+    instead of blocking on the feed.
+    """
+    def __init__(self, urls=()):
+        self._urls = deque(urls)
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def put(self, url):
+        with self._lock:
+            self._urls.append(url)
+
+    def extend(self, urls):
+        with self._lock:
+            self._urls.extend(urls)
+
+    def clear(self):
+        """Drop the URLs that have not been handed out yet and return how many"""
+        with self._lock:
+            dropped = len(self._urls)
+            self._urls.clear()
+        return dropped
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __iter__(self):
+        while True:
+            with self._lock:
+                if self._urls:
+                    url = self._urls.popleft()
+                elif self._closed:
+                    return
+                else:
+                    url = None
+            yield url
+
+class BatchDownloader:
+    """Download many URLs concurrently on a bounded worker pool
+
+    URLs are consumed lazily from any iterable, at most ``max_workers`` jobs
+    run at once and at most ``per_host_limit`` of them target the same host.
+    ``run()`` yields each ``BatchJob`` as soon as it finishes. An input item
+    may also be a ``(url, options)`` pair whose options override the
+    download options for that URL, and a ``UrlFeed`` lets URLs be added
+    while the batch runs.
+
+    ``progress_callback`` is called as ``progress_callback(job, message)``.
+    The remaining keyword arguments are passed to ``download_func``
+    (``download_video`` by default).
+
+    If a ``TranscodePool`` is given as ``transcoder``, audio extraction is
+    handed to it and the download thread moves on to the next URL; a job is
+    yielded once its audio is ready.
+    """
+    def __init__(self, max_workers=4, per_host_limit=None, progress_callback=None,
+                 download_func=None, transcoder=None, **download_options):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit or max_workers
+        self.progress_callback = progress_callback
+        self.download_func = download_func or download_video
+        self.download_options = download_options
+        self.transcoder = transcoder
+        # How many URLs to read ahead of the running jobs
+        self.prefetch = max_workers * 4
+
+    def _job_callback(self, job):
+        if not self.progress_callback:
+            return None
+        return lambda message: self.progress_callback(job, message)
+
+    def _run_job(self, job):
+        job.status = "running"
+        job.started_at = time.monotonic()
+        options = dict(self.download_options, **job.options)
+        audio_only = options.get("audio_only", False)
+        audio_format = options.get("audio_format", "mp3")
+        offload = self.transcoder is not None and (audio_only or options.get("extract_audio_option"))
+        archived_audio = self._archived_audio(job, options, audio_format) if offload else None
+        if offload:
+            # Download only, the transcoder produces the audio file
+            download_options = dict(options, extract_audio_option=False, streaming=False)
+            analyze = download_options.pop("analyze", False)
+            trim_silence = download_options.pop("trim_silence", False)
+            if audio_only:
+                download_options["audio_format"] = None
+        else:
+            download_options = options
+        try:
+            if archived_audio:
+                # Nothing to transcode; only an extract job whose video is not archived downloads anything
+                archived = download_from_archive(job.url, options["archive"], options.get("output_path"),
+                                                 options.get("resolution"), options.get("extract_audio_option"),
+                                                 audio_format, audio_only, self._job_callback(job))
+                if archived:
+                    job.video_path, job.audio_path = archived
+                    job.status = "done"
+                    return job
+            result = self.download_func(
+                job.url,
+                progress_callback=self._job_callback(job),
+                **download_options
+            )
+            if result and (result[0] or result[1]):
+                job.video_path, job.audio_path = result
+                job.status = "done"
+                if archived_audio:
+                    audio_paths = [options["archive"].materialize(entry, options.get("output_path"))
+                                   for entry in archived_audio]
+                    job.audio_path = audio_paths[0] if isinstance(audio_format, str) else audio_paths
+                elif offload:
+                    source_path = job.audio_path if audio_only else job.video_path
+                    job.status = "transcoding"
+                    # Blocks while the transcoder is saturated
+                    job.transcode_future = self.transcoder.submit(source_path, audio_format, audio_only,
+                                                                  analyze, trim_silence)
+            else:
+                job.status = "failed"
+                job.error = "All download methods failed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.monotonic()
+        return job
+
+    def _archived_audio(self, job, options, audio_format):
+        """Return the archive entries of the job's audio, or None if it still has to be made
+
+        Offloaded jobs reach download_func without an audio format, so the
+        archive is checked here with the real one.
+        """
+        archive = options.get("archive")
+        video_id = extract_video_id(job.url)
+        if archive is None or not video_id:
+            return None
+        try:
+            return lookup_archived_audio(archive, video_id, audio_format)
+        except Exception:
+            return None
+
+    def _finish_transcode(self, job, future):
+        try:
+            job.audio_path, messages = future.result()
+            if self.progress_callback:
+                for message in messages:
+                    self.progress_callback(job, message)
+            if job.audio_path:
+                job.status = "done"
+                options = dict(self.download_options, **job.options)
+                if options.get("archive") is not None:
+                    # download_video never saw the audio file, so it is archived here
+                    archive_download(options["archive"], job.url, options.get("resolution"),
+                                     options.get("audio_format", "mp3"), None, job.audio_path)
+            else:
+                job.status = "failed"
+                job.error = "Audio extraction failed"
+        except Exception as e:
+            job.audio_path = None
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.monotonic()
+
+    def run(self, urls):
+        """Download all URLs, yielding each BatchJob as it finishes"""
+        url_iter = iter(urls)
+        index = 0
+        exhausted = False
+        waiting = deque()
+        running = {}
+        transcoding = {}
+        host_counts = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                # Keep a bounded window of queued jobs
+                idle = False
+                while not exhausted and len(waiting) < self.prefetch:
+                    try:
+                        item = next(url_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if item is None:
+                        # A live feed with no URL ready yet
+                        idle = True
+                        break
+                    url, options = item if isinstance(item, tuple) else (item, None)
+                    url = url.strip()
+                    if url:
+                        waiting.append(BatchJob(index, url, options))
+                    index += 1
+
+                # Start every waiting job whose host still has capacity
+                skipped = deque()
+                while waiting and len(running) < self.max_workers:
+                    job = waiting.popleft()
+                    if host_counts.get(job.host, 0) >= self.per_host_limit:
+                        skipped.append(job)
+                        continue
+                    host_counts[job.host] = host_counts.get(job.host, 0) + 1
+                    running[executor.submit(self._run_job, job)] = job
+                skipped.extend(waiting)
+                waiting = skipped
+
+                if not running and not transcoding:
+                    if exhausted and not waiting:
+                        return
+                    if idle:
+                        time.sleep(FEED_POLL_INTERVAL)
+                    continue
+
+                done, _ = wait(list(running) + list(transcoding), timeout=FEED_POLL_INTERVAL if idle else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in transcoding:
+                        job = transcoding.pop(future)
+                        self._finish_transcode(job, future)
+                        yield job
+                        continue
+                    job = running.pop(future)
+                    host_counts[job.host] -= 1
+                    if job.transcode_future is not None:
+                        transcoding[job.transcode_future] = job
+                    else:
+                        yield job
+
+def download_batch(urls, max_workers=4, per_host_limit=None, progress_callback=None, **download_options):
+    """Download all URLs concurrently and return the finished jobs in input order"""
+    downloader = BatchDownloader(max_workers, per_host_limit, progress_callback, **download_options)
+    return sorted(downloader.run(urls), key=lambda job: job.index)
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from youtube_downloader.core.streams import streams_expiry
+from youtube_downloader.utils.helpers import get_cache_dir
+
+DEFAULT_TTL = 6 * 60 * 60
+# Signed stream URLs are not reused this close to their expiry
+EXPIRY_MARGIN = 5 * 60
+
+class ManifestCache:
+    """On-disk cache of video metadata and resolved stream lists
+
+    Entries are keyed by video ID and hold the title, length and the
+    described streams. An entry expires at the earliest ``expire`` time of
+    its stream URLs (minus a safety margin) or after ``default_ttl`` seconds,
+    whichever comes first. Beyond ``max_entries`` the least recently used
+    entries are evicted.
+    """
+    def __init__(self, path=None, max_entries=1000, default_ttl=DEFAULT_TTL):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "manifests.sqlite3")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS manifests ("
+                " video_id TEXT PRIMARY KEY,"
+                " title TEXT,"
+                " length INTEGER,"
+                " streams TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS manifests_lru ON manifests (last_access)")
+
+    def get(self, video_id):
+        """Return the cached entry dict for video_id, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT title, length, streams, expires_at FROM manifests WHERE video_id = ?",
+                (video_id,)
+            ).fetchone()
+            if row is None or row[3] <= now:
+                if row is not None:
+                    with self._db:
+                        self._db.execute("DELETE FROM manifests WHERE video_id = ?", (video_id,))
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute("UPDATE manifests SET last_access = ? WHERE video_id = ?", (now, video_id))
+            self.hits += 1
+        title, length, streams, expires_at = row
+        return {
+            'video_id': video_id,
+            'title': title,
+            'length': length,
+            'streams': json.loads(streams),
+            'expires_at': expires_at,
+        }
+
+    def put(self, video_id, title, length, streams):
+        """Store the described streams of a video"""
+        now = time.time()
+        expires_at = streams_expiry(streams, self.default_ttl) - EXPIRY_MARGIN
+        if expires_at <= now:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO manifests VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, title, length, json.dumps(streams), expires_at, now)
+            )
+            self._db.execute("DELETE FROM manifests WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM manifests WHERE video_id IN ("
+                " SELECT video_id FROM manifests ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def invalidate(self, video_id):
+        """Drop the entry for video_id, e.g. after its stream URLs stopped working"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM manifests WHERE video_id = ?", (video_id,))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM manifests")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM manifests").fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored entries"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self)}
+
+    def close(self):
+        self._db.close()
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """Return the process-wide cache stored in the user cache directory"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ManifestCache()
+        return _default_cache
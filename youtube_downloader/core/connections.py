@@ -0,0 +1,362 @@
+import http.client
+import io
+import socket
+import ssl
+import threading
+import time
+from importlib.util import find_spec
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+# Idle keep-alive connections kept per host
+DEFAULT_POOL_SIZE = 8
+# Idle connections older than this are closed instead of reused, as servers drop them anyway
+IDLE_TIMEOUT = 60.0
+DNS_TTL = 300.0
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# An unread remainder up to this size is drained on close so the connection can be reused
+DRAIN_LIMIT = 64 * 1024
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Raised by a kept-alive connection the server has already closed
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+                BrokenPipeError, ConnectionAbortedError)
+
+class DnsCache:
+    """getaddrinfo results cached for ``ttl`` seconds"""
+    def __init__(self, ttl=DNS_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        """socket.create_connection() resolving through the cache"""
+        host, port = address
+        error = None
+        for family, type_, proto, _, sockaddr in self.resolve(host, port):
+            sock = None
+            try:
+                sock = socket.socket(family, type_, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+        # The host may have moved; resolve it afresh next time
+        self.forget(host, port)
+        raise error or OSError(f"could not resolve {host}")
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS connection that resumes the last TLS session of its host"""
+    def __init__(self, host, port, timeout, context, pool, key):
+        super().__init__(host, port, timeout=timeout, context=context)
+        self._pool = pool
+        self._key = key
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host,
+                                              session=self._pool._tls_session(self._key))
+        self._pool._count_handshake(self.sock.session_reused)
+
+class PooledResponse:
+    """File-like HTTP response that hands its connection back to the pool when closed
+
+    Behaves like the response of ``urllib.request.urlopen()`` as far as the
+    transfer layers use it: ``status``, ``headers``, ``url``, ``read()`` and
+    use as a context manager.
+    """
+    def __init__(self, pool, key, connection, response, url):
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.url = url
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+
+    def read(self, amt=None):
+        return self._response.read(amt)
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def close(self):
+        if self._connection is None:
+            return
+        response = self._response
+        if not response.isclosed() and not response.will_close and \
+                response.length is not None and response.length <= DRAIN_LIMIT:
+            try:
+                response.read()
+            except (OSError, http.client.HTTPException):
+                pass
+        # A body cut off before Content-Length also leaves the response closed, on a dead socket
+        reusable = response.isclosed() and not response.will_close and not response.length
+        self._pool._release(self._key, self._connection, reusable)
+        self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class _Http2Response:
+    """Adapts a streamed httpx response to the ``PooledResponse`` interface"""
+    def __init__(self, response):
+        self.status = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+        self.url = str(response.url)
+        self._response = response
+        self._chunks = response.iter_raw()
+        self._buffer = bytearray()
+
+    def read(self, amt=None):
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            amt = len(self._buffer)
+        data = bytes(self._buffer[:amt])
+        del self._buffer[:amt]
+        return data
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def http2_available():
+    """Whether httpx and h2, needed for HTTP/2, are installed"""
+    return find_spec("httpx") is not None and find_spec("h2") is not None
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections shared by every transfer in the process
+
+    Connections are kept per (scheme, host, port), so a host's TCP and TLS
+    handshakes are paid once rather than once per request, segment or job.
+    Up to ``pool_size`` idle connections are kept per host; more may be open
+    while requests run. Host names are resolved through a ``DnsCache`` and
+    TLS sessions are resumed when a new connection to a host is needed.
+
+    With ``http2`` and httpx (with its ``h2`` extra) installed, requests go
+    through an HTTP/2 httpx client instead, multiplexed over one connection
+    per host; otherwise the option is ignored. httpx manages those
+    connections itself, so ``stats()`` then only counts requests.
+
+    ``stats()`` reports how many requests reused a connection.
+    """
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=30, dns_ttl=DNS_TTL, idle_timeout=IDLE_TIMEOUT,
+                 ssl_context=None, http2=False):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.dns = DnsCache(dns_ttl)
+        self._idle = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("requests", "reused", "new_connections", "stale_retries", "redirects",
+                                        "tls_handshakes", "tls_resumed"), 0)
+        self._http2 = None
+        if http2 and http2_available():
+            import httpx
+            self._http2 = httpx.Client(
+                http2=True, verify=self.ssl_context, follow_redirects=True, timeout=timeout,
+                limits=httpx.Limits(max_keepalive_connections=pool_size, keepalive_expiry=idle_timeout),
+            )
+
+    def open(self, url, headers=None, timeout=None):
+        """Send a GET request for url and return the response
+
+        Redirects are followed. Error statuses raise ``urllib.error.HTTPError``,
+        as ``urlopen()`` does.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self._http2 is not None:
+            return self._open_http2(url, headers, timeout)
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in DEFAULT_PORTS:
+                raise ValueError(f"unsupported URL scheme: {url}")
+            key = (parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS[parts.scheme])
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            self._count("requests")
+            connection, response = self._send(key, path, headers or {}, timeout)
+            pooled = PooledResponse(self, key, connection, response, url)
+            location = response.getheader("Location")
+            if response.status in REDIRECT_STATUSES and location:
+                pooled.close()
+                self._count("redirects")
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                body = response.read(DRAIN_LIMIT) if response.length is None or response.length <= DRAIN_LIMIT \
+                    else b""
+                pooled.close()
+                raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+            return pooled
+        raise HTTPError(url, response.status, "too many redirects", response.headers, None)
+
+    def _send(self, key, path, headers, timeout):
+        while True:
+            connection, reused = self._acquire(key, timeout)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                self._count("reused" if reused else "new_connections")
+                return connection, response
+            except STALE_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                # The server closed the idle connection; try the next one
+                self._count("stale_retries")
+            except BaseException:
+                connection.close()
+                raise
+
+    def _open_http2(self, url, headers, timeout):
+        request = self._http2.build_request("GET", url, headers=headers, timeout=timeout)
+        response = self._http2.send(request, stream=True)
+        self._count("requests")
+        if response.status_code >= 400:
+            body = response.read()
+            response.close()
+            raise HTTPError(url, response.status_code, response.reason_phrase, response.headers, io.BytesIO(body))
+        return _Http2Response(response)
+
+    def _acquire(self, key, timeout):
+        """Return an idle connection for key, or a new one, and whether it was reused"""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                connection, released = idle.pop()
+                if now - released > self.idle_timeout:
+                    connection.close()
+                    continue
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+        scheme, host, port = key
+        if scheme == "https":
+            connection = _HTTPSConnection(host, port, timeout, self.ssl_context, self, key)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        connection._create_connection = self.dns.create_connection
+        return connection, False
+
+    def _release(self, key, connection, reusable):
+        sock = connection.sock
+        if isinstance(sock, ssl.SSLSocket) and sock.session is not None:
+            # TLS 1.3 session tickets arrive after the handshake, so the session is saved late
+            with self._lock:
+                self._sessions[key] = sock.session
+        if reusable and sock is not None:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.pool_size:
+                    idle.append((connection, time.monotonic()))
+                    return
+        connection.close()
+
+    def _tls_session(self, key):
+        with self._lock:
+            return self._sessions.get(key)
+
+    def _count_handshake(self, resumed):
+        with self._lock:
+            self._counters["tls_handshakes"] += 1
+            self._counters["tls_resumed"] += resumed
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Return request, connection reuse, DNS and TLS counters as a dict
+
+        ``hit_rate`` is the fraction of requests served over a kept-alive
+        connection, ``dns_hit_rate`` the fraction of lookups answered from the
+        cache.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats['idle_connections'] = sum(len(idle) for idle in self._idle.values())
+        requests = stats['reused'] + stats['new_connections']
+        stats['hit_rate'] = round(stats['reused'] / requests, 4) if requests else None
+        lookups = self.dns.hits + self.dns.misses
+        stats['dns_hits'] = self.dns.hits
+        stats['dns_misses'] = self.dns.misses
+        stats['dns_hit_rate'] = round(self.dns.hits / lookups, 4) if lookups else None
+        stats['http2'] = self._http2 is not None
+        return stats
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+        if self._http2 is not None:
+            self._http2.close()
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide pool, creating it with default settings on first use"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+def configure_pool(**options):
+    """Replace the process-wide pool with one built from ``ConnectionPool`` options and return it"""
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, ConnectionPool(**options)
+    if previous is not None:
+        previous.close()
+    return _default_pool
@@ -0,0 +1,377 @@
+import json
+import queue
+import re
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from youtube_downloader.core.backends import DownloadCancelled
+from youtube_downloader.core.connections import get_pool
+from youtube_downloader.core.downloader import download_video
+from youtube_downloader.core.jobstore import FINISHED_STATUSES, JobStore
+from youtube_downloader.core.playlist import is_playlist_url, iter_playlist
+from youtube_downloader.core.progress import as_event
+
+DEFAULT_PORT = 8765
+# Options an API client may set per job; everything else is fixed by the service
+JOB_OPTIONS = ("resolution", "extract_audio_option", "audio_format", "audio_only", "streaming",
+               "analyze", "trim_silence")
+MAX_BODY_SIZE = 1024 * 1024
+# How often idle workers look for jobs queued by another process
+POLL_INTERVAL = 1.0
+# Recent events replayed to a client that starts watching a running job
+EVENT_HISTORY = 20
+
+class _LiveJob:
+    """Progress of a running job, fanned out to event stream subscribers"""
+    def __init__(self, job_id):
+        self.id = job_id
+        self.cancelled = threading.Event()
+        self.last_event = None
+        self.history = deque(maxlen=EVENT_HISTORY)
+        self.subscribers = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            self.last_event = event
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A slow client misses intermediate events, never the final one
+                pass
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=1000)
+        with self._lock:
+            for event in self.history:
+                subscriber.put_nowait(event)
+            if self.closed:
+                # The job ended between looking it up and subscribing
+                subscriber.put_nowait(None)
+            else:
+                self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            # Make room so the end marker always arrives
+            while True:
+                try:
+                    subscriber.put_nowait(None)
+                    break
+                except queue.Full:
+                    subscriber.get_nowait()
+
+class DownloadService:
+    """Runs jobs from a durable JobStore on a pool of worker threads
+
+    Keyword arguments are download_video options shared by every job, e.g.
+    ``output_path``, ``cache`` or ``bandwidth``; clients can only choose the
+    per-job options in ``JOB_OPTIONS``. Jobs interrupted by ``stop()`` or a
+    crash are queued again when the service starts, so only one service may
+    run on a store; other processes can still queue jobs in it. A playlist or channel
+    job queues a job per video and is done once they are all queued.
+    """
+    def __init__(self, store=None, max_workers=4, **download_options):
+        self.store = store or JobStore()
+        self.max_workers = max_workers
+        self.download_options = download_options
+        self.metrics = download_options.get("metrics")
+        self._live = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+
+    def start(self):
+        self.store.recover()
+        for index in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"download-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the workers; running jobs are interrupted and queued again"""
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, url, options=None):
+        """Queue a download and return its job dict"""
+        options = {key: value for key, value in (options or {}).items() if key in JOB_OPTIONS}
+        job_id = self.store.add(url, options)
+        self._wakeup.set()
+        return self.job(job_id)
+
+    def job(self, job_id):
+        """Return a job dict including its latest progress, or None"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        live = self._live.get(job_id)
+        job['progress'] = live.last_event if live else None
+        return job
+
+    def jobs(self, status=None, limit=100, offset=0):
+        return self.store.list(status, limit, offset)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns whether it was cancelled"""
+        if self.store.cancel(job_id):
+            return True
+        live = self._live.get(job_id)
+        if live is None:
+            return False
+        live.cancelled.set()
+        return True
+
+    def subscribe(self, job_id):
+        """Return a queue receiving the job's events and None once it ends, or None if it is not running"""
+        live = self._live.get(job_id)
+        return live.subscribe() if live else None
+
+    def unsubscribe(self, job_id, subscriber):
+        live = self._live.get(job_id)
+        if live:
+            live.unsubscribe(subscriber)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self.store.claim()
+            if job is None:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        live = _LiveJob(job['id'])
+        with self._lock:
+            self._live[job['id']] = live
+
+        def progress(message):
+            if live.cancelled.is_set() or self._stopping.is_set():
+                raise DownloadCancelled()
+            live.publish(as_event(message, "download").as_dict())
+
+        if is_playlist_url(job['url']):
+            self._expand(job, live)
+            return
+
+        video_path = audio_path = error = None
+        try:
+            options = dict(self.download_options, **job['options'])
+            video_path, audio_path = download_video(job['url'], progress_callback=progress, **options)
+        except DownloadCancelled:
+            pass
+        except Exception as e:
+            error = str(e)
+        try:
+            if live.cancelled.is_set():
+                self.store.finish(job['id'], "cancelled")
+            elif self._stopping.is_set():
+                self.store.requeue(job['id'])
+            elif video_path or audio_path:
+                self.store.finish(job['id'], "done", video_path, audio_path)
+            else:
+                last = live.last_event['message'] if live.last_event else None
+                self.store.finish(job['id'], "failed", error=error or last or "Download failed")
+        finally:
+            with self._lock:
+                del self._live[job['id']]
+            live.close()
+
+    def _expand(self, job, live):
+        """Queue a job per video of a playlist or channel job, with the same options"""
+        def progress(message):
+            # A listing stopped part way would queue its first entries twice when requeued, so only cancel stops it
+            if live.cancelled.is_set():
+                raise DownloadCancelled()
+            live.publish(as_event(message, "extract").as_dict())
+
+        queued = 0
+        error = None
+        try:
+            for video_url in iter_playlist(job['url'], progress_callback=progress):
+                self.submit(video_url, job['options'])
+                queued += 1
+        except DownloadCancelled:
+            pass
+        except Exception as e:
+            error = str(e)
+        try:
+            if live.cancelled.is_set():
+                self.store.finish(job['id'], "cancelled")
+            elif queued:
+                live.publish(as_event(f"Queued {queued} videos", "done").as_dict())
+                self.store.finish(job['id'], "done", error=error)
+            else:
+                self.store.finish(job['id'], "failed", error=error or "The playlist has no videos")
+        finally:
+            with self._lock:
+                del self._live[job['id']]
+            live.close()
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of the download service
+
+    ``POST /jobs``                 queue ``{"url": ...}`` or ``{"urls": [...]}``
+                                   with optional ``"options"``
+    ``GET /jobs``                  list jobs (``?status=&limit=&offset=``)
+    ``GET /jobs/<id>``             job status and latest progress
+    ``GET /jobs/<id>/events``      progress as newline-delimited JSON until the job ends
+    ``DELETE /jobs/<id>``          cancel a job
+    ``GET /health``                job counts per status and connection pool stats
+    ``GET /metrics``               Prometheus metrics, if the service records them
+    """
+    server_version = "YouTubeDownloader"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        if url.path == "/health":
+            self._send_json(200, {'status': "ok", 'workers': service.max_workers, 'jobs': service.store.counts(),
+                                  'connections': get_pool().stats()})
+        elif url.path == "/metrics" and service.metrics is not None:
+            self._send(200, service.metrics.prometheus_text().encode(), "text/plain; version=0.0.4")
+        elif url.path == "/jobs":
+            query = parse_qs(url.query)
+            try:
+                limit = int(query.get("limit", ["100"])[0])
+                offset = int(query.get("offset", ["0"])[0])
+            except ValueError:
+                self._send_json(400, {'error': "limit and offset must be integers"})
+                return
+            status = query.get("status", [None])[0]
+            self._send_json(200, {'jobs': service.jobs(status, limit, offset)})
+        else:
+            match = re.fullmatch(r"/jobs/(\d+)(/events)?", url.path)
+            job = service.job(int(match.group(1))) if match else None
+            if job is None:
+                self._send_json(404, {'error': "not found"})
+            elif match.group(2):
+                self._stream_events(job)
+            else:
+                self._send_json(200, job)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/jobs":
+            self._send_json(404, {'error': "not found"})
+            return
+        body = self._read_json()
+        if body is None:
+            return
+        urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            self._send_json(400, {'error': "expected \"url\" or a non-empty \"urls\" list"})
+            return
+        options = body.get("options") or {}
+        if not isinstance(options, dict):
+            self._send_json(400, {'error': "\"options\" must be an object"})
+            return
+        jobs = [self.server.service.submit(url.strip(), options) for url in urls]
+        self._send_json(201, {'jobs': jobs})
+
+    def do_DELETE(self):
+        match = re.fullmatch(r"/jobs/(\d+)", urlparse(self.path).path)
+        service = self.server.service
+        job = service.job(int(match.group(1))) if match else None
+        if job is None:
+            self._send_json(404, {'error': "not found"})
+        elif job['status'] in FINISHED_STATUSES:
+            self._send_json(409, {'error': f"job is already {job['status']}"})
+        else:
+            service.cancel(job['id'])
+            self._send_json(200, service.job(job['id']))
+
+    def _stream_events(self, job):
+        service = self.server.service
+        subscriber = service.subscribe(job['id']) if job['status'] in ("queued", "running") else None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            self._write_line({'event': "status", 'job': job})
+            # A queued job has no events yet; poll until a worker picks it up
+            while subscriber is None and job['status'] in ("queued", "running"):
+                if self.server.stopped.wait(POLL_INTERVAL / 10):
+                    return
+                job = service.job(job['id'])
+                subscriber = service.subscribe(job['id'])
+            while subscriber is not None:
+                event = subscriber.get()
+                if event is None:
+                    break
+                self._write_line({'event': "progress", **event})
+            self._write_line({'event': "finished", 'job': service.job(job['id'])})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            if subscriber is not None:
+                service.unsubscribe(job['id'], subscriber)
+
+    def _write_line(self, payload):
+        self.wfile.write(json.dumps(payload).encode() + b"\n")
+        self.wfile.flush()
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_SIZE:
+            self._send_json(400, {'error': "invalid Content-Length"})
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {'error': "body is not valid JSON"})
+            return None
+        if not isinstance(body, dict):
+            self._send_json(400, {'error': "body must be a JSON object"})
+            return None
+        return body
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class DaemonServer(ThreadingHTTPServer):
+    """HTTP server exposing a DownloadService, bound to localhost by default"""
+    daemon_threads = True
+
+    def __init__(self, service, host="127.0.0.1", port=DEFAULT_PORT):
+        super().__init__((host, port), DaemonRequestHandler)
+        self.service = service
+        self.stopped = threading.Event()
+
+    def shutdown(self):
+        self.stopped.set()
+        super().shutdown()
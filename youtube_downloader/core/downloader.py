@@ -1,161 +1,791 @@
-from pytubefix import YouTube
-from pytubefix import YouTube as PyTube
-import yt_dlp
-from moviepy.editor import VideoFileClip
 import os
 import re
+import time
+
+from youtube_downloader.core.backends import BackendRegistry
+from youtube_downloader.core.bandwidth import open_job
+from youtube_downloader.core.ffmpeg import get_ffmpeg_exe, extract_audio_outputs_ffmpeg, parse_audio_target
+from youtube_downloader.core.metrics import PhaseTimer, file_size, profile_job
+from youtube_downloader.core.pipeline import stream_transcode
+from youtube_downloader.core.progress import ProgressEvent, SpeedMeter, rate_limited, with_phase
+from youtube_downloader.core.streams import DIRECT_PROTOCOLS, MERGE_CONTAINERS, StreamSelector, describe_pytube_stream, describe_ytdlp_format
+from youtube_downloader.core.transfer import SegmentedDownloader
+from youtube_downloader.utils.helpers import extract_video_id
 
 def sanitize_filename(title):
     """Remove invalid characters from filename"""
     return re.sub(r'[\\/*?:"<>|]', "", title)
 
-def download_with_pytubefix(link, output_path=None, resolution=None, progress_callback=None):
+def _transfer_stream(link, stream, output_path, transfer, progress_callback=None, bandwidth=None):
+    """Download a pytube stream through an alternative transfer layer"""
+    video_path = os.path.join(output_path or os.getcwd(), stream.default_filename)
+    identity = f"{extract_video_id(link) or link}:{stream.itag}"
+    return transfer.download(stream.url, video_path, stream.filesize, progress_callback=progress_callback,
+                             identity=identity, bandwidth=bandwidth)
+
+def _cache_manifest(cache, link, title, length, streams):
+    """Store a freshly extracted stream list, cache errors never fail a download"""
+    video_id = extract_video_id(link)
+    if not video_id:
+        return
+    try:
+        cache.put(video_id, title, length, streams)
+    except Exception:
+        pass
+
+def download_from_cache(link, cache, output_path=None, resolution=None, progress_callback=None, transfer=None, audio_only=False, metrics=None, bandwidth=None, selector=None):
+    """Download a stream straight from a cached manifest, skipping extraction
+
+    Returns None when nothing usable is cached. If the cached URL no longer
+    works the entry is dropped so the backends extract a fresh one.
+    """
+    video_id = extract_video_id(link)
+    entry = cache.get(video_id) if video_id else None
+    if not entry:
+        return None
+    # Manifest-based formats cannot be fetched as plain files; entries cached before
+    # the protocol was recorded are skipped the same way
+    streams = [stream for stream in entry['streams'] if stream.get('protocol') in DIRECT_PROTOCOLS]
+    choice = (selector or StreamSelector()).choose(streams, resolution, audio_only, entry['length'])
+    if not choice:
+        return None
+    stream = choice['stream']
+    timer = PhaseTimer(metrics, "cache", link)
+    try:
+        timer.start("transfer")
+        if progress_callback:
+            progress_callback(f"Title: {entry['title']} (cached)")
+            progress_callback(choice['reason'])
+        video_path = os.path.join(output_path or os.getcwd(), f"{sanitize_filename(entry['title'])}.{stream['ext']}")
+        (transfer or SegmentedDownloader(segments=1)).download(
+            stream['url'], video_path, stream['filesize'], stream['headers'], progress_callback,
+            identity=f"{video_id}:{stream['itag']}", bandwidth=bandwidth
+        )
+        timer.stop(nbytes=file_size(video_path))
+        if progress_callback:
+            progress_callback("Download completed from cached manifest!")
+        return video_path
+    except Exception as e:
+        timer.stop(error=e)
+        cache.invalidate(video_id)
+        if progress_callback:
+            progress_callback(f"Cached stream download failed: {e}")
+        return None
+
+def _pytube_progress(progress_callback, bandwidth=None):
+    """Adapt pytube's on_progress hook to byte progress events
+
+    The hook runs after every chunk, so blocking in it throttles the
+    transfer to ``bandwidth``.
+    """
+    if not progress_callback and bandwidth is None:
+        return None
+    meters = {}
+    
+    def on_progress(stream, chunk, bytes_remaining):
+        if bandwidth is not None:
+            bandwidth.consume(len(chunk))
+        if not progress_callback:
+            return
+        total = stream.filesize
+        meter = meters.setdefault(stream.itag, SpeedMeter(total))
+        progress_callback(meter.update(total - bytes_remaining))
+    return on_progress
+
+def _ytdlp_progress(progress_callback, bandwidth=None):
+    """Adapt yt-dlp's progress hook to byte progress events
+
+    Like pytube's hook it runs after every block, which lets ``bandwidth``
+    throttle yt-dlp's own transfer loop.
+    """
+    received = {}
+    
+    def hook(d):
+        if bandwidth is not None and d.get('status') == 'downloading':
+            done = d.get('downloaded_bytes') or 0
+            # The first report is the baseline, it may include resumed bytes
+            previous = received.setdefault(d.get('filename'), done)
+            received[d.get('filename')] = done
+            if done > previous:
+                bandwidth.consume(done - previous)
+        if not progress_callback or d.get('status') not in ('downloading', 'finished'):
+            return
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        done = d.get('downloaded_bytes') or 0
+        progress_callback(ProgressEvent("download", bytes_done=done, bytes_total=total,
+                                        speed=d.get('speed'), eta=d.get('eta')))
+    return hook
+
+def download_with_pytubefix(link, output_path=None, resolution=None, progress_callback=None, transfer=None, audio_only=False, cache=None, metrics=None, bandwidth=None, selector=None):
     """Download video using pytubefix library"""
+    timer = PhaseTimer(metrics, "pytubefix", link)
     try:
-        yt = YouTube(link)
+        timer.start("metadata")
+        from pytubefix import YouTube
+        yt = YouTube(link, on_progress_callback=_pytube_progress(progress_callback, bandwidth))
         if progress_callback:
             progress_callback(f"Title: {yt.title}")
             progress_callback(f"Length: {yt.length} seconds")
+        streams = [describe_pytube_stream(s) for s in yt.streams]
+        if cache is not None:
+            _cache_manifest(cache, link, yt.title, yt.length, streams)
         
-        if resolution:
-            stream = yt.streams.filter(res=resolution).first()
-            if not stream:
-                if progress_callback:
-                    progress_callback(f"Resolution {resolution} not available. Getting highest resolution...")
-                stream = yt.streams.get_highest_resolution()
-        else:
-            stream = yt.streams.get_highest_resolution()
-            
+        choice = (selector or StreamSelector()).choose(streams, resolution, audio_only, yt.length)
+        if not choice:
+            raise RuntimeError("No downloadable stream found")
+        stream = yt.streams.get_by_itag(int(choice['stream']['itag']))
         if progress_callback:
-            progress_callback(f"Downloading: {stream.resolution}")
+            progress_callback(choice['reason'])
         
-        if output_path:
+        timer.start("transfer")
+        if transfer:
+            video_path = _transfer_stream(link, stream, output_path, transfer, progress_callback, bandwidth)
+        elif output_path:
             video_path = stream.download(output_path=output_path)
         else:
             video_path = stream.download()
+        timer.stop(nbytes=file_size(video_path))
             
         if progress_callback:
             progress_callback("Download completed with pytubefix!")
         return video_path
     except Exception as e:
+        timer.stop(error=e)
         if progress_callback:
             progress_callback(f"pytubefix download failed: {e}")
         return None
 
-def download_with_pytube(link, output_path=None, resolution=None, progress_callback=None):
+def download_with_pytube(link, output_path=None, resolution=None, progress_callback=None, transfer=None, audio_only=False, cache=None, metrics=None, bandwidth=None, selector=None):
     """Download video using standard pytube library"""
+    timer = PhaseTimer(metrics, "pytube", link)
     try:
-        yt = PyTube(link)
+        timer.start("metadata")
+        from pytubefix import YouTube as PyTube
+        yt = PyTube(link, on_progress_callback=_pytube_progress(progress_callback, bandwidth))
         if progress_callback:
             progress_callback(f"Title: {yt.title}")
             progress_callback(f"Length: {yt.length} seconds")
+        streams = [describe_pytube_stream(s) for s in yt.streams]
+        if cache is not None:
+            _cache_manifest(cache, link, yt.title, yt.length, streams)
         
-        if resolution:
-            stream = yt.streams.filter(res=resolution).first()
-            if not stream:
-                if progress_callback:
-                    progress_callback(f"Resolution {resolution} not available. Getting highest resolution...")
-                stream = yt.streams.get_highest_resolution()
-        else:
-            stream = yt.streams.get_highest_resolution()
-            
+        choice = (selector or StreamSelector()).choose(streams, resolution, audio_only, yt.length)
+        if not choice:
+            raise RuntimeError("No downloadable stream found")
+        stream = yt.streams.get_by_itag(int(choice['stream']['itag']))
         if progress_callback:
-            progress_callback(f"Downloading: {stream.resolution}")
+            progress_callback(choice['reason'])
         
-        if output_path:
+        timer.start("transfer")
+        if transfer:
+            video_path = _transfer_stream(link, stream, output_path, transfer, progress_callback, bandwidth)
+        elif output_path:
             video_path = stream.download(output_path=output_path)
         else:
             video_path = stream.download()
+        timer.stop(nbytes=file_size(video_path))
             
         if progress_callback:
             progress_callback("Download completed with pytube!")
         return video_path
     except Exception as e:
+        timer.stop(error=e)
         if progress_callback:
             progress_callback(f"pytube download failed: {e}")
         return None
 
-def download_with_ytdlp(link, output_path=None, resolution=None, progress_callback=None):
+def _direct_streams(info):
+    """Described yt-dlp formats that can be downloaded as plain files, for the manifest cache"""
+    return [describe_ytdlp_format(f) for f in info.get('formats') or []
+            if f.get('url') and f.get('protocol') in DIRECT_PROTOCOLS]
+
+def _ytdlp_format_selector(selector, resolution, audio_only, progress_callback=None):
+    """yt-dlp ``format`` callable that picks formats with a StreamSelector
+
+    Direct http(s) formats are preferred, so the chosen URL can also be
+    fetched by the transfer layer and the streaming pipeline.
+    """
+    def select_formats(ctx):
+        candidates = [f for f in ctx['formats'] if f.get('url')]
+        candidates = [f for f in candidates if f.get('protocol') in DIRECT_PROTOCOLS] or candidates
+        formats = {str(f.get('format_id')): f for f in candidates}
+        streams = [describe_ytdlp_format(f) for f in formats.values()]
+        choice = selector.choose(streams, resolution, audio_only, merge=not audio_only)
+        if not choice:
+            return
+        if progress_callback:
+            progress_callback(choice['reason'])
+        video = formats[choice['stream']['itag']]
+        if not choice['audio']:
+            yield video
+            return
+        audio = formats[choice['audio']['itag']]
+        ext = video['ext'] if audio['ext'] in MERGE_CONTAINERS.get(video['ext'], ()) else "mkv"
+        yield {
+            'format_id': f"{video['format_id']}+{audio['format_id']}",
+            'ext': ext,
+            'requested_formats': [video, audio],
+            'protocol': f"{video.get('protocol')}+{audio.get('protocol')}",
+        }
+    return select_formats
+
+def download_with_ytdlp(link, output_path=None, resolution=None, progress_callback=None, transfer=None, audio_only=False, cache=None, metrics=None, bandwidth=None, selector=None):
     """Download video using yt-dlp (most powerful option)"""
+    timer = PhaseTimer(metrics, "yt-dlp", link)
     try:
+        import yt_dlp
         if not output_path:
             output_path = os.getcwd()
             
-        # Configure yt-dlp options
         ydl_opts = {
-            'format': f'bestvideo[height<={resolution[:-1]}]+bestaudio/best' if resolution else 'best',
+            # Ranked like the other backends instead of yt-dlp's own preference order
+            'format': _ytdlp_format_selector(selector or StreamSelector(), resolution, audio_only,
+                                             progress_callback),
             'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
             'restrictfilenames': True,
             'noplaylist': True,
+            'continuedl': True,
             'quiet': False,
             'no_warnings': False,
-            'progress_hooks': [lambda d: progress_callback(f"Progress: {d['_percent_str']}") if progress_callback and '_percent_str' in d else None]
+            'progress_hooks': [_ytdlp_progress(progress_callback, bandwidth)]
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(link, download=True)
+            # Extract and download separately so both phases are timed
+            timer.start("metadata")
+            info = ydl.extract_info(link, download=False)
             video_path = ydl.prepare_filename(info)
+            if cache is not None:
+                streams = _direct_streams(info)
+                _cache_manifest(cache, link, info.get('title'), info.get('duration'), streams)
+            timer.start("transfer")
+            # HLS and DASH formats point at a manifest, which only yt-dlp can follow
+            if transfer and info.get('url') and not info.get('requested_formats') and \
+                    info.get('protocol') in ('http', 'https'):
+                transfer.download(info['url'], video_path, info.get('filesize'),
+                                  info.get('http_headers'), progress_callback,
+                                  identity=f"{info.get('id')}:{info.get('format_id')}", bandwidth=bandwidth)
+            else:
+                # Separate video and audio formats need yt-dlp to merge them
+                ydl.process_ie_result(info, download=True)
+            timer.stop(nbytes=file_size(video_path))
             if progress_callback:
                 progress_callback("Download completed with yt-dlp!")
             return video_path
     except Exception as e:
+        timer.stop(error=e)
         if progress_callback:
             progress_callback(f"yt-dlp download failed: {e}")
         return None
 
-def extract_audio(video_path, audio_format="mp3", progress_callback=None):
-    """Extract audio from video file"""
+# The backend libraries are imported by the backends themselves on first use
+default_backends = BackendRegistry()
+default_backends.register("pytubefix", download_with_pytubefix, requires=("pytubefix",))
+default_backends.register("pytube", download_with_pytube, requires=("pytubefix",))
+default_backends.register("yt-dlp", download_with_ytdlp, "yt-dlp (most powerful)", requires=("yt_dlp",))
+
+def get_backend_stats():
+    """Return the health statistics of the default backends"""
+    return default_backends.stats()
+
+def audio_targets(audio_format):
+    """Return audio_format as a list of (format, bitrate) targets
+
+    audio_format is one target or a list of them, each a format name, a
+    ``"format:bitrate"`` string or a ``(format, bitrate)`` tuple.
+    """
+    if isinstance(audio_format, str):
+        audio_format = [audio_format]
+    return [parse_audio_target(target) for target in audio_format]
+
+def audio_target_key(audio_format, bitrate=None):
+    """Archive and display name of a target, e.g. ``"mp3:320k"``"""
+    return f"{audio_format}:{bitrate}" if bitrate else audio_format
+
+def audio_target_paths(source_path, targets):
+    """Output path per target next to source_path
+
+    A bitrate is added to the name when it is needed to tell files apart,
+    e.g. ``song.320k.mp3`` next to ``song.128k.mp3``.
+    """
+    base = os.path.splitext(source_path)[0]
+    formats = [audio_format for audio_format, _ in targets]
+    paths = []
+    for audio_format, bitrate in targets:
+        path = f"{base}.{audio_format}"
+        if bitrate and (formats.count(audio_format) > 1 or path == source_path):
+            path = f"{base}.{bitrate}.{audio_format}"
+        paths.append(path)
+    return paths
+
+def extract_audio_moviepy(video_path, outputs):
+    """Decode and re-encode the audio track with moviepy
+
+    ``outputs`` is a list of ``(audio_path, audio_format, bitrate)``; moviepy
+    has no multi-output encode, so the track is written once per output.
+    """
+    # moviepy pulls in numpy and imageio, so it is only imported when needed
+    from moviepy.editor import AudioFileClip
+    # Read only the audio track, the video frames are never decoded
+    with AudioFileClip(video_path) as audio:
+        for audio_path, audio_format, bitrate in outputs:
+            codec = "flac" if audio_format == "flac" else None
+            audio.write_audiofile(audio_path, codec=codec, bitrate=bitrate, logger=None)
+    return ["transcode"] * len(outputs)
+
+def extract_audio(video_path, audio_format="mp3", progress_callback=None, metrics=None):
+    """Extract audio from video file
+
+    ffmpeg is run directly so the audio stream is copied untouched whenever
+    its codec fits the target container; moviepy is only used when no ffmpeg
+    executable is available.
+
+    ``audio_format`` may also be a list of targets such as
+    ``["flac", "mp3:320k", "opus:96k"]``. The track is then decoded once and
+    encoded to every target by a single ffmpeg process, and a list of paths
+    in the same order is returned. Returns None if extraction fails.
+    """
+    targets = audio_targets(audio_format)
+    timer = PhaseTimer(metrics, job=video_path)
     try:
-        audio_path = os.path.splitext(video_path)[0] + f".{audio_format}"
+        timer.start("extract")
+        audio_paths = audio_target_paths(video_path, targets)
+        outputs = [(path, fmt, bitrate) for path, (fmt, bitrate) in zip(audio_paths, targets)]
         
-        # Load the video file and extract audio
-        with VideoFileClip(video_path) as video:
-            if audio_format == "flac":
-                video.audio.write_audiofile(audio_path, codec="flac", logger=None)
-            else:
-                video.audio.write_audiofile(audio_path, logger=None)
+        if get_ffmpeg_exe():
+            timer.backend = "ffmpeg"
+            modes = extract_audio_outputs_ffmpeg(video_path, outputs)
+        else:
+            timer.backend = "moviepy"
+            modes = extract_audio_moviepy(video_path, outputs)
+        timer.stop(nbytes=file_size(audio_paths), mode=",".join(sorted(set(modes))), outputs=len(outputs))
         
         if progress_callback:
-            progress_callback(f"Audio extracted to {audio_path}")
-        return audio_path
+            for audio_path, mode in zip(audio_paths, modes):
+                method = "stream copy" if mode == "copy" else "transcode"
+                progress_callback(f"Audio extracted to {audio_path} ({method})")
+        return audio_paths[0] if isinstance(audio_format, str) else audio_paths
     except Exception as e:
+        timer.stop(error=e)
         if progress_callback:
             progress_callback(f"Audio extraction failed: {e}")
         return None
 
-def download_video(video_link, output_path=None, resolution=None, extract_audio_option=False, audio_format="mp3", progress_callback=None):
-    """Main function to download video and extract audio if needed"""
+def convert_audio_only(source_path, audio_format="mp3", progress_callback=None, metrics=None):
+    """Convert a downloaded audio-only stream to audio_format and remove the source
+
+    With ``audio_format=None`` the stream is kept in its native container,
+    as it is for a target naming that container without a bitrate. A list
+    of targets returns a list of paths, see ``extract_audio()``.
+    """
+    if audio_format is None:
+        return source_path
+    native = (os.path.splitext(source_path)[1].lower().lstrip("."), None)
+    keeps_source = [target == native for target in audio_targets(audio_format)]
+    targets = [target for target, keep in zip(audio_targets(audio_format), keeps_source) if not keep]
+    converted = []
+    if targets:
+        converted = extract_audio(source_path, targets, progress_callback, metrics)
+        if converted is None:
+            return None
+        if not any(keeps_source):
+            os.remove(source_path)
+    converted = iter(converted)
+    audio_paths = [source_path if keep else next(converted) for keep in keeps_source]
+    return audio_paths[0] if isinstance(audio_format, str) else audio_paths
+
+def analyze_audio_files(audio_path, trim_silence=False, progress_callback=None, metrics=None, audio_format=None):
+    """Measure loudness, true peak and silence of audio_path and tag it with ReplayGain
+
+    audio_path may be a list of paths. With ``trim_silence`` leading and
+    trailing silence is cut as well, re-encoding at the bitrate of the
+    matching ``audio_format`` target or else the file's own. A file that
+    cannot be analyzed is left as it is. Returns the analysis dict per file
+    (None where it failed), see ``analysis.analyze_audio()``.
+    """
+    # NumPy is only imported when audio is actually analyzed
+    from youtube_downloader.core.analysis import analyze_audio, write_analysis
+    paths = [audio_path] if isinstance(audio_path, str) else audio_path
+    bitrates = [bitrate for _, bitrate in audio_targets(audio_format)] if audio_format else []
+    results = []
+    for index, path in enumerate(paths):
+        timer = PhaseTimer(metrics, backend="numpy", job=path)
+        try:
+            timer.start("analyze")
+            analysis = analyze_audio(path)
+            write_analysis(path, analysis, trim=trim_silence,
+                           bitrate=bitrates[index] if index < len(bitrates) else None)
+            timer.stop(nbytes=file_size(path), audio_seconds=analysis['duration'])
+            if progress_callback and analysis['loudness'] is not None:
+                progress_callback(f"{os.path.basename(path)}: {analysis['loudness']:.1f} LUFS, "
+                                  f"true peak {analysis['true_peak']:.1f} dBTP, "
+                                  f"ReplayGain {analysis['track_gain']:+.2f} dB")
+            results.append(analysis)
+        except Exception as e:
+            timer.stop(error=e)
+            if progress_callback:
+                progress_callback(f"Audio analysis failed: {e}")
+            results.append(None)
+    return results[0] if isinstance(audio_path, str) else results
+
+def resolve_audio_stream(link, progress_callback=None, cache=None, selector=None):
+    """Resolve the best audio-only stream of a video without downloading it
+
+    Returns a dict with ``title``, ``url``, ``filesize``, ``codec`` and
+    ``headers``, or None if no backend could resolve the video. The stream
+    is picked by ``selector``, a StreamSelector.
+    """
+    selector = selector or StreamSelector()
+    video_id = extract_video_id(link)
+    entry = cache.get(video_id) if cache is not None and video_id else None
+    choice = selector.choose(entry['streams'], audio_only=True) if entry else None
+    if choice:
+        stream = choice['stream']
+        if progress_callback:
+            progress_callback(choice['reason'])
+        return {
+            'title': entry['title'],
+            'url': stream['url'],
+            'filesize': stream['filesize'],
+            'codec': stream['audio_codec'],
+            'headers': stream['headers']
+        }
+        
+    try:
+        from pytubefix import YouTube
+        yt = YouTube(link)
+        streams = [describe_pytube_stream(s) for s in yt.streams]
+        if cache is not None:
+            _cache_manifest(cache, link, yt.title, yt.length, streams)
+        choice = selector.choose(streams, audio_only=True, duration=yt.length)
+        if not choice:
+            raise RuntimeError("No audio stream found")
+        stream = yt.streams.get_by_itag(int(choice['stream']['itag']))
+        if progress_callback:
+            progress_callback(choice['reason'])
+        return {
+            'title': yt.title,
+            'url': stream.url,
+            'filesize': stream.filesize,
+            'codec': stream.audio_codec,
+            'headers': None
+        }
+    except Exception as e:
+        if progress_callback:
+            progress_callback(f"pytubefix could not resolve the audio stream: {e}")
+        
+    try:
+        import yt_dlp
+        ydl_opts = {
+            'format': _ytdlp_format_selector(selector, None, True, progress_callback),
+            'noplaylist': True,
+            'quiet': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(link, download=False)
+        if cache is not None:
+            streams = _direct_streams(info)
+            _cache_manifest(cache, link, info.get('title'), info.get('duration'), streams)
+        return {
+            'title': info.get('title') or info.get('id'),
+            'url': info['url'],
+            'filesize': info.get('filesize'),
+            'codec': info.get('acodec'),
+            'headers': info.get('http_headers')
+        }
+    except Exception as e:
+        if progress_callback:
+            progress_callback(f"yt-dlp could not resolve the audio stream: {e}")
+        return None
+
+def stream_audio(video_link, output_path=None, audio_format="mp3", progress_callback=None, timings=None, cache=None, metrics=None, bandwidth=None, selector=None):
+    """Encode the best audio stream to audio_format while it downloads
+
+    Per-phase durations are reported through progress_callback and, if a
+    ``timings`` dict is given, stored in it.
+    """
+    timer = PhaseTimer(metrics, job=video_link)
     try:
-        # Try downloading with different methods
+        start = time.monotonic()
+        timer.start("resolve")
+        info = resolve_audio_stream(video_link, progress_callback, cache, selector)
+        if not info:
+            timer.stop(error="No audio stream resolved")
+            return None
+        resolve_time = time.monotonic() - start
+        
+        # A "mp3:320k" target names an mp3 file encoded at that bitrate
+        audio_format, bitrate = parse_audio_target(audio_format)
+        audio_path = os.path.join(output_path or os.getcwd(), f"{sanitize_filename(info['title'])}.{audio_format}")
         if progress_callback:
-            progress_callback("Attempting download with pytubefix...")
-        video_path = download_with_pytubefix(video_link, output_path, resolution, progress_callback)
+            progress_callback(f"Streaming audio to {audio_path}")
+        timer.start("stream")
+        phases = stream_transcode(info['url'], audio_path, audio_format, info['headers'], info['filesize'],
+                                  info['codec'], progress_callback=progress_callback, bandwidth=bandwidth,
+                                  bitrate=bitrate)
+        timer.stop(nbytes=phases['bytes'], first_byte=phases['first_byte'])
+        phases['resolve'] = resolve_time
+        phases['total'] += resolve_time
+        if timings is not None:
+            timings.update(phases)
         
-        if not video_path:
-            if progress_callback:
-                progress_callback("Attempting download with pytube...")
-            video_path = download_with_pytube(video_link, output_path, resolution, progress_callback)
+        if progress_callback:
+            progress_callback(
+                "Timing: resolve {resolve:.2f}s, first byte {first_byte:.2f}s, transfer {transfer:.2f}s, "
+                "encode tail {encode_tail:.2f}s, total {total:.2f}s".format(**phases)
+            )
+            progress_callback(f"Audio extracted to {audio_path}")
+        return audio_path
+    except Exception as e:
+        timer.stop(error=e)
+        if progress_callback:
+            progress_callback(f"Audio streaming failed: {e}")
+        return None
+
+def lookup_archived_audio(archive, video_id, audio_format):
+    """Return the archive entries for every target of audio_format, or None unless all are archived"""
+    if not audio_format:
+        return None
+    entries = [archive.lookup(video_id, "audio", audio_target_key(*target)) for target in audio_targets(audio_format)]
+    return entries if all(entries) else None
+
+def download_from_archive(video_link, archive, output_path=None, resolution=None, extract_audio_option=False, audio_format="mp3", audio_only=False, progress_callback=None, metrics=None, analyze=False, trim_silence=False):
+    """Serve a request from the download archive, or return None if it is not archived
+
+    Audio extracted from an archived video is analyzed like a fresh download
+    when ``analyze`` or ``trim_silence`` is set.
+    """
+    video_id = extract_video_id(video_link)
+    if not video_id:
+        return None
+    multiple = audio_format is not None and not isinstance(audio_format, str)
+    audio = None
+    if audio_only or extract_audio_option:
+        audio = lookup_archived_audio(archive, video_id, audio_format)
+
+    def materialize_audio():
+        audio_paths = [archive.materialize(entry, output_path) for entry in audio]
+        return audio_paths if multiple else audio_paths[0]
+        
+    if audio_only:
+        if not audio:
+            return None
+        audio_path = materialize_audio()
+        if progress_callback:
+            progress_callback(f"Already downloaded: {audio_path}")
+        return None, audio_path
+        
+    video = archive.lookup(video_id, "video", resolution=resolution or "best")
+    if not video:
+        return None
+    video_path = archive.materialize(video, output_path)
+    if progress_callback:
+        progress_callback(f"Already downloaded: {video_path}")
+    audio_path = None
+    if extract_audio_option:
+        if audio:
+            audio_path = materialize_audio()
+        else:
+            audio_path = extract_audio(video_path, audio_format, progress_callback, metrics)
+            if audio_path and (analyze or trim_silence):
+                analyze_audio_files(audio_path, trim_silence, progress_callback, metrics, audio_format)
+            if audio_path:
+                archive_download(archive, video_link, resolution, audio_format, None, audio_path)
+    return video_path, audio_path
+
+def archive_download(archive, video_link, resolution, audio_format, video_path, audio_path):
+    """Record finished downloads in the archive, archive errors never fail a download"""
+    video_id = extract_video_id(video_link)
+    if not video_id:
+        return
+    try:
+        if video_path:
+            archive.add(video_id, "video", video_path, resolution=resolution or "best")
+        if audio_path and audio_format:
+            audio_paths = [audio_path] if isinstance(audio_path, str) else audio_path
+            for path, target in zip(audio_paths, audio_targets(audio_format)):
+                archive.add(video_id, "audio", path, audio_target_key(*target))
+    except Exception:
+        pass
+
+def download_video(video_link, output_path=None, resolution=None, extract_audio_option=False, audio_format="mp3", progress_callback=None, transfer=None, audio_only=False, streaming=False, timings=None, cache=None, registry=None, hedge_after=None, archive=None, progress_rate=10.0, metrics=None, profile=None, bandwidth=None, analyze=False, trim_silence=False, max_bytes=None):
+    """Main function to download video and extract audio if needed
+
+    ``transfer`` replaces the backends' own media transfer. It defaults to a
+    single-connection ``SegmentedDownloader``, so an interrupted download
+    resumes from its ``.part`` file on the next attempt; pass one with more
+    segments for parallel range requests.
+
+    With ``audio_only`` only the best audio stream is downloaded and converted
+    to ``audio_format``; no video file is written and the result is
+    ``(None, audio_path)``. ``audio_format`` may be a list of targets such
+    as ``["flac", "mp3:320k"]``, which are encoded from a single decode of
+    the soundtrack; ``audio_path`` is then a list of paths.
+
+    ``streaming`` implies ``audio_only`` and overlaps the transfer with the
+    audio encoder; phase timings are stored in the optional ``timings`` dict.
+    If streaming fails the regular download-then-extract path is used.
+
+    A ``ManifestCache`` passed as ``cache`` lets repeat requests and backend
+    fallbacks reuse already extracted stream lists.
+
+    Backends are tried healthiest first according to ``registry`` (the
+    module's ``default_backends`` by default). With ``hedge_after`` set, the
+    next backend is started alongside the current one if it has not
+    produced any bytes after that many seconds.
+
+    With a ``DownloadArchive`` as ``archive``, media already downloaded in
+    the same format and resolution is linked into output_path without any
+    network access, and new downloads are added to it.
+
+    Progress arrives as ``ProgressEvent`` messages tagged with their phase
+    and backend; byte progress is coalesced to at most ``progress_rate``
+    events per second.
+
+    A ``MetricsRecorder`` passed as ``metrics`` receives the duration, bytes,
+    backend and failure reason of every phase: metadata extraction and
+    transfer per backend attempt, extraction, and the whole job. With
+    ``profile`` set to a path prefix the job runs under cProfile and
+    tracemalloc, see ``profile_job()``.
+
+    Transfers draw from ``bandwidth``: a ``BandwidthScheduler`` (the
+    download becomes one of its bulk jobs) or a ``BandwidthJob`` of a chosen
+    priority and rate.
+
+    With ``analyze`` every new audio file is measured (EBU R128 loudness,
+    true peak, silence) and tagged with ReplayGain; ``trim_silence`` also
+    cuts its leading and trailing silence. See ``analyze_audio_files()``.
+
+    Every backend picks its stream with a ``StreamSelector``: the nearest
+    resolution at or below ``resolution``, then streams whose audio can be
+    stream-copied to ``audio_format``, then the smallest. ``max_bytes``
+    sets a size budget. The reason for the pick is reported as progress.
+
+    Playlist and channel URLs are not downloaded here; see
+    ``download_playlist()``.
+    """
+    if profile:
+        with profile_job(profile):
+            return download_video(video_link, output_path, resolution, extract_audio_option, audio_format,
+                                  progress_callback, transfer, audio_only, streaming, timings, cache, registry,
+                                  hedge_after, archive, progress_rate, metrics=metrics, bandwidth=bandwidth,
+                                  analyze=analyze, trim_silence=trim_silence, max_bytes=max_bytes)
+    from youtube_downloader.core.playlist import is_playlist_url
+    if is_playlist_url(video_link):
+        # yt-dlp would fetch every entry into one output name; playlists are split into jobs instead
+        if progress_callback:
+            progress_callback(f"{video_link} is a playlist or channel; download it with download_playlist()")
+        return None, None
+    if transfer is None:
+        transfer = SegmentedDownloader(segments=1)
+    bandwidth, owns_bandwidth = open_job(bandwidth, video_link)
+    timer = PhaseTimer(metrics, job=video_link)
+    timer.start("job")
+    progress_callback = rate_limited(progress_callback, progress_rate)
+    extract_callback = with_phase(progress_callback, "extract")
+    done_callback = with_phase(progress_callback, "done")
+    progress_callback = with_phase(progress_callback, "download")
+    try:
+        if archive is not None:
+            archived = download_from_archive(video_link, archive, output_path, resolution, extract_audio_option,
+                                             audio_format, audio_only or streaming, progress_callback, metrics,
+                                             analyze, trim_silence)
+            if archived:
+                timer.backend = "archive"
+                timer.stop(nbytes=file_size(archived[0] or archived[1]))
+                return archived
             
-        if not video_path:
+        if streaming and audio_format is not None and not isinstance(audio_format, str):
+            # The streaming encoder writes one format; several go through a single decode instead
+            streaming, audio_only = False, True
+        # Streams whose audio fits the requested format avoid a transcode
+        wants_audio = (audio_only or streaming or extract_audio_option) and audio_format
+        selector = StreamSelector(max_bytes, audio_targets(audio_format)[0][0] if wants_audio else None)
+        if streaming:
+            audio_path = stream_audio(video_link, output_path, audio_format, progress_callback, timings, cache,
+                                      metrics, bandwidth, selector)
+            if audio_path:
+                if analyze or trim_silence:
+                    analyze_audio_files(audio_path, trim_silence, extract_callback, metrics, audio_format)
+                if archive is not None:
+                    archive_download(archive, video_link, resolution, audio_format, None, audio_path)
+                timer.backend = "stream"
+                timer.stop(nbytes=file_size(audio_path))
+                return None, audio_path
             if progress_callback:
-                progress_callback("Attempting download with yt-dlp (most powerful)...")
-            video_path = download_with_ytdlp(video_link, output_path, resolution, progress_callback)
+                progress_callback("Falling back to download then extract...")
+            audio_only = True
+            
+        # Try downloading with different methods, healthiest first
+        registry = registry or default_backends
+        video_path = None
+        attempts = 0
+        if cache is not None:
+            video_path = download_from_cache(video_link, cache, output_path, resolution,
+                                             progress_callback, transfer, audio_only, metrics, bandwidth,
+                                             selector)
+            if video_path:
+                timer.backend = "cache"
+        if not video_path and hedge_after is not None:
+            outcome = {}
+            video_path = registry.hedged(registry.ordered(), video_link, output_path, resolution,
+                                         progress_callback, transfer, audio_only, cache, metrics, bandwidth,
+                                         selector, hedge_after=hedge_after, outcome=outcome)
+            attempts = outcome.get('attempts', 0)
+            timer.backend = outcome.get('backend')
+        elif not video_path:
+            for name in registry.ordered():
+                if progress_callback:
+                    progress_callback(f"Attempting download with {registry.label(name)}...")
+                attempts += 1
+                timer.backend = name
+                try:
+                    video_path = registry.attempt(name, video_link, output_path, resolution, progress_callback,
+                                                  transfer, audio_only, cache, metrics, bandwidth, selector)
+                except Exception as e:
+                    # Recorded as a failure by the registry; the next backend still gets its turn
+                    if progress_callback:
+                        progress_callback(f"{registry.label(name)} failed: {e}")
+                    video_path = None
+                # A manifest cached by the failed attempt saves another extraction
+                if not video_path and cache is not None:
+                    video_path = download_from_cache(video_link, cache, output_path, resolution,
+                                                     progress_callback, transfer, audio_only, metrics, bandwidth,
+                                                     selector)
+                    if video_path:
+                        timer.backend = "cache"
+                if video_path:
+                    break
             
         if not video_path:
             if progress_callback:
                 progress_callback("All download methods failed. Please check the URL or try again later.")
-            return None
+            timer.backend = None
+            timer.stop(error="All download methods failed", attempts=attempts)
+            return None, None
             
-        # Extract audio if requested
-        if extract_audio_option:
-            audio_path = extract_audio(video_path, audio_format, progress_callback)
-            return video_path, audio_path
-        
-        if progress_callback:
-            progress_callback("Process completed successfully!")
-        return video_path, None
+        audio_path = None
+        if audio_only:
+            audio_path = convert_audio_only(video_path, audio_format, extract_callback, metrics)
+            video_path = None
+        elif extract_audio_option:
+            # Extract audio if requested
+            audio_path = extract_audio(video_path, audio_format, extract_callback, metrics)
+        elif done_callback:
+            done_callback("Process completed successfully!")
+        if audio_path and (analyze or trim_silence):
+            analyze_audio_files(audio_path, trim_silence, extract_callback, metrics, audio_format)
+            
+        if archive is not None:
+            archive_download(archive, video_link, resolution, audio_format, video_path, audio_path)
+        timer.stop(nbytes=file_size(video_path or audio_path), attempts=attempts)
+        return video_path, audio_path
         
     except Exception as e:
+        timer.stop(error=e)
         if progress_callback:
             progress_callback(f"An error occurred: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+    finally:
+        if owns_bandwidth:
+            bandwidth.close()
\ No newline at end of file
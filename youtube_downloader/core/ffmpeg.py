@@ -0,0 +1,182 @@
+import os
+import re
+import shutil
+import subprocess
+
+# Source audio codecs each container can hold without re-encoding
+COPY_CODECS = {
+    "mp3": {"mp3"},
+    "flac": {"flac"},
+    "m4a": {"aac", "alac"},
+    "ogg": {"opus", "vorbis", "flac"},
+    "opus": {"opus"},
+    "webm": {"opus", "vorbis"},
+}
+
+# Encoder arguments used when the source codec has to be transcoded
+ENCODER_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    "flac": ["-c:a", "flac"],
+    "m4a": ["-c:a", "aac", "-b:a", "192k"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "5"],
+    "opus": ["-c:a", "libopus", "-b:a", "160k"],
+    "webm": ["-c:a", "libopus", "-b:a", "160k"],
+}
+
+_ffmpeg_exe = None
+
+def get_ffmpeg_exe():
+    """Return the ffmpeg executable, preferring the one on PATH"""
+    global _ffmpeg_exe
+    if _ffmpeg_exe is None:
+        _ffmpeg_exe = shutil.which("ffmpeg") or ""
+        if not _ffmpeg_exe:
+            try:
+                # Bundled with moviepy's imageio dependency
+                import imageio_ffmpeg
+                _ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+            except Exception:
+                pass
+    return _ffmpeg_exe or None
+
+def run_ffmpeg(args):
+    """Run ffmpeg with args, raising RuntimeError with its error output on failure"""
+    exe = get_ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg executable not found")
+    result = subprocess.run([exe, "-hide_banner", "-nostdin", *args],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip().splitlines()
+        raise RuntimeError(message[-1] if message else f"ffmpeg exited with {result.returncode}")
+    return result
+
+def probe_audio(path):
+    """Return the ``codec``, ``channels`` and ``bitrate`` of the first audio stream in path
+
+    ffmpeg runs once and the values are parsed from its stream info; each is
+    None if it cannot be determined.
+    """
+    exe = get_ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg executable not found")
+    # Without an output file ffmpeg exits non-zero but still prints the stream info
+    result = subprocess.run([exe, "-hide_banner", "-nostdin", "-i", path],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = result.stderr.decode(errors="replace")
+    return {
+        'codec': _parse_codec(output),
+        'channels': _parse_channels(output),
+        'bitrate': _parse_bitrate(output),
+    }
+
+def _parse_codec(output):
+    match = re.search(r"Stream #\S+.*?: Audio: (\w+)", output)
+    return match.group(1) if match else None
+
+def _parse_channels(output):
+    match = re.search(r"Stream #\S+.*?: Audio: .*?, \d+ Hz, ([^,]+)", output)
+    if not match:
+        return None
+    layout = match.group(1).strip()
+    named = {"mono": 1, "stereo": 2}
+    if layout in named:
+        return named[layout]
+    counted = re.match(r"(\d+) channels", layout)
+    if counted:
+        return int(counted.group(1))
+    # Surround layouts such as 5.1(side)
+    surround = re.match(r"(\d+)\.(\d+)", layout)
+    return int(surround.group(1)) + int(surround.group(2)) if surround else None
+
+def _parse_bitrate(output):
+    # Containers such as Ogg Opus only report the overall bitrate
+    match = (re.search(r"Stream #\S+.*?: Audio: .*?(\d+) kb/s", output)
+             or re.search(r"Duration: .*?bitrate: (\d+) kb/s", output))
+    return f"{match.group(1)}k" if match else None
+
+def probe_audio_codec(path):
+    """Return the codec name of the first audio stream in path, or None"""
+    return probe_audio(path)['codec']
+
+def probe_audio_channels(path):
+    """Return the channel count of the first audio stream in path, or None"""
+    return probe_audio(path)['channels']
+
+def probe_audio_bitrate(path):
+    """Return the bitrate of the first audio stream in path as e.g. ``"128k"``, or None
+
+    Falls back to the overall bitrate for containers that do not report a
+    per-stream one, such as Ogg Opus.
+    """
+    return probe_audio(path)['bitrate']
+
+def normalize_codec(codec):
+    """Map codec strings from stream manifests (e.g. ``mp4a.40.2``) to ffmpeg names"""
+    codec = (codec or "").lower().split(".", 1)[0]
+    return {"mp4a": "aac"}.get(codec, codec)
+
+def can_stream_copy(codec, audio_format):
+    """Whether an audio stream in codec can be remuxed into audio_format as-is"""
+    return codec in COPY_CODECS.get(audio_format, ())
+
+def parse_audio_target(target):
+    """Split an audio target into (format, bitrate)
+
+    Targets are format names (``"flac"``), format and bitrate strings
+    (``"mp3:320k"``) or ``(format, bitrate)`` tuples.
+    """
+    if isinstance(target, str):
+        audio_format, _, bitrate = target.partition(":")
+    else:
+        audio_format, bitrate = target
+    return audio_format.lower(), bitrate or None
+
+def encoder_args(audio_format, bitrate=None):
+    """ffmpeg arguments encoding to audio_format, at bitrate if given"""
+    args = ENCODER_ARGS.get(audio_format, [])
+    if not bitrate or audio_format == "flac":
+        return args
+    # Keep the codec, replace its quality setting by the bitrate
+    return args[:2] + ["-b:a", bitrate]
+
+def extract_audio_ffmpeg(source_path, audio_path, audio_format, bitrate=None):
+    """Write the first audio track of source_path to audio_path
+
+    The stream is copied when its codec already fits the target container and
+    transcoded otherwise. Returns ``"copy"`` or ``"transcode"``.
+    """
+    return extract_audio_outputs_ffmpeg(source_path, [(audio_path, audio_format, bitrate)])[0]
+
+def extract_audio_outputs_ffmpeg(source_path, outputs):
+    """Write the first audio track of source_path to several files in one ffmpeg run
+
+    ``outputs`` is a list of ``(audio_path, audio_format, bitrate)``. The
+    track is decoded once and the decoded audio is fed to every encoder, so
+    the cost grows with the number of encoders rather than decodes. Outputs
+    without a bitrate whose container fits the source codec are stream
+    copies. Returns ``"copy"`` or ``"transcode"`` for each output.
+    """
+    codec = probe_audio_codec(source_path)
+    if codec is None:
+        raise RuntimeError(f"No audio stream found in {source_path}")
+
+    args = ["-y", "-i", source_path]
+    modes = []
+    for audio_path, audio_format, bitrate in outputs:
+        if not bitrate and can_stream_copy(codec, audio_format):
+            modes.append("copy")
+            codec_args = ["-c:a", "copy"]
+        else:
+            modes.append("transcode")
+            codec_args = encoder_args(audio_format, bitrate)
+        args += ["-map", "0:a:0", "-vn", *codec_args, audio_path]
+
+    try:
+        run_ffmpeg(args)
+    except Exception:
+        for audio_path, _, _ in outputs:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+        raise
+    return modes
@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from youtube_downloader.utils.helpers import get_cache_dir
+
+JOB_COLUMNS = ("id", "url", "options", "status", "video_path", "audio_path", "error",
+               "created_at", "started_at", "finished_at")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+class JobStore:
+    """Durable download queue in SQLite
+
+    Jobs move from ``queued`` to ``running`` to ``done``, ``failed`` or
+    ``cancelled``. ``claim()`` hands out the oldest queued job atomically,
+    so the workers of a process, or a second store on the same file, never
+    get the same job. Any process may queue jobs, but one process owns the
+    store and runs them: jobs that were running when it stopped are queued
+    again by its ``recover()``, and their partial files let them resume.
+    """
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(get_cache_dir(), "jobs.sqlite3")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " url TEXT NOT NULL,"
+                " options TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " video_path TEXT,"
+                " audio_path TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def add(self, url, options=None):
+        """Queue a URL with download_video options and return the job ID"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (url, options, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (url, json.dumps(options or {}), time.time())
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if there is no such job"""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _job_dict(row) if row else None
+
+    def list(self, status=None, limit=100, offset=0):
+        """Return jobs, newest first, optionally only those with status"""
+        query = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [_job_dict(row) for row in rows]
+
+    def claim(self):
+        """Mark the oldest queued job running and return it, or None if the queue is empty"""
+        with self._lock:
+            while True:
+                with self._db:
+                    row = self._db.execute(
+                        f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    now = time.time()
+                    # Only succeeds if no other connection claimed the job since the SELECT
+                    cursor = self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                        (now, row[0])
+                    )
+                if cursor.rowcount:
+                    break
+        job = _job_dict(row)
+        job['status'] = "running"
+        job['started_at'] = now
+        return job
+
+    def finish(self, job_id, status, video_path=None, audio_path=None, error=None):
+        """Record a job's outcome; a list of audio paths is stored as JSON"""
+        if audio_path is not None and not isinstance(audio_path, str):
+            audio_path = json.dumps(list(audio_path))
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, video_path = ?, audio_path = ?, error = ?, finished_at = ?"
+                " WHERE id = ?",
+                (status, video_path, audio_path, error, time.time(), job_id)
+            )
+
+    def requeue(self, job_id):
+        """Put a running job back in the queue, e.g. when the service stops"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE id = ? AND status = 'running'",
+                (job_id,)
+            )
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns whether it was still queued"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount > 0
+
+    def recover(self):
+        """Queue jobs left running by a previous process and return how many
+
+        Call it only from the process that owns the store, before its
+        workers start: every running job is taken to be orphaned.
+        """
+        with self._lock, self._db:
+            cursor = self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            return cursor.rowcount
+
+    def counts(self):
+        """Return the number of jobs per status"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        self._db.close()
+
+def _job_dict(row):
+    job = dict(zip(JOB_COLUMNS, row))
+    job['options'] = json.loads(job['options'])
+    if job['audio_path'] and job['audio_path'].startswith("["):
+        job['audio_path'] = json.loads(job['audio_path'])
+    return job
@@ -0,0 +1,177 @@
+import cProfile
+import collections
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+METRIC_PREFIX = "youtube_downloader"
+
+class MetricsRecorder:
+    """Collects per-phase timings of downloads
+
+    Every record is a dict with ``phase``, ``duration`` (seconds),
+    ``status`` (``"ok"`` or ``"error"``), ``error``, ``backend``, ``job``
+    (the video link), ``bytes`` and ``time``. The most recent
+    ``max_records`` are kept in memory; with ``jsonl_path`` every record is
+    also appended to that file as one JSON line. Totals per phase, backend
+    and status are kept for the whole lifetime and exported by
+    ``write_prometheus()``.
+    """
+    def __init__(self, jsonl_path=None, max_records=10000):
+        self.jsonl_path = jsonl_path
+        self._records = collections.deque(maxlen=max_records)
+        # (phase, backend, status) -> [count, seconds, bytes]
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, duration, backend=None, job=None, nbytes=None, error=None, **fields):
+        record = {
+            'time': time.time(),
+            'phase': phase,
+            'duration': duration,
+            'status': "error" if error else "ok",
+            'error': str(error) if error else None,
+            'backend': backend,
+            'job': job,
+            'bytes': nbytes,
+        }
+        record.update(fields)
+        with self._lock:
+            self._records.append(record)
+            totals = self._totals.setdefault((phase, backend or "", record['status']), [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] += nbytes or 0
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        return record
+
+    def records(self, job=None):
+        """Return the kept records, optionally only those of one job"""
+        with self._lock:
+            return [r for r in self._records if job is None or r['job'] == job]
+
+    def summary(self):
+        """Return totals as a list of dicts, one per phase, backend and status"""
+        with self._lock:
+            return [
+                {'phase': phase, 'backend': backend or None, 'status': status,
+                 'count': count, 'seconds': seconds, 'bytes': nbytes}
+                for (phase, backend, status), (count, seconds, nbytes) in sorted(self._totals.items())
+            ]
+
+    def prometheus_text(self):
+        """Render the totals in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_phase_seconds Time spent in each download phase",
+            f"# TYPE {METRIC_PREFIX}_phase_seconds summary",
+        ]
+        summary = self.summary()
+        for entry in summary:
+            labels = _labels(entry)
+            lines.append(f"{METRIC_PREFIX}_phase_seconds_sum{{{labels}}} {entry['seconds']:.6f}")
+            lines.append(f"{METRIC_PREFIX}_phase_seconds_count{{{labels}}} {entry['count']}")
+        lines += [
+            f"# HELP {METRIC_PREFIX}_phase_bytes_total Bytes handled in each download phase",
+            f"# TYPE {METRIC_PREFIX}_phase_bytes_total counter",
+        ]
+        for entry in summary:
+            lines.append(f"{METRIC_PREFIX}_phase_bytes_total{{{_labels(entry)}}} {entry['bytes']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the totals for the node_exporter textfile collector
+
+        The file is replaced atomically so the collector never reads a
+        partial file.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def write_jsonl(self, path):
+        """Write the kept records to path as JSON lines"""
+        with open(path, "w") as f:
+            for record in self.records():
+                f.write(json.dumps(record) + "\n")
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._totals.clear()
+
+def _labels(entry):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(entry[name] or "")}"' for name in ("phase", "backend", "status"))
+
+class PhaseTimer:
+    """Times consecutive phases of one operation
+
+    ``start(phase)`` ends the running phase and begins the next one;
+    ``stop()`` ends it, as failed if ``error`` is given. Without a recorder
+    every call is a no-op, so call sites need no checks.
+    """
+    def __init__(self, metrics, backend=None, job=None):
+        self.metrics = metrics
+        self.backend = backend
+        self.job = job
+        self._phase = None
+        self._started = None
+
+    def start(self, phase):
+        self.stop()
+        self._phase = phase
+        self._started = time.perf_counter()
+
+    def stop(self, error=None, nbytes=None, **fields):
+        if self._phase is None:
+            return
+        if self.metrics is not None:
+            self.metrics.record(self._phase, time.perf_counter() - self._started, self.backend, self.job,
+                                nbytes, error, **fields)
+        self._phase = None
+
+def file_size(path):
+    """Size of path, or the total of a list of paths, in bytes; None if missing"""
+    if path and not isinstance(path, str):
+        sizes = [file_size(item) for item in path]
+        return None if None in sizes else sum(sizes)
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+@contextmanager
+def profile_job(path_prefix, top=25):
+    """Profile the enclosed code with cProfile and tracemalloc
+
+    Writes ``<path_prefix>.prof`` (open it with ``pstats`` or snakeviz) and
+    ``<path_prefix>.tracemalloc.txt`` listing peak traced memory and the
+    ``top`` allocation sites. Only the calling thread is profiled, so use it
+    around a single job.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        profiler.dump_stats(f"{path_prefix}.prof")
+        with open(f"{path_prefix}.tracemalloc.txt", "w") as f:
+            f.write(f"current: {current} bytes\npeak: {peak} bytes\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
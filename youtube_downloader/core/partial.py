@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+class PartialDownload:
+    """On-disk state of an interrupted download
+
+    Data is written to ``<path>.part`` and a ``<path>.part.json`` sidecar
+    records the stream identity, the expected size, the server validators
+    (ETag / Last-Modified) and the byte ranges already written. A later
+    attempt for the same stream can load it and fetch only what is missing.
+    """
+    def __init__(self, path, identity, size, etag=None, last_modified=None, completed=None):
+        self.path = path
+        self.identity = identity
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.completed = [list(r) for r in completed or []]
+        self._lock = threading.Lock()
+        # Segments save concurrently; they share one temporary file
+        self._save_lock = threading.Lock()
+
+    @property
+    def part_path(self):
+        return self.path + ".part"
+
+    @property
+    def state_path(self):
+        return self.path + ".part.json"
+
+    @classmethod
+    def load(cls, path):
+        """Return the saved state for path, or None if there is no usable one"""
+        state = cls(path, None, None)
+        if not os.path.exists(state.part_path):
+            return None
+        try:
+            with open(state.state_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(path, data.get('identity'), data.get('size'), data.get('etag'),
+                   data.get('last_modified'), data.get('completed'))
+
+    def matches(self, identity, size, etag=None, last_modified=None):
+        """Whether this state belongs to the same, unchanged remote stream"""
+        if self.identity != identity or self.size != size:
+            return False
+        if self.etag and etag and self.etag != etag:
+            return False
+        if self.last_modified and last_modified and self.last_modified != last_modified:
+            return False
+        return True
+
+    @property
+    def bytes_done(self):
+        with self._lock:
+            return sum(end - start + 1 for start, end in self.completed)
+
+    def add(self, start, end):
+        """Mark the inclusive byte range start-end as written"""
+        with self._lock:
+            ranges = sorted(self.completed + [[start, end]])
+            merged = [ranges[0]]
+            for range_start, range_end in ranges[1:]:
+                if range_start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], range_end)
+                else:
+                    merged.append([range_start, range_end])
+            self.completed = merged
+
+    def missing(self, ranges):
+        """Split (start, end) ranges into the sub-ranges not yet written"""
+        with self._lock:
+            completed = list(self.completed)
+        result = []
+        for start, end in ranges:
+            position = start
+            for done_start, done_end in completed:
+                if done_end < position or done_start > end:
+                    continue
+                if done_start > position:
+                    result.append((position, done_start - 1))
+                position = max(position, done_end + 1)
+            if position <= end:
+                result.append((position, end))
+        return result
+
+    def save(self):
+        """Atomically write the sidecar"""
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    'identity': self.identity,
+                    'size': self.size,
+                    'etag': self.etag,
+                    'last_modified': self.last_modified,
+                    'completed': self.completed,
+                }
+            temp_path = self.state_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.state_path)
+
+    def finish(self):
+        """Move the completed data into place and drop the sidecar"""
+        os.replace(self.part_path, self.path)
+        self.discard_state()
+
+    def discard_state(self):
+        for path in (self.state_path, self.state_path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def discard(self):
+        """Remove all partial data"""
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+        self.discard_state()
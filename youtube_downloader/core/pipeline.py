@@ -0,0 +1,128 @@
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+
+from youtube_downloader.core.ffmpeg import can_stream_copy, encoder_args, get_ffmpeg_exe, normalize_codec
+from youtube_downloader.core.progress import SpeedMeter
+from youtube_downloader.core.transfer import DEFAULT_CHUNK_SIZE, expected_length, open_url
+
+def _put(chunks, item, stop):
+    """Put item on the queue, giving up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            pass
+
+def _reader(url, headers, chunks, chunk_size, marks, stop, bandwidth=None):
+    """Transfer stage: push downloaded chunks into the bounded queue"""
+    try:
+        received = 0
+        with open_url(url, headers) as response:
+            expected = expected_length(response)
+            while not stop.is_set():
+                chunk = response.read(chunk_size)
+                if "first_byte" not in marks:
+                    marks["first_byte"] = time.monotonic()
+                if not chunk:
+                    break
+                if bandwidth is not None:
+                    bandwidth.consume(len(chunk))
+                received += len(chunk)
+                _put(chunks, chunk, stop)
+        if not stop.is_set() and expected is not None and received < expected:
+            raise IOError(f"connection closed early at byte {received} of {expected}")
+        marks["transfer_end"] = time.monotonic()
+        _put(chunks, None, stop)
+    except Exception as e:
+        _put(chunks, e, stop)
+
+def _remove_partial(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def stream_transcode(url, audio_path, audio_format="mp3", headers=None, total_size=None,
+                     codec=None, chunk_size=DEFAULT_CHUNK_SIZE, max_buffered_chunks=32,
+                     progress_callback=None, bandwidth=None, bitrate=None):
+    """Encode url to audio_path while it is still being downloaded
+
+    A reader thread feeds downloaded chunks through a queue of at most
+    ``max_buffered_chunks`` entries into ffmpeg's stdin, so encoding overlaps
+    the transfer and memory stays bounded. If the source ``codec`` is known
+    and fits the target container the stream is copied instead of encoded,
+    unless a ``bitrate`` is requested.
+    The transfer draws from ``bandwidth``, a ``BandwidthJob``, if given.
+
+    Returns a dict of phase durations in seconds and the byte count.
+    """
+    exe = get_ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg executable not found")
+
+    if codec and not bitrate and can_stream_copy(normalize_codec(codec), audio_format):
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = encoder_args(audio_format, bitrate)
+
+    chunks = queue.Queue(maxsize=max_buffered_chunks)
+    stop = threading.Event()
+    marks = {"start": time.monotonic()}
+    reader = threading.Thread(target=_reader, args=(url, headers, chunks, chunk_size, marks, stop, bandwidth),
+                              daemon=True)
+
+    with tempfile.TemporaryFile() as stderr:
+        encoder = subprocess.Popen(
+            [exe, "-hide_banner", "-y", "-i", "pipe:0", "-map", "0:a:0", "-vn", *codec_args, audio_path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        reader.start()
+        received = 0
+        meter = SpeedMeter(total_size)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                try:
+                    encoder.stdin.write(chunk)
+                except BrokenPipeError:
+                    # ffmpeg gave up, its exit status below carries the error
+                    stop.set()
+                    break
+                received += len(chunk)
+                if progress_callback:
+                    progress_callback(meter.add(len(chunk)))
+            try:
+                encoder.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = encoder.wait()
+        except BaseException:
+            stop.set()
+            encoder.kill()
+            encoder.wait()
+            _remove_partial(audio_path)
+            raise
+        stop.set()
+        if returncode != 0:
+            stderr.seek(0)
+            lines = stderr.read().decode(errors="replace").strip().splitlines()
+            _remove_partial(audio_path)
+            raise RuntimeError(lines[-1] if lines else f"ffmpeg exited with {returncode}")
+
+    end = time.monotonic()
+    first_byte = marks.get("first_byte", end)
+    transfer_end = marks.get("transfer_end", end)
+    return {
+        "first_byte": first_byte - marks["start"],
+        "transfer": transfer_end - first_byte,
+        "encode_tail": end - transfer_end,
+        "total": end - marks["start"],
+        "bytes": received,
+    }
@@ -0,0 +1,114 @@
+import datetime
+import re
+from itertools import islice
+
+from youtube_downloader.core.batch import BatchDownloader
+from youtube_downloader.utils.helpers import extract_video_id
+
+def is_playlist_url(url):
+    """Whether url points to a playlist or channel rather than a single video
+
+    A link to a video within a playlist, e.g. ``watch?v=<id>&list=...`` or
+    ``youtu.be/<id>?list=...``, is that single video.
+    """
+    if extract_video_id(url):
+        return False
+    return bool(re.search(r"[?&]list=|/playlist\b|/(?:channel|c|user)/|/@[^/?]+", url))
+
+def _to_date(value):
+    """Normalize a date, datetime or YYYYMMDD string to a YYYYMMDD string"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y%m%d")
+    return str(value).replace("-", "")
+
+def _entry_date(entry):
+    if entry.get('upload_date'):
+        return entry['upload_date']
+    timestamp = entry.get('timestamp') or entry.get('release_timestamp')
+    if timestamp:
+        return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y%m%d")
+    return None
+
+def _video_url(entry):
+    url = entry.get('url') or entry.get('id')
+    if url and not url.startswith("http"):
+        url = f"https://www.youtube.com/watch?v={url}"
+    return url
+
+def _iter_entries(ydl, url):
+    """Yield flat video entries, descending into channel tabs and nested playlists"""
+    info = ydl.extract_info(url, download=False, process=False)
+    if info.get('_type') not in ('playlist', 'multi_video'):
+        yield info
+        return
+    # Unprocessed entries are a generator that fetches one page at a time
+    for entry in info.get('entries') or ():
+        if entry is None:
+            continue
+        if entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab':
+            yield from _iter_entries(ydl, entry.get('url') or entry.get('webpage_url'))
+        else:
+            yield entry
+
+def iter_playlist(url, start=None, stop=None, date_after=None, date_before=None, progress_callback=None):
+    """Lazily yield the video URLs of a playlist or channel
+
+    Pages are fetched only as the generator is consumed, so downloads can
+    start right away and memory stays flat for any playlist size. ``start``
+    and ``stop`` are 1-based inclusive positions. ``date_after`` and
+    ``date_before`` (dates or ``YYYYMMDD`` strings) keep only videos uploaded
+    in that range; entries whose listing carries no date are looked up
+    individually.
+    """
+    import yt_dlp
+
+    date_after = _to_date(date_after)
+    date_before = _to_date(date_before)
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        entries = _iter_entries(ydl, url)
+        first = max((start or 1) - 1, 0)
+        for position, entry in enumerate(islice(entries, first, stop), first + 1):
+            video_url = _video_url(entry)
+            if not video_url:
+                continue
+            if date_after or date_before:
+                upload_date = _entry_date(entry)
+                if upload_date is None:
+                    try:
+                        upload_date = _entry_date(ydl.extract_info(video_url, download=False, process=False))
+                    except Exception as e:
+                        if progress_callback:
+                            progress_callback(f"Could not get upload date of {video_url}: {e}")
+                        continue
+                if upload_date is None:
+                    continue
+                if date_after and upload_date < date_after:
+                    continue
+                if date_before and upload_date > date_before:
+                    continue
+            if progress_callback:
+                progress_callback(f"Queued #{position}: {entry.get('title') or video_url}")
+            yield video_url
+
+def download_playlist(url, start=None, stop=None, date_after=None, date_before=None,
+                      max_workers=4, progress_callback=None, **download_options):
+    """Download a playlist or channel, yielding each BatchJob as it finishes
+
+    Entries go to the download pool as soon as they are discovered.
+    ``progress_callback`` is called as ``progress_callback(job, message)``;
+    discovery messages are passed with ``job=None``.
+    """
+    discovery_callback = None
+    if progress_callback:
+        discovery_callback = lambda message: progress_callback(None, message)
+    urls = iter_playlist(url, start, stop, date_after, date_before, discovery_callback)
+    downloader = BatchDownloader(max_workers, progress_callback=progress_callback, **download_options)
+    return downloader.run(urls)
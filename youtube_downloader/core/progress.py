@@ -0,0 +1,164 @@
+import threading
+import time
+
+def format_bytes(nbytes):
+    """Human-readable byte count"""
+    size = float(nbytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class ProgressEvent(str):
+    """A progress message carrying structured transfer state
+
+    The event is the human-readable message itself, so callbacks that treat
+    progress as plain strings keep working. Consumers that want more read
+    ``phase`` (``"download"``, ``"extract"`` or ``"done"``),
+    ``bytes_done``, ``bytes_total``, ``speed`` (bytes/s), ``eta`` (seconds)
+    and ``backend``.
+    """
+    def __new__(cls, phase, message=None, bytes_done=None, bytes_total=None, speed=None, eta=None, backend=None):
+        if message is None:
+            message = cls._byte_message(bytes_done, bytes_total)
+        event = super().__new__(cls, message)
+        event.phase = phase
+        event.bytes_done = bytes_done
+        event.bytes_total = bytes_total
+        event.speed = speed
+        event.eta = eta
+        event.backend = backend
+        return event
+
+    @staticmethod
+    def _byte_message(bytes_done, bytes_total):
+        if bytes_total:
+            return f"Progress: {int(bytes_done * 100 / bytes_total)}%"
+        return f"Progress: {format_bytes(bytes_done or 0)}"
+
+    @property
+    def is_bytes(self):
+        """Whether this event reports transferred bytes"""
+        return self.bytes_done is not None
+
+    @property
+    def fraction(self):
+        if not self.bytes_total:
+            return None
+        return min(self.bytes_done / self.bytes_total, 1.0)
+
+    @property
+    def is_final(self):
+        return self.is_bytes and self.bytes_total is not None and self.bytes_done >= self.bytes_total
+
+    def replace(self, **changes):
+        """Return a copy of the event with some fields changed"""
+        fields = self.as_dict()
+        fields.update(changes)
+        return ProgressEvent(**fields)
+
+    def as_dict(self):
+        """Return the message and its fields as a JSON-serializable dict"""
+        return {
+            'phase': self.phase,
+            'message': str(self),
+            'bytes_done': self.bytes_done,
+            'bytes_total': self.bytes_total,
+            'speed': self.speed,
+            'eta': self.eta,
+            'backend': self.backend,
+        }
+
+    def __reduce__(self):
+        return (ProgressEvent, (self.phase, str(self), self.bytes_done, self.bytes_total,
+                                self.speed, self.eta, self.backend))
+
+def as_event(message, phase, backend=None):
+    """Turn a plain message into a ProgressEvent, filling in missing fields"""
+    if isinstance(message, ProgressEvent):
+        if message.backend is None and backend is not None:
+            return message.replace(backend=backend)
+        return message
+    return ProgressEvent(phase, str(message), backend=backend)
+
+def with_phase(progress_callback, phase, backend=None):
+    """Wrap a callback so plain messages arrive as ProgressEvents of phase"""
+    if not progress_callback:
+        return None
+    return lambda message: progress_callback(as_event(message, phase, backend))
+
+class SpeedMeter:
+    """Tracks transferred bytes and derives a smoothed speed and ETA
+
+    ``add()`` is thread-safe and returns a byte ProgressEvent.
+    """
+    def __init__(self, bytes_total=None, smoothing=0.3, phase="download"):
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.smoothing = smoothing
+        self.phase = phase
+        self.speed = None
+        self._last_time = time.monotonic()
+        self._last_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        with self._lock:
+            self.bytes_done += nbytes
+            return self._event()
+
+    def skip(self, nbytes):
+        """Count bytes that were already present, e.g. when resuming, without affecting speed"""
+        with self._lock:
+            self.bytes_done += nbytes
+            self._last_bytes += nbytes
+
+    def update(self, bytes_done):
+        """Set the absolute byte count, for sources that report totals"""
+        with self._lock:
+            self.bytes_done = bytes_done
+            return self._event()
+
+    def _event(self):
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed >= 0.2:
+            current = (self.bytes_done - self._last_bytes) / elapsed
+            if self.speed is None:
+                self.speed = current
+            else:
+                self.speed += self.smoothing * (current - self.speed)
+            self._last_time = now
+            self._last_bytes = self.bytes_done
+        eta = None
+        if self.speed and self.bytes_total:
+            eta = max(self.bytes_total - self.bytes_done, 0) / self.speed
+        return ProgressEvent(self.phase, bytes_done=self.bytes_done, bytes_total=self.bytes_total,
+                             speed=self.speed, eta=eta)
+
+class RateLimitedCallback:
+    """Coalesce byte progress events to at most max_rate per second
+
+    Byte events arriving faster than that are dropped, except the final
+    one. Any other message is passed through immediately.
+    """
+    def __init__(self, callback, max_rate=10.0):
+        self.callback = callback
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, message):
+        if isinstance(message, ProgressEvent) and message.is_bytes and not message.is_final:
+            now = time.monotonic()
+            with self._lock:
+                if now - self._last_emit < self.interval:
+                    return
+                self._last_emit = now
+        self.callback(message)
+
+def rate_limited(progress_callback, max_rate):
+    """Wrap progress_callback in a RateLimitedCallback unless it already is one"""
+    if not progress_callback or not max_rate or isinstance(progress_callback, RateLimitedCallback):
+        return progress_callback
+    return RateLimitedCallback(progress_callback, max_rate)
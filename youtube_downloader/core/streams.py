@@ -0,0 +1,227 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+from youtube_downloader.core.ffmpeg import can_stream_copy, normalize_codec
+from youtube_downloader.core.progress import format_bytes
+
+# Audio containers that can be muxed with a video container without re-encoding
+MERGE_CONTAINERS = {"mp4": ("m4a", "mp4"), "webm": ("webm",)}
+# Protocols whose URL is the media itself rather than an HLS or DASH manifest
+DIRECT_PROTOCOLS = ("http", "https")
+
+def describe_pytube_stream(stream):
+    """Return a plain dict describing a pytube/pytubefix Stream"""
+    return {
+        'itag': str(stream.itag),
+        'url': stream.url,
+        'ext': stream.subtype,
+        'mime_type': stream.mime_type,
+        'resolution': stream.resolution,
+        'abr': stream.abr,
+        # Avoid the HEAD request the filesize property makes when it is unknown
+        'filesize': getattr(stream, '_filesize', None) or None,
+        'bitrate': getattr(stream, 'bitrate', None),
+        'audio_codec': stream.audio_codec,
+        'video_codec': stream.video_codec,
+        'only_audio': stream.includes_audio_track and not stream.includes_video_track,
+        'is_progressive': stream.is_progressive,
+        'protocol': "https",
+        'headers': None,
+    }
+
+def describe_ytdlp_format(fmt):
+    """Return a plain dict describing a yt-dlp format"""
+    acodec = fmt.get('acodec') or 'none'
+    vcodec = fmt.get('vcodec') or 'none'
+    height = fmt.get('height')
+    return {
+        'itag': str(fmt.get('format_id')),
+        'url': fmt.get('url'),
+        'ext': fmt.get('ext'),
+        'mime_type': f"{'audio' if vcodec == 'none' else 'video'}/{fmt.get('ext')}",
+        'resolution': f"{height}p" if height else None,
+        'abr': f"{int(fmt['abr'])}kbps" if fmt.get('abr') else None,
+        'filesize': fmt.get('filesize') or fmt.get('filesize_approx'),
+        'bitrate': int(fmt['tbr'] * 1000) if fmt.get('tbr') else None,
+        'audio_codec': None if acodec == 'none' else acodec,
+        'video_codec': None if vcodec == 'none' else vcodec,
+        'only_audio': vcodec == 'none' and acodec != 'none',
+        'is_progressive': vcodec != 'none' and acodec != 'none',
+        'protocol': fmt.get('protocol'),
+        'headers': fmt.get('http_headers'),
+    }
+
+def _kbps(abr):
+    try:
+        return float((abr or "0").rstrip("kbps"))
+    except ValueError:
+        return 0.0
+
+def _height(resolution):
+    try:
+        return int((resolution or "0").rstrip("p"))
+    except ValueError:
+        return 0
+
+def estimated_size(stream, duration=None):
+    """Size of a described stream in bytes, estimated from its bitrate if unknown"""
+    if stream.get('filesize'):
+        return stream['filesize']
+    if stream.get('bitrate') and duration:
+        return int(stream['bitrate'] * duration / 8)
+    return None
+
+class StreamSelector:
+    """Ranks described streams, see describe_pytube_stream() and describe_ytdlp_format()
+
+    Video streams are ranked by, in order:
+
+    1. fitting ``max_bytes``; streams of unknown size are assumed to fit
+    2. the nearest resolution at or below the target, or the lowest above
+       it when nothing is at or below; without a target the highest
+    3. an audio track that can be stream-copied to ``audio_format``
+    4. the smallest estimated size
+
+    Audio-only streams are ranked by the budget, a stream-copyable codec and
+    then the highest bitrate. When nothing fits the budget the smallest
+    stream wins. ``choose()`` also explains its pick in a sentence for the
+    progress log.
+    """
+    def __init__(self, max_bytes=None, audio_format=None):
+        self.max_bytes = max_bytes
+        self.audio_format = audio_format
+
+    def choose(self, streams, resolution=None, audio_only=False, duration=None, merge=False):
+        """Return the best candidate, or None if there is no usable stream
+
+        A candidate is a dict with the ``stream``, an ``audio`` stream to
+        merge with it or None, the estimated ``size`` and the ``reason`` it
+        was chosen. With ``merge`` video-only streams paired with an audio
+        stream compete with the progressive ones.
+        """
+        candidates = self.rank(streams, resolution, audio_only, duration, merge)
+        if not candidates:
+            return None
+        choice = candidates[0]
+        choice['reason'] = self._explain(choice, candidates, resolution, audio_only)
+        return choice
+
+    def rank(self, streams, resolution=None, audio_only=False, duration=None, merge=False):
+        """Return all candidates, best first"""
+        if audio_only:
+            candidates = [self._candidate(s, None, duration) for s in streams if s['only_audio']]
+            return sorted(candidates, key=self._audio_key)
+        candidates = [self._candidate(s, None, duration) for s in streams if s['is_progressive']]
+        if merge:
+            audio = [s for s in streams if s['only_audio']]
+            for stream in streams:
+                if stream['video_codec'] and not stream['is_progressive']:
+                    companion = self._companion(stream, audio, duration)
+                    if companion:
+                        candidates.append(self._candidate(stream, companion, duration))
+        target = _height(resolution) or None
+        return sorted(candidates, key=lambda candidate: self._video_key(candidate, target))
+
+    def _candidate(self, stream, audio, duration):
+        sizes = [estimated_size(s, duration) for s in (stream, audio) if s]
+        return {'stream': stream, 'audio': audio, 'size': None if None in sizes else sum(sizes)}
+
+    def _companion(self, video, audio, duration):
+        """Best audio stream to merge with a video-only stream, preferring one its container can hold"""
+        containers = MERGE_CONTAINERS.get(video['ext'], ())
+        ranked = sorted((self._candidate(s, None, duration) for s in audio),
+                        key=lambda candidate: (candidate['stream']['ext'] not in containers,
+                                               self._audio_key(candidate)))
+        return ranked[0]['stream'] if ranked else None
+
+    def _fits(self, candidate):
+        return not self.max_bytes or candidate['size'] is None or candidate['size'] <= self.max_bytes
+
+    def _copyable(self, candidate):
+        stream = candidate['audio'] or candidate['stream']
+        return bool(self.audio_format) and can_stream_copy(normalize_codec(stream['audio_codec']),
+                                                           self.audio_format)
+
+    def _audio_key(self, candidate):
+        if not self._fits(candidate):
+            return (1, candidate['size'])
+        return (0, not self._copyable(candidate), -_kbps(candidate['stream']['abr']))
+
+    def _video_key(self, candidate, target):
+        if not self._fits(candidate):
+            return (1, candidate['size'])
+        height = _height(candidate['stream']['resolution'])
+        if target is None:
+            tier, distance = 0, -height
+        elif height <= target:
+            tier, distance = 0, target - height
+        else:
+            tier, distance = 1, height - target
+        size = candidate['size'] if candidate['size'] is not None else float("inf")
+        return (0, tier, distance, not self._copyable(candidate), size)
+
+    def _explain(self, choice, candidates, resolution, audio_only):
+        stream = choice['stream']
+        label = stream['abr'] if audio_only else stream['resolution']
+        details = [stream['ext']]
+        if choice['audio']:
+            details.append(f"+ {choice['audio']['abr'] or choice['audio']['ext']} audio")
+        if choice['size']:
+            details.append(format_bytes(choice['size']))
+        reasons = []
+        copy_explained = False
+        if not self._fits(choice):
+            reasons.append(f"nothing fits the {format_bytes(self.max_bytes)} budget, smallest available")
+        else:
+            if audio_only:
+                top = max(_kbps(candidate['stream']['abr']) for candidate in candidates if self._fits(candidate))
+                if _kbps(stream['abr']) >= top:
+                    reasons.append("highest bitrate")
+                else:
+                    # A copyable stream outranked higher bitrates
+                    reasons.append(f"highest bitrate that can be stream-copied to {self.audio_format}")
+                    copy_explained = True
+            elif resolution:
+                height, target = _height(stream['resolution']), _height(resolution)
+                if height == target:
+                    reasons.append(f"matches {resolution}")
+                elif height < target:
+                    available = any(_height(c['stream']['resolution']) == target for c in candidates)
+                    reasons.append(f"{resolution} {'over budget' if available else 'not available'}, nearest below")
+                else:
+                    reasons.append(f"nothing at or below {resolution}, nearest above")
+            else:
+                reasons.append("highest resolution")
+            if any(not self._fits(candidate) for candidate in candidates):
+                reasons.append(f"within the {format_bytes(self.max_bytes)} budget")
+            if self._copyable(choice) and not copy_explained:
+                reasons.append(f"audio can be stream-copied to {self.audio_format}")
+            if not audio_only:
+                alike = [candidate['size'] for candidate in candidates if self._fits(candidate)
+                         and candidate['stream']['resolution'] == stream['resolution']]
+                if len(alike) > 1 and choice['size'] is not None and choice['size'] <= min(
+                        size for size in alike if size is not None):
+                    reasons.append(f"smallest of {len(alike)} at {stream['resolution']}")
+        return f"Selected {label} ({', '.join(details)}): {'; '.join(reasons)}"
+
+def select_stream(streams, resolution=None, audio_only=False, selector=None):
+    """Pick the best stream from described streams, see StreamSelector"""
+    choice = (selector or StreamSelector()).choose(streams, resolution, audio_only)
+    return choice['stream'] if choice else None
+
+def url_expiry(url):
+    """Return the expiry timestamp embedded in a signed media URL, or None"""
+    values = parse_qs(urlparse(url or "").query).get('expire')
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+def streams_expiry(streams, default_ttl):
+    """Earliest expiry of all stream URLs, capped at default_ttl from now"""
+    expiry = time.time() + default_ttl
+    for stream in streams:
+        stream_expiry = url_expiry(stream['url'])
+        if stream_expiry:
+            expiry = min(expiry, stream_expiry)
+    return expiry
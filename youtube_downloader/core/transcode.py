@@ -0,0 +1,56 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from youtube_downloader.core.downloader import analyze_audio_files, convert_audio_only, extract_audio
+
+def _transcode_job(source_path, audio_format, audio_only, analyze=False, trim_silence=False):
+    """Runs in a worker process, returns (audio_path, progress messages)"""
+    messages = []
+    if audio_only:
+        audio_path = convert_audio_only(source_path, audio_format, messages.append)
+    else:
+        audio_path = extract_audio(source_path, audio_format, messages.append)
+    if audio_path and (analyze or trim_silence):
+        analyze_audio_files(audio_path, trim_silence, messages.append, audio_format=audio_format)
+    return audio_path, messages
+
+class TranscodePool:
+    """Audio extraction stage backed by a process pool
+
+    The pool defaults to one process per CPU. At most ``max_pending`` jobs
+    may be queued or running; ``submit()`` blocks beyond that, which holds
+    back the download threads so finished media cannot pile up on disk.
+    """
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def submit(self, source_path, audio_format="mp3", audio_only=False, analyze=False, trim_silence=False):
+        """Queue an extraction and return a Future of (audio_path, messages)
+
+        With ``audio_only`` the source is an audio-only download that is
+        converted to audio_format and then removed. ``analyze`` and
+        ``trim_silence`` run the loudness analysis on the result, see
+        ``analyze_audio_files()``.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_transcode_job, source_path, audio_format, audio_only,
+                                           analyze, trim_silence)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,221 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_downloader.core.connections import get_pool
+from youtube_downloader.core.partial import PartialDownload
+from youtube_downloader.core.progress import SpeedMeter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MIN_SEGMENT_SIZE = 1024 * 1024
+# How many bytes a segment writes between sidecar updates
+STATE_SAVE_INTERVAL = 4 * 1024 * 1024
+
+def open_url(url, headers=None, byte_range=None, timeout=30, pool=None):
+    """Open an HTTP(S) URL, optionally for an inclusive (start, end) byte range
+
+    The request goes over a kept-alive connection from ``pool``, by default
+    the process-wide ``ConnectionPool``.
+    """
+    request_headers = {"User-Agent": USER_AGENT}
+    if headers:
+        request_headers.update(headers)
+    if byte_range:
+        start, end = byte_range
+        request_headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+    return (pool or get_pool()).open(url, request_headers, timeout)
+
+def probe_url(url, headers=None, timeout=30, pool=None):
+    """Return a dict with the size, Range support and validators of a URL"""
+    with open_url(url, headers, byte_range=(0, 0), timeout=timeout, pool=pool) as response:
+        content_range = response.headers.get("Content-Range", "")
+        match = re.match(r"bytes\s+\d+-\d+/(\d+)", content_range)
+        if response.status == 206 and match:
+            size, ranges = int(match.group(1)), True
+        else:
+            length = response.headers.get("Content-Length")
+            size, ranges = (int(length) if length else None), False
+        return {
+            'size': size,
+            'ranges': ranges,
+            'etag': response.headers.get("ETag"),
+            'last_modified': response.headers.get("Last-Modified"),
+        }
+
+def expected_length(response, total_size=None):
+    """Number of body bytes a complete response carries, or None if unknown"""
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return total_size
+
+class SegmentedDownloader:
+    """Fetch a single URL over several parallel HTTP range requests
+
+    The data goes to a preallocated ``.part`` file and every segment is
+    written straight to its offset. ``segments`` is the number of parallel
+    connections; if ``segment_size`` is given the file is cut into ranges of
+    that size which the connections work through, otherwise it is split
+    evenly between them. Servers without Range support are downloaded over a
+    single connection.
+
+    With ``resume`` the written ranges are recorded in a sidecar file, so an
+    interrupted download of the same unchanged stream continues where it
+    stopped instead of starting over.
+
+    Requests go through ``pool``, by default the process-wide
+    ``ConnectionPool``, so segments and later downloads from the same host
+    reuse its connections.
+    """
+    def __init__(self, segments=4, segment_size=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 timeout=30, retries=3, resume=True, pool=None):
+        if segments < 1:
+            raise ValueError("segments must be at least 1")
+        self.segments = segments
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.resume = resume
+        self.pool = pool
+
+    def plan(self, total_size):
+        """Split total_size bytes into a list of inclusive (start, end) ranges"""
+        if total_size <= 0:
+            return []
+        size = self.segment_size
+        if not size:
+            size = max(MIN_SEGMENT_SIZE, -(-total_size // self.segments))
+        return [(start, min(start + size, total_size) - 1) for start in range(0, total_size, size)]
+
+    def download(self, url, path, total_size=None, headers=None, progress_callback=None, identity=None,
+                 bandwidth=None):
+        """Download url to path and return the path
+
+        ``identity`` names the stream independently of its (expiring) URL,
+        e.g. ``"<video id>:<itag>"``, and decides whether saved partial data
+        may be reused. Every chunk is drawn from ``bandwidth``, a
+        ``BandwidthJob``, if one is given.
+        """
+        remote = probe_url(url, headers, self.timeout, self.pool)
+        if total_size is None:
+            total_size = remote['size']
+        progress = _ProgressCounter(total_size, progress_callback)
+        if not remote['ranges'] or not total_size:
+            self._download_single(url, path, headers, progress, bandwidth, total_size)
+            return path
+
+        identity = identity or url.split("?", 1)[0]
+        state = PartialDownload.load(path) if self.resume else None
+        if state and state.matches(identity, total_size, remote['etag'], remote['last_modified']):
+            if progress_callback:
+                progress_callback(f"Resuming download at byte {state.bytes_done} of {total_size}")
+            progress.skip(state.bytes_done)
+        else:
+            if state:
+                state.discard()
+            state = PartialDownload(path, identity, total_size, remote['etag'], remote['last_modified'])
+            with open(state.part_path, "wb") as f:
+                f.truncate(total_size)
+            state.save()
+
+        ranges = state.missing(self.plan(total_size))
+        # Set when any segment fails or is cancelled so the others stop early
+        stop = threading.Event()
+        try:
+            if ranges:
+                with ThreadPoolExecutor(max_workers=min(self.segments, len(ranges))) as executor:
+                    futures = [executor.submit(self._download_range, url, state, byte_range, headers, progress,
+                                               stop, bandwidth)
+                               for byte_range in ranges]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        stop.set()
+                        raise
+        finally:
+            state.save()
+        state.finish()
+        return path
+
+    def _download_single(self, url, path, headers, progress, bandwidth=None, total_size=None):
+        # Only a complete body is moved to path, so a dropped connection never looks finished
+        part_path = path + ".part"
+        written = 0
+        try:
+            with open_url(url, headers, timeout=self.timeout, pool=self.pool) as response, \
+                    open(part_path, "wb") as f:
+                expected = expected_length(response, total_size)
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if bandwidth is not None:
+                        bandwidth.consume(len(chunk))
+                    f.write(chunk)
+                    written += len(chunk)
+                    progress.add(len(chunk))
+            if expected is not None and written < expected:
+                raise IOError(f"connection closed early at byte {written} of {expected}")
+        except BaseException:
+            # Without Range support there is nothing to resume from
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, path)
+
+    def _download_range(self, url, state, byte_range, headers, progress, stop, bandwidth=None):
+        start, end = byte_range
+        position = start
+        recorded = start
+        attempt = 0
+        with open(state.part_path, "r+b") as f:
+            while position <= end and not stop.is_set():
+                try:
+                    with open_url(url, headers, (position, end), self.timeout, self.pool) as response:
+                        content_range = response.headers.get("Content-Range", "")
+                        if response.status != 206 or not content_range.startswith(f"bytes {position}-"):
+                            raise IOError(f"server ignored range request for bytes {position}-{end}")
+                        f.seek(position)
+                        while position <= end and not stop.is_set():
+                            chunk = response.read(min(self.chunk_size, end - position + 1))
+                            if not chunk:
+                                break
+                            if bandwidth is not None:
+                                bandwidth.consume(len(chunk))
+                            f.write(chunk)
+                            position += len(chunk)
+                            progress.add(len(chunk))
+                            if position - recorded >= STATE_SAVE_INTERVAL:
+                                f.flush()
+                                state.add(recorded, position - 1)
+                                state.save()
+                                recorded = position
+                    if position <= end and not stop.is_set():
+                        raise IOError(f"connection closed early at byte {position}")
+                except Exception:
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                finally:
+                    if position > recorded:
+                        f.flush()
+                        state.add(recorded, position - 1)
+                        recorded = position
+
+class _ProgressCounter:
+    """Thread-safe byte counter reporting progress events"""
+    def __init__(self, total_size, progress_callback):
+        self.meter = SpeedMeter(total_size)
+        self.progress_callback = progress_callback
+
+    def skip(self, nbytes):
+        self.meter.skip(nbytes)
+
+    def add(self, nbytes):
+        event = self.meter.add(nbytes)
+        if self.progress_callback:
+            self.progress_callback(event)
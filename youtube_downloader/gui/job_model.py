@@ -0,0 +1,185 @@
+import threading
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+
+from youtube_downloader.core.progress import format_bytes
+
+# Milliseconds between batched view updates
+UPDATE_INTERVAL = 100
+# Finished rows kept before the oldest are dropped, so long sessions stay flat in memory
+MAX_FINISHED_ROWS = 10000
+FINISHED_STATUSES = ("done", "failed")
+
+class JobRow:
+    """Display state of one queued URL"""
+    __slots__ = ("index", "url", "status", "fraction", "speed", "detail")
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.status = "queued"
+        self.fraction = None
+        self.speed = None
+        self.detail = ""
+
+class JobTableModel(QAbstractTableModel):
+    """Table of queued, running and finished download jobs
+
+    Worker threads report changes with ``post()``, which only records them.
+    A timer applies everything that arrived since the last tick in one go
+    and emits a single ``dataChanged`` for the affected rows, so the view
+    repaints at most every ``interval`` ms and only rows that are on screen.
+    ``updated`` is emitted after each batch.
+    """
+    COLUMNS = ("#", "URL", "Status", "Progress", "Speed", "Result")
+    PROGRESS_COLUMN = 3
+    updated = pyqtSignal()
+
+    def __init__(self, parent=None, interval=UPDATE_INTERVAL, max_finished=MAX_FINISHED_ROWS):
+        super().__init__(parent)
+        self.max_finished = max_finished
+        self._rows = []
+        self._row_of = {}
+        self._next_index = 0
+        self._finished = 0
+        self._pending = {}
+        self._new_rows = []
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(interval)
+
+    def add_urls(self, urls):
+        """Add a row per URL and return their job indexes, in order; safe to call from any thread
+
+        The rows appear with the next batch of updates.
+        """
+        with self._lock:
+            rows = []
+            for url in urls:
+                rows.append(JobRow(self._next_index, url))
+                self._next_index += 1
+            self._new_rows.extend(rows)
+        return [row.index for row in rows]
+
+    def post(self, index, **fields):
+        """Record new values for a job's row; safe to call from any thread"""
+        with self._lock:
+            self._pending.setdefault(index, {}).update(fields)
+
+    def flush(self):
+        """Apply the changes posted since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            rows, self._new_rows = self._new_rows, []
+        if not pending and not rows:
+            return
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            for offset, row in enumerate(rows):
+                self._row_of[row.index] = first + offset
+            self._rows.extend(rows)
+            self.endInsertRows()
+        changed = []
+        for index, fields in pending.items():
+            position = self._row_of.get(index)
+            if position is None:
+                # Removed while the update was in flight
+                continue
+            row = self._rows[position]
+            was_finished = row.status in FINISHED_STATUSES
+            for name, value in fields.items():
+                setattr(row, name, value)
+            self._finished += (row.status in FINISHED_STATUSES) - was_finished
+            changed.append(position)
+        if changed:
+            self.dataChanged.emit(self.index(min(changed), 0),
+                                  self.index(max(changed), len(self.COLUMNS) - 1))
+        if self.max_finished is not None and self._finished > self.max_finished * 1.1:
+            self._drop_finished(self._finished - self.max_finished)
+        self.updated.emit()
+
+    def clear_finished(self):
+        """Remove every finished row"""
+        self._drop_finished(self._finished)
+        self.updated.emit()
+
+    def _drop_finished(self, count):
+        """Remove the count oldest finished rows"""
+        self.beginResetModel()
+        kept = []
+        for row in self._rows:
+            if count and row.status in FINISHED_STATUSES:
+                count -= 1
+                self._finished -= 1
+            else:
+                kept.append(row)
+        self._rows = kept
+        self._row_of = {row.index: position for position, row in enumerate(kept)}
+        self.endResetModel()
+
+    def counts(self):
+        """Return the number of rows per status"""
+        counts = {}
+        for row in self._rows:
+            counts[row.status] = counts.get(row.status, 0) + 1
+        return counts
+
+    def total_speed(self):
+        """Combined speed of the running jobs in bytes/s"""
+        return sum(row.speed for row in self._rows if row.speed and row.status == "running")
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return row.index + 1
+            if column == 1:
+                return row.url
+            if column == 2:
+                return row.status
+            if column == self.PROGRESS_COLUMN:
+                return "" if row.fraction is None else f"{row.fraction:.0%}"
+            if column == 4:
+                return f"{format_bytes(row.speed)}/s" if row.speed and row.status == "running" else ""
+            return row.detail
+        if role == Qt.UserRole and column == self.PROGRESS_COLUMN:
+            return row.fraction
+        if role == Qt.ToolTipRole and column in (1, 5):
+            return row.url if column == 1 else row.detail
+        if role == Qt.ForegroundRole and row.status == "failed":
+            return QColor(Qt.red)
+        return None
+
+class ProgressDelegate(QStyledItemDelegate):
+    """Draws the progress column as a progress bar"""
+    def paint(self, painter, option, index):
+        fraction = index.data(Qt.UserRole)
+        if fraction is None:
+            super().paint(painter, option, index)
+            return
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 1000
+        bar.progress = int(fraction * 1000)
+        bar.text = index.data(Qt.DisplayRole)
+        bar.textVisible = True
+        QApplication.style().drawControl(QStyle.CE_ProgressBar, bar, painter)
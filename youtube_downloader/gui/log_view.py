@@ -0,0 +1,45 @@
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QPlainTextEdit
+
+# Lines kept in the log; older ones are discarded
+LOG_LINES = 5000
+# Milliseconds between batched log updates
+UPDATE_INTERVAL = 100
+
+class LogView(QPlainTextEdit):
+    """Read-only log holding at most ``max_lines`` lines
+
+    ``post()`` may be called from any thread. Lines are buffered in a ring
+    of the same size and appended once per ``interval`` ms, so a burst of
+    messages costs one append and never more than ``max_lines`` lines of
+    memory.
+    """
+    def __init__(self, parent=None, max_lines=LOG_LINES, interval=UPDATE_INTERVAL):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self._pending = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(interval)
+
+    def post(self, message):
+        with self._lock:
+            self._pending.append(str(message))
+
+    def flush(self):
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        if not lines:
+            return
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        self.appendPlainText("\n".join(lines))
+        # Follow new lines unless the user scrolled up to read
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
@@ -3,47 +3,111 @@ import os
 import threading
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                            QComboBox, QCheckBox, QFileDialog, QTextEdit, 
-                            QProgressBar, QGroupBox, QRadioButton, QButtonGroup)
-from PyQt5.QtCore import pyqtSignal, QObject, Qt
+                            QComboBox, QCheckBox, QFileDialog, QTableView,
+                            QHeaderView, QAbstractItemView, QProgressBar,
+                            QGroupBox, QRadioButton, QButtonGroup, QSplitter)
+from PyQt5.QtCore import Qt
 
 # Import from our package
-from youtube_downloader.core.downloader import download_video
+from youtube_downloader.core.batch import BatchDownloader, UrlFeed
+from youtube_downloader.core.cache import get_default_cache
+from youtube_downloader.core.playlist import is_playlist_url, iter_playlist
+from youtube_downloader.core.progress import ProgressEvent, format_bytes
+from youtube_downloader.core.transfer import SegmentedDownloader
+from youtube_downloader.gui.job_model import JobTableModel, ProgressDelegate
+from youtube_downloader.gui.log_view import LogView
 from youtube_downloader.utils.helpers import (get_default_download_dir, 
                                              ensure_dir_exists,
                                              get_available_resolutions,
                                              get_audio_formats)
 
-class WorkerSignals(QObject):
-    """Defines the signals available from a running worker thread"""
-    progress = pyqtSignal(str)
-    finished = pyqtSignal(tuple)
-    error = pyqtSignal(str)
+# Downloads running at the same time
+MAX_PARALLEL_DOWNLOADS = 3
 
-class DownloadWorker(threading.Thread):
-    """Worker thread for downloading videos"""
-    def __init__(self, url, output_path, resolution, extract_audio, audio_format):
-        super().__init__()
-        self.url = url
-        self.output_path = output_path
-        self.resolution = resolution
-        self.extract_audio = extract_audio
-        self.audio_format = audio_format
-        self.signals = WorkerSignals()
-        
-    def run(self):
+def parse_url_list(text):
+    """Return the URLs in text, one per line; blank lines and # comments are skipped"""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+class QueueWorker(threading.Thread):
+    """Runs queued URLs through a BatchDownloader for the lifetime of the window
+
+    URLs are added with ``submit()`` and may arrive while earlier ones are
+    still downloading. Playlist and channel URLs are listed on a thread of
+    their own and each video is queued as it is found. Progress goes to the
+    job model and the log, which both batch their updates, so busy workers
+    never flood the GUI thread.
+    """
+    def __init__(self, model, log, max_workers=MAX_PARALLEL_DOWNLOADS):
+        super().__init__(daemon=True)
+        self.model = model
+        self.log = log
+        self.feed = UrlFeed()
+        # Job indexes of the model and the batch must be handed out in the same order
+        self._queue_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.downloader = BatchDownloader(
+            max_workers,
+            progress_callback=self.report_progress,
+            cache=get_default_cache(),
+            # Resumes interrupted downloads from their .part files
+            transfer=SegmentedDownloader()
+        )
+
+    def submit(self, urls, options):
+        """Queue urls with download_video options"""
+        videos = []
+        for url in urls:
+            if is_playlist_url(url):
+                threading.Thread(target=self._expand, args=(url, options), daemon=True).start()
+            else:
+                videos.append(url)
+        self._queue(videos, options)
+
+    def _queue(self, urls, options):
+        with self._queue_lock:
+            self.model.add_urls(urls)
+            self.feed.extend((url, options) for url in urls)
+
+    def _expand(self, url, options):
+        """Queue the videos of a playlist or channel as they are listed"""
+        self.log.post(f"Listing {url}")
         try:
-            result = download_video(
-                self.url, 
-                self.output_path, 
-                self.resolution, 
-                self.extract_audio, 
-                self.audio_format,
-                self.signals.progress.emit
-            )
-            self.signals.finished.emit(result)
+            for video_url in iter_playlist(url, progress_callback=self.log.post):
+                if self._stopped.is_set():
+                    return
+                self._queue([video_url], options)
         except Exception as e:
-            self.signals.error.emit(str(e))
+            self.log.post(f"Could not list {url}: {e}")
+
+    def report_progress(self, job, message):
+        if isinstance(message, ProgressEvent) and message.is_bytes:
+            self.model.post(job.index, status="running", fraction=message.fraction, speed=message.speed)
+        else:
+            self.model.post(job.index, status="running", detail=str(message))
+            self.log.post(f"[{job.index + 1}] {message}")
+
+    def run(self):
+        for job in self.downloader.run(self.feed):
+            if job.ok:
+                paths = [job.video_path] if job.video_path else []
+                paths += [job.audio_path] if isinstance(job.audio_path, str) else job.audio_path or []
+                detail = ", ".join(os.path.basename(path) for path in paths)
+                self.model.post(job.index, status="done", fraction=1.0, speed=None, detail=detail)
+                self.log.post(f"[{job.index + 1}] Download completed: {detail}")
+            else:
+                self.model.post(job.index, status="failed", speed=None, detail=job.error or "Download failed")
+                self.log.post(f"[{job.index + 1}] Failed: {job.error or 'Download failed'}")
+
+    def stop(self):
+        """Drop URLs that have not started; running downloads finish"""
+        self._stopped.set()
+        self.feed.clear()
+        self.feed.close()
 
 class MainWindow(QMainWindow):
     """Main application window"""
@@ -54,7 +118,7 @@ class MainWindow(QMainWindow):
     def init_ui(self):
         """Initialize the user interface"""
         self.setWindowTitle("YouTube Downloader")
-        self.setMinimumSize(600, 500)
+        self.setMinimumSize(800, 650)
         
         # Create central widget and main layout
         central_widget = QWidget()
@@ -64,8 +128,17 @@ class MainWindow(QMainWindow):
         url_group = QGroupBox("YouTube URL")
         url_layout = QHBoxLayout()
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("Enter YouTube video URL")
+        self.url_input.setPlaceholderText("Enter YouTube video or playlist URL")
+        self.url_input.returnPressed.connect(self.start_download)
         url_layout.addWidget(self.url_input)
+        paste_btn = QPushButton("Paste List")
+        paste_btn.setToolTip("Queue every URL in the clipboard, one per line")
+        paste_btn.clicked.connect(self.paste_urls)
+        url_layout.addWidget(paste_btn)
+        import_btn = QPushButton("Import...")
+        import_btn.setToolTip("Queue every URL in a text file, one per line")
+        import_btn.clicked.connect(self.import_urls)
+        url_layout.addWidget(import_btn)
         url_group.setLayout(url_layout)
         main_layout.addWidget(url_group)
         
@@ -101,16 +174,19 @@ class MainWindow(QMainWindow):
         self.extract_audio_cb = QCheckBox("Extract Audio")
         audio_layout.addWidget(self.extract_audio_cb)
         
-        audio_format_layout = QHBoxLayout()
-        self.mp3_radio = QRadioButton("MP3")
-        self.flac_radio = QRadioButton("FLAC")
-        self.mp3_radio.setChecked(True)
-        audio_format_layout.addWidget(self.mp3_radio)
-        audio_format_layout.addWidget(self.flac_radio)
+        self.audio_only_cb = QCheckBox("Audio Only (skip video)")
+        self.audio_only_cb.setEnabled(False)
+        self.extract_audio_cb.toggled.connect(self.audio_only_cb.setEnabled)
+        audio_layout.addWidget(self.audio_only_cb)
         
-        audio_format_group = QButtonGroup(self)
-        audio_format_group.addButton(self.mp3_radio)
-        audio_format_group.addButton(self.flac_radio)
+        audio_format_layout = QHBoxLayout()
+        self.audio_format_group = QButtonGroup(self)
+        for fmt in get_audio_formats():
+            radio = QRadioButton(fmt.upper())
+            radio.setProperty("audio_format", fmt)
+            self.audio_format_group.addButton(radio)
+            audio_format_layout.addWidget(radio)
+        self.audio_format_group.buttons()[0].setChecked(True)
         
         audio_layout.addLayout(audio_format_layout)
         video_layout.addLayout(audio_layout)
@@ -124,20 +200,66 @@ class MainWindow(QMainWindow):
         self.download_btn.setMinimumHeight(40)
         main_layout.addWidget(self.download_btn)
         
+        # Job queue and log share the remaining space
+        splitter = QSplitter(Qt.Vertical)
+        
+        queue_group = QGroupBox("Queue")
+        queue_layout = QVBoxLayout()
+        self.job_model = JobTableModel(self)
+        self.job_model.updated.connect(self.update_summary)
+        self.job_view = QTableView()
+        self.job_view.setModel(self.job_model)
+        self.job_view.setItemDelegateForColumn(JobTableModel.PROGRESS_COLUMN, ProgressDelegate(self.job_view))
+        self.job_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.job_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.job_view.setWordWrap(False)
+        # Fixed row heights and column widths, so Qt never measures rows that are off screen
+        rows = self.job_view.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(self.fontMetrics().height() + 8)
+        rows.hide()
+        columns = self.job_view.horizontalHeader()
+        columns.setSectionResizeMode(QHeaderView.Interactive)
+        columns.setSectionResizeMode(1, QHeaderView.Stretch)
+        columns.resizeSection(0, 50)
+        columns.resizeSection(2, 80)
+        columns.resizeSection(3, 110)
+        columns.resizeSection(4, 90)
+        columns.resizeSection(5, 220)
+        queue_layout.addWidget(self.job_view)
+        
+        queue_buttons = QHBoxLayout()
+        self.summary_label = QLabel("")
+        queue_buttons.addWidget(self.summary_label, 1)
+        clear_btn = QPushButton("Clear Finished")
+        clear_btn.clicked.connect(self.job_model.clear_finished)
+        queue_buttons.addWidget(clear_btn)
+        queue_layout.addLayout(queue_buttons)
+        queue_group.setLayout(queue_layout)
+        splitter.addWidget(queue_group)
+        
         # Progress section
         progress_group = QGroupBox("Progress")
         progress_layout = QVBoxLayout()
         
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
+        self.log_output = LogView()
         progress_layout.addWidget(self.log_output)
         
         self.progress_bar = QProgressBar()
-        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setFormat("%v of %m jobs")
         progress_layout.addWidget(self.progress_bar)
         
+        self.speed_label = QLabel("")
+        progress_layout.addWidget(self.speed_label)
+        
         progress_group.setLayout(progress_layout)
-        main_layout.addWidget(progress_group)
+        splitter.addWidget(progress_group)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 1)
+        main_layout.addWidget(splitter, 1)
+        
+        self.queue_worker = QueueWorker(self.job_model, self.log_output)
+        self.queue_worker.start()
         
         # Set central widget
         self.setCentralWidget(central_widget)
@@ -151,12 +273,37 @@ class MainWindow(QMainWindow):
             self.output_path.setText(directory)
             
     def start_download(self):
-        """Start the download process in a separate thread"""
+        """Queue the entered URL"""
         url = self.url_input.text().strip()
         if not url:
             self.log_message("Please enter a YouTube URL")
             return
-            
+        self.queue_urls([url])
+        self.url_input.clear()
+        
+    def paste_urls(self):
+        """Queue the URLs in the clipboard"""
+        urls = parse_url_list(QApplication.clipboard().text())
+        if not urls:
+            self.log_message("The clipboard contains no URLs")
+            return
+        self.queue_urls(urls)
+        
+    def import_urls(self):
+        """Queue the URLs in a text file"""
+        path, _ = QFileDialog.getOpenFileName(self, "Import URL List", "", "Text files (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                urls = parse_url_list(f.read())
+        except OSError as e:
+            self.log_message(f"Could not read {path}: {e}")
+            return
+        self.queue_urls(urls)
+        
+    def queue_urls(self, urls):
+        """Queue urls with the current options"""
         output_path = self.output_path.text()
         ensure_dir_exists(output_path)
         
@@ -165,50 +312,35 @@ class MainWindow(QMainWindow):
             resolution = self.resolution_combo.currentText()
             
         extract_audio = self.extract_audio_cb.isChecked()
-        audio_format = "mp3" if self.mp3_radio.isChecked() else "flac"
-        
-        # Disable UI elements during download
-        self.download_btn.setEnabled(False)
-        self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        options = {
+            'output_path': output_path,
+            'resolution': resolution,
+            'extract_audio_option': extract_audio,
+            'audio_format': self.audio_format_group.checkedButton().property("audio_format"),
+            'audio_only': extract_audio and self.audio_only_cb.isChecked(),
+        }
+        self.queue_worker.submit(urls, options)
+        self.log_message(f"Queued {len(urls)} URL{'s' if len(urls) != 1 else ''}")
         
-        # Clear log
-        self.log_output.clear()
-        self.log_message("Starting download...")
-        
-        # Create and start worker thread
-        self.worker = DownloadWorker(url, output_path, resolution, extract_audio, audio_format)
-        self.worker.signals.progress.connect(self.log_message)
-        self.worker.signals.finished.connect(self.download_finished)
-        self.worker.signals.error.connect(self.download_error)
-        self.worker.start()
+    def update_summary(self):
+        """Show queue totals and the combined download speed"""
+        counts = self.job_model.counts()
+        total = self.job_model.rowCount()
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(finished)
+        self.summary_label.setText(
+            f"{counts.get('queued', 0)} queued, {counts.get('running', 0)} running, "
+            f"{counts.get('done', 0)} done, {counts.get('failed', 0)} failed"
+        )
+        speed = self.job_model.total_speed()
+        self.speed_label.setText(f"{format_bytes(speed)}/s" if speed else "")
         
     def log_message(self, message):
         """Add message to log output"""
-        self.log_output.append(message)
-        # Auto-scroll to bottom
-        self.log_output.verticalScrollBar().setValue(
-            self.log_output.verticalScrollBar().maximum()
-        )
-        
-    def download_finished(self, result):
-        """Handle download completion"""
-        video_path, audio_path = result
+        self.log_output.post(message)
         
-        if video_path:
-            self.log_message(f"Download completed successfully!")
-            if audio_path:
-                self.log_message(f"Audio extracted to: {os.path.basename(audio_path)}")
-        else:
-            self.log_message("Download failed.")
-            
-        # Re-enable UI elements
-        self.download_btn.setEnabled(True)
-        self.progress_bar.setRange(0, 1)
-        self.progress_bar.setValue(1)
-        
-    def download_error(self, error_message):
-        """Handle download errors"""
-        self.log_message(f"Error: {error_message}")
-        self.download_btn.setEnabled(True)
-        self.progress_bar.setRange(0, 1)
-        self.progress_bar.setValue(0)
\ No newline at end of file
+    def closeEvent(self, event):
+        """Stop taking queued URLs; downloads already running are finished"""
+        self.queue_worker.stop()
+        super().closeEvent(event)
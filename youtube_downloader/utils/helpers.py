@@ -22,4 +22,18 @@ def get_available_resolutions():
 
 def get_audio_formats():
     """Return list of supported audio formats"""
-    return ["mp3", "flac"]
\ No newline at end of file
+    return ["mp3", "flac", "m4a", "ogg"]
+
+def get_cache_dir():
+    """Get the per-user cache directory for the downloader"""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return os.path.join(base, "youtube_downloader")
+
+def extract_video_id(url):
+    """Return the 11-character YouTube video ID in url, or None"""
+    match = re.search(r"(?:v=|/(?:embed|shorts|live|v)/|youtu\.be/)([0-9A-Za-z_-]{11})", url)
+    if match:
+        return match.group(1)
+    if re.fullmatch(r"[0-9A-Za-z_-]{11}", url.strip()):
+        return url.strip()
+    return None